@@ -0,0 +1,37 @@
+"""Lazy package exports (PEP 562).
+
+A package lists its exported names with the submodule defining each. The
+submodule is imported when a name is first accessed, so importing one part
+of the package does not pull in the others (and their dependencies).
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from typing import Any, Callable
+
+
+def lazy_exports(package: str, exports: dict[str, str]) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """Build the module-level __getattr__ and __dir__ of a package.
+    
+    Args:
+        package: __name__ of the package.
+        exports: Exported name -> defining submodule, relative to the package.
+    
+    Returns:
+        (__getattr__, __dir__) to assign in the package's __init__.
+    """
+    def __getattr__(name: str) -> Any:
+        """Import an exported name from its submodule on first access."""
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)  # Later lookups skip __getattr__
+        return value
+    
+    def __dir__() -> list[str]:
+        """Include lazily exported names."""
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+    
+    return __getattr__, __dir__
@@ -0,0 +1,300 @@
+"""Headless command-line runner.
+
+Loads the configuration, builds the instrument and runs experiments or
+protocols without Qt, printing progress and throughput to stdout. Meant for
+unattended runs on machines without a display:
+
+    python -m instrument.cli experiment --flow 100 --duration 600 --interval 0.5 --repeat 3
+    python -m instrument.cli protocol protocols/ramp-and-image.yaml
+    python -m instrument.cli resume /data/20250101-120000
+
+Ctrl-C stops the current run after its buffered frames are saved and skips
+the remaining runs; a second Ctrl-C aborts at once.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, TextIO
+
+from instrument.app import build_instrument, build_pump_controllers
+from instrument.config import InstrumentConfig
+from instrument.controllers.acquisition import AcquisitionStats
+from instrument.controllers.experiment_controller import ExperimentController, ExperimentParams
+from instrument.controllers.protocol import Protocol, ProtocolRunner
+from instrument.devices.registry import DeviceRegistry
+from instrument.log import setup_logging
+from instrument.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def format_stats(stats: AcquisitionStats) -> str:
+    """One-line summary of acquisition statistics."""
+    return (
+        f"{stats.frames_acquired} acquired, {stats.frames_written} written, "
+        f"{stats.frames_dropped} dropped, {stats.frames_late} late | "
+        f"{stats.fps:.1f} fps, {stats.write_mb_s:.1f} MB/s | "
+        f"buffer peak {stats.high_water_mark}/{stats.buffer_capacity}"
+    )
+
+
+class ProgressReporter:
+    """Prints acquisition progress at a fixed interval from a background thread."""
+    
+    def __init__(self, experiment: ExperimentController, interval_s: float = 5.0, out: TextIO | None = None) -> None:
+        """Initialize progress reporter.
+        
+        Args:
+            experiment: Controller whose acquisition statistics are reported.
+            interval_s: Time between progress lines.
+            out: Output stream (default: stdout).
+        """
+        self._experiment = experiment
+        self._interval_s = interval_s
+        self._out = out
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_s = 0.0
+    
+    def start(self) -> None:
+        """Start printing progress lines."""
+        self._stop_event.clear()
+        self._start_s = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="cli-progress", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop printing progress lines."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self) -> None:
+        """Print one line per interval while an acquisition is running."""
+        while not self._stop_event.wait(self._interval_s):
+            if self._experiment.is_acquiring:
+                elapsed_s = time.perf_counter() - self._start_s
+                _print(f"[{elapsed_s:8.1f} s] {format_stats(self._experiment.acquisition_stats)}", self._out)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line arguments."""
+    parser = argparse.ArgumentParser(prog="python -m instrument.cli", description=__doc__.splitlines()[0])
+    parser.add_argument("--config", type=Path, default=Path("instrument-config.yaml"), help="instrument configuration")
+    parser.add_argument("--simulate", action="store_true", help="use simulated devices")
+    parser.add_argument("--save-path", type=Path, help="output directory (default: a new directory in paths.data_root)")
+    parser.add_argument("--no-save", action="store_true", help="acquire without saving")
+    parser.add_argument("--progress-s", type=float, default=5.0, help="seconds between progress lines")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    experiment = commands.add_parser("experiment", help="run timed acquisitions at a fixed flow rate")
+    experiment.add_argument("--flow", type=float, required=True, help="flow rate in uL/min")
+    experiment.add_argument("--duration", type=float, help="seconds per run (default: experiment.default_duration_s)")
+    experiment.add_argument("--interval", type=float, default=1.0, help="seconds between frames")
+    experiment.add_argument("--repeat", type=int, default=1, help="number of runs")
+    
+    protocol = commands.add_parser("protocol", help="run protocol files one after another")
+    protocol.add_argument("protocols", type=Path, nargs="+", help="protocol YAML files")
+    
+    resume = commands.add_parser("resume", help="continue interrupted runs from their journal")
+    resume.add_argument("runs", type=Path, nargs="+", help="run directories containing journal.jsonl")
+    resume.add_argument("--recover-only", action="store_true", help="only cut the data back to the last durable frame")
+    return parser
+
+
+def main(argv: list[str] | None = None, out: TextIO | None = None) -> int:
+    """Headless entry point.
+    
+    Args:
+        argv: Command-line arguments (default: sys.argv[1:]).
+        out: Stream for progress and results (default: stdout).
+    
+    Returns:
+        Exit code: 0 on success, 1 on a missing config, 130 when interrupted.
+    """
+    args = build_parser().parse_args(argv)
+    if not args.config.exists():
+        print(f"Error: Configuration file not found: {args.config}", file=sys.stderr)
+        return 1
+    config = InstrumentConfig.from_file(args.config)
+    if args.simulate:
+        config.simulation = True
+    
+    save_root = args.save_path
+    if args.no_save or (save_root is None and not config.experiment.auto_save):
+        save_root = None
+    elif save_root is None:
+        save_root = Path(config.paths.data_root) / time.strftime("%Y%m%d-%H%M%S")
+    
+    log_pipeline = setup_logging(config.paths.log_dir, config.logging)
+    logger.info("Headless %s run with %s", args.command, args.config)
+    metrics = Metrics(config.metrics.enabled)
+    metrics_server = None
+    if config.metrics.enabled and config.metrics.prometheus_port is not None:
+        metrics_server = metrics.serve_prometheus(config.metrics.prometheus_port)
+    try:
+        _, experiment, registry = build_instrument(config, metrics)
+        progress = ProgressReporter(experiment, args.progress_s, out)
+        progress.start()
+        try:
+            if args.command == "experiment":
+                return _run_experiments(experiment, args, config, save_root, out)
+            if args.command == "resume":
+                return _resume_runs(experiment, args.runs, args.recover_only, out)
+            return _run_protocols(experiment, registry, config, args.protocols, save_root, out)
+        finally:
+            progress.stop()
+            registry.close()
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if config.metrics.enabled and config.metrics.json_path:
+            metrics.write_json(config.metrics.json_path)
+        log_pipeline.stop()
+
+
+def _run_experiments(
+    experiment: ExperimentController,
+    args: argparse.Namespace,
+    config: InstrumentConfig,
+    save_root: Path | None,
+    out: TextIO | None,
+) -> int:
+    """Run the requested number of experiments back to back."""
+    stop_requested = threading.Event()
+    duration_s = args.duration if args.duration is not None else config.experiment.default_duration_s
+    with _InterruptHandler(stop_requested, experiment.stop_experiment, out):
+        for run in range(args.repeat):
+            if stop_requested.is_set():
+                break
+            save_path = save_root
+            if save_root is not None and args.repeat > 1:
+                save_path = save_root / f"run-{run + 1:03d}"
+            label = f"Run {run + 1}/{args.repeat}"
+            _print(f"{label}: {args.flow} uL/min for {duration_s} s -> {save_path or 'not saved'}", out)
+            params = ExperimentParams(
+                flow_rate_ul_min=args.flow,
+                duration_s=duration_s,
+                save_path=save_path,
+                frame_interval_s=args.interval,
+            )
+            stats = experiment.run_experiment(params)
+            _print(f"{label} done: {format_stats(stats)}", out)
+    return 130 if stop_requested.is_set() else 0
+
+
+def _run_protocols(
+    experiment: ExperimentController,
+    registry: DeviceRegistry,
+    config: InstrumentConfig,
+    paths: list[Path],
+    save_root: Path | None,
+    out: TextIO | None,
+) -> int:
+    """Run protocol files one after another."""
+    protocols = [Protocol.from_file(path) for path in paths]  # Fail on typos before any device moves
+    pumps = build_pump_controllers(config, registry)
+    runner = ProtocolRunner(
+        pumps=pumps,
+        valves={valve.name: registry.get(valve.name) for valve in config.valves},
+        sensors=experiment.sensors,
+        experiment=experiment,
+    )
+    stop_requested = threading.Event()
+    try:
+        with _InterruptHandler(stop_requested, runner.stop, out):
+            for protocol in protocols:
+                if stop_requested.is_set():
+                    break
+                save_path = None if save_root is None else save_root / protocol.name
+                _print(f"Protocol {protocol.name}: {len(protocol.steps)} steps -> {save_path or 'not saved'}", out)
+                result = runner.run(protocol, save_path)
+                _print(
+                    f"Protocol {protocol.name} done in {result.elapsed_s:.1f} s: {len(result.events)} events, "
+                    f"max latency {result.max_latency_s * 1e3:.1f} ms",
+                    out,
+                )
+                for name, stats in result.acquisitions.items():
+                    _print(f"  {name}: {format_stats(stats)}", out)
+    finally:
+        for pump in pumps.values():
+            pump.stop()
+    return 130 if stop_requested.is_set() else 0
+
+
+def _resume_runs(
+    experiment: ExperimentController,
+    paths: list[Path],
+    recover_only: bool,
+    out: TextIO | None,
+) -> int:
+    """Recover interrupted runs and acquire their remaining frames."""
+    if not isinstance(experiment, ExperimentController):
+        print("Error: Resuming is only supported with a single camera", file=sys.stderr)
+        return 1
+    stop_requested = threading.Event()
+    with _InterruptHandler(stop_requested, experiment.stop_experiment, out):
+        for path in paths:
+            if stop_requested.is_set():
+                break
+            if recover_only:
+                state = experiment.recover_run(path)
+                note = " (already finalized)" if state.finalized else ""
+                _print(f"{path}: kept {len(state.frames)} of {state.num_stored} frames{note}", out)
+                continue
+            _print(f"Resuming {path}", out)
+            stats = experiment.resume_experiment(path)
+            _print(f"{path} done: {format_stats(stats)}", out)
+    return 130 if stop_requested.is_set() else 0
+
+
+class _InterruptHandler:
+    """Turn the first Ctrl-C into a clean stop; the second one aborts."""
+    
+    def __init__(self, stop_requested: threading.Event, stop: Callable[[], None], out: TextIO | None) -> None:
+        """Initialize handler.
+        
+        Args:
+            stop_requested: Set on the first Ctrl-C.
+            stop: Requests the running acquisition or protocol to stop.
+            out: Output stream for the notice.
+        """
+        self._stop_requested = stop_requested
+        self._stop = stop
+        self._out = out
+        self._previous = None
+    
+    def __enter__(self) -> None:
+        """Install the handler (signals can only be handled on the main thread)."""
+        if threading.current_thread() is threading.main_thread():
+            self._previous = signal.signal(signal.SIGINT, self._handle)
+    
+    def __exit__(self, *exc_info) -> None:
+        """Restore the previous handler."""
+        if self._previous is not None:
+            signal.signal(signal.SIGINT, self._previous)
+    
+    def _handle(self, signum, frame) -> None:
+        """Request a clean stop, or abort if one was already requested."""
+        if self._stop_requested.is_set():
+            raise KeyboardInterrupt
+        self._stop_requested.set()
+        _print("Stopping after buffered frames are saved (Ctrl-C again to abort)", self._out)
+        self._stop()
+
+
+def _print(line: str, out: TextIO | None) -> None:
+    """Print a line and flush, so progress shows up in logs and pipes at once."""
+    print(line, file=out if out is not None else sys.stdout, flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,45 @@
 """Configuration loading and validation.
 
 Loads instrument-config.yaml and validates it using Pydantic models.
+Parsing, includes and caching live in instrument.config_cache.
 """
 
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
-class CameraConfig(BaseModel):
+class DeviceConfig(BaseModel):
+    """Settings shared by all device configurations."""
+    
+    init_timeout_s: float | None = None  # None uses the registry default
+    depends_on: list[str] = Field(default_factory=list)  # Names of devices to initialize first
+
+
+class CameraConfig(DeviceConfig):
     """Camera configuration."""
     
+    name: str = "camera"
     type: str
     serial_number: str | None = None
     exposure_ms: float = 20.0
     pixel_format: str = "MONO12"
+    roi: list[int] | None = None  # [y, x, height, width]; None = full sensor
+    binning: int = 1  # Software binning factor after the ROI
+    frame_rate_hz: float | None = None  # Simulation: frame/trigger rate; None = free running
 
 
-class PumpConfig(BaseModel):
+class PumpConfig(DeviceConfig):
     """Pump configuration."""
     
     name: str
     backend: str  # "pyvisa", "serial", "gpio"
     flow_unit: str = "uL/min"
     max_flow_rate: float | None = None
+    command_rate_hz: float = 10.0  # Most set-points per second sent by the pump controller
     
     # Backend-specific fields
     resource: str | None = None  # For pyvisa
@@ -36,7 +48,7 @@ class PumpConfig(BaseModel):
     channel: int | None = None  # For gpio
 
 
-class ValveConfig(BaseModel):
+class ValveConfig(DeviceConfig):
     """Valve configuration."""
     
     name: str
@@ -49,12 +61,14 @@ class ValveConfig(BaseModel):
     baudrate: int | None = None  # For serial
 
 
-class SensorConfig(BaseModel):
+class SensorConfig(DeviceConfig):
     """Sensor configuration."""
     
     name: str
     backend: str
     unit: str | None = None
+    sample_rate_hz: float = 10.0
+    history_s: float = 3600.0  # Seconds of samples kept in memory
     
     # Backend-specific fields
     port: str | None = None
@@ -68,12 +82,83 @@ class PathsConfig(BaseModel):
     log_dir: str = "/data/logs"
 
 
+class LoggingConfig(BaseModel):
+    """Logging configuration."""
+    
+    level: str = "INFO"
+    console_level: str | None = "INFO"  # None disables console output
+    device_levels: dict[str, str] = Field(default_factory=dict)  # Device name -> level
+    filename: str = "instrument.jsonl"
+    max_bytes: int = 10_000_000  # Rotate after this size
+    backup_count: int = 5
+
+
+class DetectionConfig(BaseModel):
+    """Online droplet detection configuration."""
+    
+    enabled: bool = False
+    threshold: float = 500.0  # Brightness above background of droplet pixels
+    min_area_px: int = 10  # Smaller components are noise
+    background_frames: int = 8  # Frames in the initial median background
+    save_only_detections: bool = False  # Store only frames with droplets
+    table_format: Literal["parquet", "csv"] = "parquet"
+
+
+class TriggerConfig(BaseModel):
+    """Event-triggered pre/post capture configuration."""
+    
+    enabled: bool = False
+    pre_frames: int = 32  # Frames kept in memory before a trigger
+    post_frames: int = 32  # Frames stored after a trigger
+    sensor: str | None = None  # Sensor name for a threshold trigger
+    sensor_threshold: float = 0.0
+    sensor_above: bool = True  # Fire above the threshold (otherwise below)
+    on_detection: bool = False  # Fire when droplet detection finds droplets
+
+
+class JournalConfig(BaseModel):
+    """Crash-safe acquisition journal configuration."""
+    
+    enabled: bool = False  # Off by default: each sync fsyncs the dataset while acquiring
+    sync_frames: int = 256  # fsync after this many frames...
+    sync_interval_ms: float = 1000.0  # ...or this much time, whichever comes first
+
+
 class ExperimentConfig(BaseModel):
     """Experiment default configuration."""
     
     default_duration_s: float = 60.0
     auto_save: bool = True
-    file_format: str = "ome-tiff"
+    file_format: Literal["ome-tiff", "tiff", "zarr", "ome-zarr"] = "ome-tiff"  # Any case
+    decimation: int = 1  # Store every Nth frame
+    
+    # Zarr storage settings
+    chunk_frames: int = 16  # Frames per chunk along time
+    chunk_shape: list[int] | None = None  # Spatial chunk (y, x); None = full frame
+    compressor: str = "lz4"  # "blosc", "lz4", "zstd", "none"
+    compression_level: int = 5
+    compression_workers: int = 0  # Processes compressing chunks; 0 = writer thread
+    
+    sensor_export_format: Literal["parquet", "hdf5"] = "parquet"
+    camera_sync: str = "software"  # Multi-camera: "software" (shared schedule) or "hardware" (trigger line)
+    
+    detection: DetectionConfig = Field(default_factory=DetectionConfig)
+    trigger: TriggerConfig = Field(default_factory=TriggerConfig)
+    journal: JournalConfig = Field(default_factory=JournalConfig)
+    
+    @field_validator("file_format", mode="before")
+    @classmethod
+    def _lowercase_file_format(cls, value: Any) -> Any:
+        """Accept the file format in any case, as create_writer() does."""
+        return value.lower() if isinstance(value, str) else value
+
+
+class MetricsConfig(BaseModel):
+    """Runtime latency metrics configuration."""
+    
+    enabled: bool = False
+    json_path: str | None = None  # Snapshot written on exit
+    prometheus_port: int | None = None  # Serve /metrics on localhost
 
 
 class InstrumentConfig(BaseModel):
@@ -83,23 +168,39 @@ class InstrumentConfig(BaseModel):
     simulation: bool = False
     
     camera: CameraConfig | None = None
+    cameras: list[CameraConfig] = Field(default_factory=list)  # Further cameras acquired in sync
     pumps: list[PumpConfig] = Field(default_factory=list)
     valves: list[ValveConfig] = Field(default_factory=list)
     sensors: list[SensorConfig] = Field(default_factory=list)
     paths: PathsConfig = Field(default_factory=PathsConfig)
+    logging: LoggingConfig = Field(default_factory=LoggingConfig)
     experiment: ExperimentConfig = Field(default_factory=ExperimentConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
     
     @classmethod
-    def from_file(cls, path: Path | str) -> InstrumentConfig:
-        """Load configuration from YAML file."""
+    def from_file(cls, path: Path | str, overrides: dict[str, Any] | None = None) -> InstrumentConfig:
+        """Load configuration from YAML file.
+        
+        The file is parsed and merged with its includes only when it changed
+        since the last call; each call returns a freshly validated copy.
+        
+        Args:
+            path: Config file.
+            overrides: Values merged over the file contents.
+        """
+        # Deferred: config_cache imports this module
+        from instrument.config_cache import default_cache
+        
         path = Path(path)
         if not path.exists():
             raise FileNotFoundError(f"Config file not found: {path}")
         
-        with open(path, "r") as f:
-            data = yaml.safe_load(f)
-        
-        return cls.model_validate(data)
+        return cls.model_validate(default_cache.load_data(path, overrides))
+    
+    @property
+    def all_cameras(self) -> list[CameraConfig]:
+        """Primary camera followed by the further cameras."""
+        return ([self.camera] if self.camera is not None else []) + list(self.cameras)
     
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary."""
@@ -0,0 +1,394 @@
+"""Cached configuration loading.
+
+Parsing YAML dominates config load time; validating the parsed data is
+cheap. Files are therefore parsed with libyaml when available, and the
+merged result (includes and overrides applied) is kept per file. The cache
+is keyed by path, invalidated by mtime/size, and confirmed by a content hash.
+Validated configs can also be pickled to a snapshot directory, so a new
+process skips parsing entirely.
+
+A config file may include others, which it then overrides key by key:
+
+    include: ["base.yaml", "cameras/daheng.yaml"]  # Relative to this file
+    instrument_name: "rig-2"
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import pydantic
+import yaml
+from pydantic import TypeAdapter
+
+from instrument.config import InstrumentConfig
+
+logger = logging.getLogger(__name__)
+
+# libyaml is about 10x faster than the pure-Python loader
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# (path, mtime_ns, size) of each source file
+_Stamps = tuple[tuple[str, int, int], ...]
+
+
+def load_yaml(path: Path | str) -> Any:
+    """Parse a YAML file with the fastest available safe loader."""
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+def merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    """Deep-merge two mappings; values from override win, nested mappings merge.
+    
+    Args:
+        base: Base mapping (not modified).
+        override: Overriding mapping (not modified).
+    
+    Returns:
+        Merged mapping.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+@dataclass
+class _Entry:
+    """Cached load of one config file."""
+    
+    sources: list[Path]  # The file and everything it includes
+    stamps: _Stamps
+    digest: str  # Hash of all source contents and the overrides
+    data: dict[str, Any]  # Merged, unvalidated data
+    config: InstrumentConfig
+    changed: set[str] = field(default_factory=set)  # Sections changed by the last reload
+
+
+class ConfigCache:
+    """Parses, merges and validates config files once per change."""
+    
+    def __init__(self, snapshot_dir: Path | str | None = None) -> None:
+        """Initialize config cache.
+        
+        Args:
+            snapshot_dir: Directory for pickled snapshots of validated configs
+                (None keeps the cache in memory only).
+        """
+        self._snapshot_dir = Path(snapshot_dir) if snapshot_dir is not None else None
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._parses = 0
+        self._snapshot_hits = 0
+    
+    def load(self, path: Path | str, overrides: dict[str, Any] | None = None) -> InstrumentConfig:
+        """Load a validated config.
+        
+        The returned model is shared between callers; treat it as read-only
+        (use model_copy(deep=True) or InstrumentConfig.from_file() for a
+        private copy).
+        
+        Args:
+            path: Config file.
+            overrides: Values merged over the file contents.
+        
+        Returns:
+            Validated config.
+        """
+        return self._entry(path, overrides).config
+    
+    def load_data(self, path: Path | str, overrides: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Load the merged, unvalidated config data (read-only, shared)."""
+        return self._entry(path, overrides).data
+    
+    def is_stale(self, path: Path | str, overrides: dict[str, Any] | None = None) -> bool:
+        """Check if the file or any include changed since it was last loaded."""
+        entry = self._entries.get(_key(path, overrides))
+        return entry is None or _stat(entry.sources) != entry.stamps
+    
+    def sources(self, path: Path | str, overrides: dict[str, Any] | None = None) -> list[Path]:
+        """Files the cached config was merged from (just the file if not loaded)."""
+        entry = self._entries.get(_key(path, overrides))
+        return list(entry.sources) if entry is not None else [Path(path).resolve()]
+    
+    def changed_sections(self, path: Path | str, overrides: dict[str, Any] | None = None) -> set[str]:
+        """Top-level sections that differed at the last reload."""
+        entry = self._entries.get(_key(path, overrides))
+        return set(entry.changed) if entry is not None else set()
+    
+    def clear(self) -> None:
+        """Drop all in-memory entries (snapshots on disk are kept)."""
+        with self._lock:
+            self._entries.clear()
+    
+    @property
+    def stats(self) -> dict[str, int]:
+        """Number of cache hits, YAML parses and snapshot loads."""
+        return {"hits": self._hits, "parses": self._parses, "snapshot_hits": self._snapshot_hits}
+    
+    def _entry(self, path: Path | str, overrides: dict[str, Any] | None) -> _Entry:
+        """Get an up-to-date entry, doing only as much work as changed."""
+        path = Path(path).resolve()
+        key = _key(path, overrides)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stamps = _stat(entry.sources)
+                if stamps == entry.stamps:
+                    self._hits += 1
+                    return entry
+                # Touched but possibly unchanged: compare contents before parsing
+                digest = _digest(entry.sources, key[1])
+                if digest == entry.digest:
+                    entry.stamps = stamps
+                    entry.changed = set()
+                    self._hits += 1
+                    return entry
+            new_entry = self._snapshot_load(path, key) if entry is None else None
+            if new_entry is None:
+                new_entry = self._parse(path, overrides, key, entry)
+                self._snapshot_save(path, key, new_entry)
+            self._entries[key] = new_entry
+            return new_entry
+    
+    def _parse(self, path: Path, overrides: dict[str, Any] | None, key: tuple[str, str], previous: _Entry | None) -> _Entry:
+        """Parse and merge the file with its includes, then validate."""
+        if not path.exists():
+            raise FileNotFoundError(f"Config file not found: {path}")
+        loaded: list[tuple[Path, tuple[str, int, int], bytes]] = []
+        data = _load_with_includes(path, loaded, ())
+        if overrides:
+            data = merge(data, overrides)
+        self._parses += 1
+        sources = [source for source, _, _ in loaded]
+        stamps = tuple(stamp for _, stamp, _ in loaded)
+        digest = _hash((content for _, _, content in loaded), key[1])
+        if previous is None:
+            return _Entry(sources, stamps, digest, data, InstrumentConfig.model_validate(data))
+        changed = {name for name in previous.data.keys() | data.keys() if previous.data.get(name) != data.get(name)}
+        return _Entry(sources, stamps, digest, data, _revalidate(previous.config, data, changed), changed)
+    
+    def _snapshot_path(self, path: Path, key: tuple[str, str]) -> Path | None:
+        """Snapshot file for the current contents of the top-level file."""
+        if self._snapshot_dir is None:
+            return None
+        digest = hashlib.sha256(f"{_schema_id()}\0{key}".encode())
+        digest.update(path.read_bytes())
+        return self._snapshot_dir / f"{digest.hexdigest()}.pickle"
+    
+    def _snapshot_load(self, path: Path, key: tuple[str, str]) -> _Entry | None:
+        """Load a snapshot if one exists and all its sources are unchanged."""
+        if self._snapshot_dir is None or not path.exists():
+            return None
+        snapshot_path = self._snapshot_path(path, key)
+        if not snapshot_path.exists():
+            return None
+        try:
+            with open(snapshot_path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            logger.warning("Ignoring unreadable config snapshot %s", snapshot_path, exc_info=True)
+            return None
+        # The top-level file is part of the snapshot name; includes are checked here
+        if _digest(entry.sources, key[1]) != entry.digest:
+            return None
+        entry.stamps = _stat(entry.sources)
+        self._snapshot_hits += 1
+        return entry
+    
+    def _snapshot_save(self, path: Path, key: tuple[str, str], entry: _Entry) -> None:
+        """Pickle a freshly validated entry (best effort)."""
+        if self._snapshot_dir is None:
+            return
+        try:
+            self._snapshot_dir.mkdir(parents=True, exist_ok=True)
+            snapshot_path = self._snapshot_path(path, key)
+            temp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, snapshot_path)
+        except OSError:
+            logger.warning("Could not write config snapshot to %s", self._snapshot_dir, exc_info=True)
+
+
+class ConfigWatcher:
+    """Polls a config file and its includes, reloading on change.
+    
+    Only sections that changed are revalidated; the callback receives the
+    new config and the names of the changed sections. A file that fails to
+    load is logged and ignored until it changes again.
+    """
+    
+    def __init__(
+        self,
+        path: Path | str,
+        on_change: Callable[[InstrumentConfig, set[str]], None],
+        cache: ConfigCache | None = None,
+        interval_s: float = 1.0,
+    ) -> None:
+        """Initialize config watcher.
+        
+        Args:
+            path: Config file.
+            on_change: Called from the watcher thread with the new config and
+                the changed top-level sections.
+            cache: Cache to load through (default: the shared cache).
+            interval_s: Polling interval in seconds.
+        """
+        self._path = Path(path)
+        self._on_change = on_change
+        self._cache = cache if cache is not None else default_cache
+        self._interval_s = interval_s
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stamps: _Stamps = ()
+    
+    def start(self) -> InstrumentConfig:
+        """Load the config and start watching it.
+        
+        Returns:
+            The current config.
+        """
+        config = self._cache.load(self._path)
+        self._stamps = _stat(self._cache.sources(self._path))
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        return config
+    
+    def stop(self) -> None:
+        """Stop watching."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self) -> None:
+        """Reload whenever the source files' stamps change."""
+        while not self._stop_event.wait(self._interval_s):
+            stamps = _stat(self._cache.sources(self._path))
+            if stamps == self._stamps:
+                continue
+            self._stamps = stamps
+            try:
+                config = self._cache.load(self._path)
+                # Includes may have been added or removed
+                self._stamps = _stat(self._cache.sources(self._path))
+                changed = self._cache.changed_sections(self._path)
+                if changed:
+                    logger.info("Config %s reloaded; changed sections: %s", self._path, sorted(changed))
+                    self._on_change(config, changed)
+            except Exception:
+                logger.exception("Config reload of %s failed; keeping the previous config", self._path)
+
+
+# Shared by InstrumentConfig.from_file()
+default_cache = ConfigCache()
+
+_section_adapters: dict[str, TypeAdapter] = {}
+_schema: str | None = None
+
+
+def _load_with_includes(
+    path: Path,
+    loaded: list[tuple[Path, tuple[str, int, int], bytes]],
+    chain: tuple[Path, ...],
+) -> dict[str, Any]:
+    """Parse a file, merging its includes underneath it.
+    
+    Each file is stamped before it is read, so a change during loading
+    shows up as stale on the next load instead of being missed.
+    """
+    if path in chain:
+        raise ValueError(f"Circular config include: {' -> '.join(str(p) for p in (*chain, path))}")
+    [stamp] = _stat([path])
+    content = path.read_bytes()
+    data = yaml.load(content, Loader=_YAML_LOADER) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"Config file {path} must contain a mapping")
+    loaded.append((path, stamp, content))
+    includes = data.pop("include", None) or []
+    if isinstance(includes, str):
+        includes = [includes]
+    merged: dict[str, Any] = {}
+    for include in includes:
+        include_path = (path.parent / include).resolve()
+        if not include_path.exists():
+            raise FileNotFoundError(f"Config include not found: {include_path} (from {path})")
+        merged = merge(merged, _load_with_includes(include_path, loaded, (*chain, path)))
+    return merge(merged, data)
+
+
+def _revalidate(previous: InstrumentConfig, data: dict[str, Any], changed: set[str]) -> InstrumentConfig:
+    """Validate only the changed top-level sections, reusing the rest."""
+    fields = InstrumentConfig.model_fields
+    if not changed:
+        return previous
+    if not changed <= fields.keys() or any(name not in data for name in changed):
+        # Unknown or removed sections: fall back to full validation
+        return InstrumentConfig.model_validate(data)
+    update = {}
+    for name in changed:
+        if name not in _section_adapters:
+            _section_adapters[name] = TypeAdapter(fields[name].annotation)
+        update[name] = _section_adapters[name].validate_python(data[name])
+    return previous.model_copy(update=update)
+
+
+def _key(path: Path | str, overrides: dict[str, Any] | None) -> tuple[str, str]:
+    """Cache key: resolved path and canonical overrides."""
+    return str(Path(path).resolve()), json.dumps(overrides or {}, sort_keys=True, default=str)
+
+
+def _stat(sources: list[Path]) -> _Stamps:
+    """mtime and size of each source file (-1 if missing)."""
+    stamps = []
+    for source in sources:
+        try:
+            stat = source.stat()
+            stamps.append((str(source), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamps.append((str(source), -1, -1))
+    return tuple(stamps)
+
+
+def _digest(sources: list[Path], overrides_key: str) -> str:
+    """Hash of the current contents of the source files and the overrides."""
+    def contents() -> Iterator[bytes]:
+        for source in sources:
+            try:
+                yield source.read_bytes()
+            except FileNotFoundError:
+                yield b"\0missing"
+    return _hash(contents(), overrides_key)
+
+
+def _hash(contents: Iterable[bytes], overrides_key: str) -> str:
+    """Hash of file contents and the overrides."""
+    digest = hashlib.sha256(overrides_key.encode())
+    for content in contents:
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+
+def _schema_id() -> str:
+    """Identifies the config models, so snapshots from other versions are ignored."""
+    global _schema
+    if _schema is None:
+        source = Path(inspect.getsourcefile(InstrumentConfig)).read_bytes()
+        _schema = hashlib.sha256(source + pydantic.VERSION.encode()).hexdigest()
+    return _schema
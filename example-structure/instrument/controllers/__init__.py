@@ -1,7 +1,40 @@
-"""Controllers for experiment and live view logic."""
+"""Controllers for experiment and live view logic.
 
-from .experiment_controller import ExperimentController
-from .live_controller import LiveController
+Controllers are imported on first access, so importing one does not pull
+in the others (and their dependencies).
+"""
 
-__all__ = ["LiveController", "ExperimentController"]
+from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+from instrument._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .acquisition import AcquisitionEngine
+    from .batch import BatchRunner
+    from .experiment_controller import ExperimentController
+    from .live_controller import LiveController
+    from .multi_camera import MultiCameraController
+    from .protocol import Protocol, ProtocolRunner
+
+__all__ = [
+    "LiveController",
+    "ExperimentController",
+    "MultiCameraController",
+    "AcquisitionEngine",
+    "BatchRunner",
+    "Protocol",
+    "ProtocolRunner",
+]
+
+# Exported name -> defining submodule
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "AcquisitionEngine": ".acquisition",
+    "BatchRunner": ".batch",
+    "ExperimentController": ".experiment_controller",
+    "LiveController": ".live_controller",
+    "MultiCameraController": ".multi_camera",
+    "Protocol": ".protocol",
+    "ProtocolRunner": ".protocol",
+})
@@ -0,0 +1,451 @@
+"""Acquisition engine.
+
+Grabs camera frames on a background thread into a preallocated ring buffer
+and drains them to storage on one or more writer threads, so slow disk writes
+never stall the camera.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from instrument.controllers.scheduler import FrameScheduler
+from instrument.devices.base import Camera
+from instrument.metrics import Metrics
+
+# Called by writer threads as sink(frame, frame_number, timestamp_s).
+# The frame is a view into the ring buffer and is only valid during the call.
+FrameSink = Callable[[np.ndarray, int, float], None]
+
+
+class FramePool:
+    """Pool of preallocated frame buffers.
+    
+    Hands out reusable arrays for Camera.grab_frame_into() and takes them
+    back when the consumer is done, so long sessions do not allocate a new
+    frame per grab.
+    """
+    
+    def __init__(self, size: int, shape: tuple[int, ...], dtype: np.dtype | type = np.uint16) -> None:
+        """Initialize frame pool.
+        
+        Args:
+            size: Number of buffers in the pool.
+            shape: Shape of a single frame.
+            dtype: Pixel data type.
+        """
+        if size < 1:
+            raise ValueError(f"Invalid pool size: {size}")
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        self._size = size
+        self._free: queue.Queue[np.ndarray] = queue.Queue()
+        for _ in range(size):
+            self._free.put(np.zeros(self._shape, dtype=self._dtype))
+    
+    def acquire(self, timeout: float | None = None) -> np.ndarray | None:
+        """Take a buffer from the pool.
+        
+        Args:
+            timeout: Maximum time to wait in seconds (None waits forever).
+        
+        Returns:
+            Frame buffer, or None if none became free in time.
+        """
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def release(self, frame: np.ndarray) -> None:
+        """Return a buffer to the pool.
+        
+        Args:
+            frame: Buffer previously returned by acquire().
+        """
+        if frame.shape != self._shape or frame.dtype != self._dtype:
+            raise ValueError(f"Frame {frame.shape}/{frame.dtype} does not belong to this pool")
+        self._free.put(frame)
+    
+    @property
+    def size(self) -> int:
+        """Total number of buffers in the pool."""
+        return self._size
+    
+    @property
+    def available(self) -> int:
+        """Number of buffers currently in the pool."""
+        return self._free.qsize()
+
+
+class FrameRingBuffer:
+    """Fixed-size ring buffer of preallocated frames.
+    
+    Slot indices cycle between a free queue and a filled queue, so frame
+    memory is allocated once and reused for the whole run.
+    """
+    
+    def __init__(self, capacity: int, shape: tuple[int, ...], dtype: np.dtype | type = np.uint16) -> None:
+        """Initialize ring buffer.
+        
+        Args:
+            capacity: Number of frame slots.
+            shape: Shape of a single frame.
+            dtype: Pixel data type (uint16 for MONO12 cameras).
+        """
+        if capacity < 1:
+            raise ValueError(f"Invalid buffer capacity: {capacity}")
+        self.frames = np.zeros((capacity, *shape), dtype=dtype)
+        self.frame_numbers = np.full(capacity, -1, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self._capacity = capacity
+        self._free: queue.Queue[int] = queue.Queue()
+        self._filled: queue.Queue[int] = queue.Queue()
+        self._lock = threading.Lock()
+        self._fill_level = 0
+        self._high_water_mark = 0
+        for slot in range(capacity):
+            self._free.put(slot)
+    
+    def acquire_slot(self) -> int | None:
+        """Take a free slot for writing.
+        
+        Returns:
+            Slot index, or None if the buffer is full.
+        """
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+    
+    def commit(self, slot: int, frame_number: int, timestamp: float) -> None:
+        """Mark a slot as filled and hand it to the consumers.
+        
+        Args:
+            slot: Slot index returned by acquire_slot().
+            frame_number: Frame number of the data in the slot.
+            timestamp: Acquisition timestamp in seconds.
+        """
+        self.frame_numbers[slot] = frame_number
+        self.timestamps[slot] = timestamp
+        with self._lock:
+            self._fill_level += 1
+            self._high_water_mark = max(self._high_water_mark, self._fill_level)
+        self._filled.put(slot)
+    
+    def next_filled(self, timeout: float | None = None) -> int | None:
+        """Wait for the next filled slot.
+        
+        Args:
+            timeout: Maximum time to wait in seconds (None waits forever).
+        
+        Returns:
+            Slot index, or None on timeout or once finish() has been reached.
+        """
+        try:
+            slot = self._filled.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return slot if slot >= 0 else None
+    
+    def release(self, slot: int) -> None:
+        """Return a consumed slot to the free queue.
+        
+        Args:
+            slot: Slot index returned by next_filled().
+        """
+        with self._lock:
+            self._fill_level -= 1
+        self._free.put(slot)
+    
+    def finish(self, num_consumers: int = 1) -> None:
+        """Signal consumers that no more frames will be committed.
+        
+        Args:
+            num_consumers: Number of consumers waiting on next_filled().
+        """
+        for _ in range(num_consumers):
+            self._filled.put(-1)
+    
+    @property
+    def capacity(self) -> int:
+        """Number of frame slots."""
+        return self._capacity
+    
+    @property
+    def fill_level(self) -> int:
+        """Number of filled slots waiting to be consumed."""
+        return self._fill_level
+    
+    @property
+    def high_water_mark(self) -> int:
+        """Highest fill level seen so far."""
+        return self._high_water_mark
+
+
+@dataclass
+class AcquisitionStats:
+    """Statistics of an acquisition run."""
+    
+    frames_acquired: int = 0
+    frames_written: int = 0
+    frames_dropped: int = 0
+    frames_late: int = 0
+    frames_skipped: int = 0
+    high_water_mark: int = 0
+    buffer_capacity: int = 0
+    frame_bytes: int = 0  # Size of one raw frame
+    elapsed_s: float = 0.0
+    
+    @property
+    def fps(self) -> float:
+        """Average acquisition rate in frames per second."""
+        if self.elapsed_s <= 0:
+            return 0.0
+        return self.frames_acquired / self.elapsed_s
+    
+    @property
+    def write_mb_s(self) -> float:
+        """Average rate of raw frame data handed to the sink in MB/s."""
+        if self.elapsed_s <= 0:
+            return 0.0
+        return self.frames_written * self.frame_bytes / self.elapsed_s / 1e6
+
+
+class AcquisitionEngine:
+    """Producer/consumer acquisition engine.
+    
+    A grab thread fills a FrameRingBuffer; writer threads drain it into a
+    sink. If the writers fall behind and the buffer is full, frames are
+    dropped and counted rather than stalling the camera.
+    """
+    
+    def __init__(
+        self,
+        camera: Camera,
+        buffer_size: int = 64,
+        num_writers: int = 1,
+        metrics: Metrics | None = None,
+    ) -> None:
+        """Initialize acquisition engine.
+        
+        Args:
+            camera: Camera device.
+            buffer_size: Number of frames in the ring buffer.
+            num_writers: Number of writer threads. The sink must be
+                thread-safe when this is greater than one.
+            metrics: Records grab and sink latencies and frame counters
+                (None disables timing).
+        """
+        if num_writers < 1:
+            raise ValueError(f"Invalid number of writers: {num_writers}")
+        self._camera = camera
+        self._buffer_size = buffer_size
+        self._num_writers = num_writers
+        self._buffer: FrameRingBuffer | None = None
+        self._stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats = AcquisitionStats()
+        self._start_ns = 0
+        self._error: BaseException | None = None
+        self._metrics = metrics
+    
+    def start(
+        self,
+        sink: FrameSink,
+        num_frames: int | None = None,
+        scheduler: FrameScheduler | None = None,
+        start_ns: int | None = None,
+        armed: threading.Event | None = None,
+    ) -> None:
+        """Start acquisition in the background.
+        
+        Args:
+            sink: Callable receiving each frame on a writer thread.
+            num_frames: Number of frames to grab (None runs until stop()).
+                With a scheduler, skipped deadlines count towards this.
+            scheduler: Frame scheduler for timed acquisition (None runs free).
+            start_ns: Run start from time.perf_counter_ns() that timestamps
+                and deadlines are relative to (default: now). Engines given
+                the same start share one time base.
+            armed: Grabbing waits for this event after the sizing grab,
+                e.g. until every camera on a shared trigger line is armed.
+        """
+        if self.is_running:
+            raise RuntimeError("Acquisition already running")
+        # Grab one frame up front to size the buffer; it is not part of the run
+        first_frame = np.asarray(self._camera.grab_frame())
+        self._start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        if scheduler is not None:
+            scheduler.start(self._start_ns)
+        self._buffer = FrameRingBuffer(self._buffer_size, first_frame.shape, first_frame.dtype)
+        self._stats = AcquisitionStats(buffer_capacity=self._buffer_size, frame_bytes=first_frame.nbytes)
+        self._stop_event.clear()
+        self._error = None
+        
+        self._threads = [
+            threading.Thread(
+                target=self._grab_loop,
+                args=(first_frame, num_frames, scheduler, armed),
+                name="acquisition-grab",
+                daemon=True,
+            )
+        ]
+        for i in range(self._num_writers):
+            self._threads.append(
+                threading.Thread(
+                    target=self._write_loop,
+                    args=(sink,),
+                    name=f"acquisition-writer-{i}",
+                    daemon=True,
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self) -> None:
+        """Request the grab thread to stop; buffered frames are still written."""
+        self._stop_event.set()
+    
+    def wait(self, timeout: float | None = None) -> AcquisitionStats:
+        """Wait for acquisition to finish and all frames to be written.
+        
+        Args:
+            timeout: Maximum time to wait per thread in seconds.
+        
+        Returns:
+            Statistics of the run.
+        """
+        for thread in self._threads:
+            thread.join(timeout)
+        if self._error is not None:
+            raise self._error
+        return self.stats
+    
+    def wait_grabbed(self, timeout: float | None = None) -> None:
+        """Wait until the grab thread is done; writers may still be saving.
+        
+        The camera is free again once this returns.
+        
+        Args:
+            timeout: Maximum time to wait in seconds.
+        """
+        if self._threads:
+            self._threads[0].join(timeout)
+    
+    def run(
+        self,
+        sink: FrameSink,
+        num_frames: int,
+        scheduler: FrameScheduler | None = None,
+    ) -> AcquisitionStats:
+        """Acquire a fixed number of frames and block until they are written.
+        
+        Args:
+            sink: Callable receiving each frame on a writer thread.
+            num_frames: Number of frames to grab.
+            scheduler: Frame scheduler for timed acquisition (None runs free).
+        
+        Returns:
+            Statistics of the run.
+        """
+        self.start(sink, num_frames, scheduler)
+        return self.wait()
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if any acquisition thread is still alive."""
+        return any(thread.is_alive() for thread in self._threads)
+    
+    @property
+    def stats(self) -> AcquisitionStats:
+        """Snapshot of the current run statistics."""
+        with self._lock:
+            stats = AcquisitionStats(**self._stats.__dict__)
+        if self._buffer is not None:
+            stats.high_water_mark = self._buffer.high_water_mark
+        return stats
+    
+    def _grab_loop(
+        self,
+        first_frame: np.ndarray,
+        num_frames: int | None,
+        scheduler: FrameScheduler | None,
+        armed: threading.Event | None,
+    ) -> None:
+        """Grab frames into the ring buffer until done or stopped."""
+        buffer = self._buffer
+        metrics = self._metrics if self._metrics is not None and self._metrics.enabled else None
+        # Frames are still grabbed when the buffer is full, to keep the
+        # camera's pace, but go into a scratch frame and are dropped
+        scratch = first_frame
+        frame_number = 0
+        try:
+            while armed is not None and not armed.wait(0.05):
+                if self._stop_event.is_set():
+                    return
+            while not self._stop_event.is_set():
+                if scheduler is not None:
+                    frame_number = scheduler.wait_next(self._stop_event)
+                    if frame_number is None:
+                        break
+                if num_frames is not None and frame_number >= num_frames:
+                    break
+                slot = buffer.acquire_slot()
+                grab_start_ns = time.perf_counter_ns()
+                self._camera.grab_frame_into(scratch if slot is None else buffer.frames[slot])
+                timestamp_ns = time.perf_counter_ns()
+                if metrics is not None:
+                    metrics.observe("camera.grab_frame", (timestamp_ns - grab_start_ns) / 1e9)
+                    metrics.increment("frames_acquired")
+                
+                if slot is None:
+                    with self._lock:
+                        self._stats.frames_dropped += 1
+                    if metrics is not None:
+                        metrics.increment("frames_dropped")
+                else:
+                    buffer.commit(slot, frame_number, (timestamp_ns - self._start_ns) / 1e9)
+                if scheduler is not None:
+                    scheduler.record(frame_number, timestamp_ns)
+                with self._lock:
+                    self._stats.frames_acquired += 1
+                    self._stats.elapsed_s = (timestamp_ns - self._start_ns) / 1e9
+                    if scheduler is not None:
+                        self._stats.frames_late = scheduler.late_frames
+                        self._stats.frames_skipped = scheduler.skipped_frames
+                frame_number += 1
+        except BaseException as exc:  # re-raised from wait()
+            self._error = exc
+        finally:
+            buffer.finish(self._num_writers)
+    
+    def _write_loop(self, sink: FrameSink) -> None:
+        """Drain filled slots into the sink."""
+        buffer = self._buffer
+        metrics = self._metrics if self._metrics is not None and self._metrics.enabled else None
+        while True:
+            slot = buffer.next_filled()
+            if slot is None:
+                return
+            try:
+                if self._error is None:
+                    sink_start_ns = time.perf_counter_ns()
+                    sink(buffer.frames[slot], int(buffer.frame_numbers[slot]), float(buffer.timestamps[slot]))
+                    if metrics is not None:
+                        metrics.observe("acquisition.sink", (time.perf_counter_ns() - sink_start_ns) / 1e9)
+                        metrics.increment("frames_written")
+                    with self._lock:
+                        self._stats.frames_written += 1
+            except BaseException as exc:  # re-raised from wait()
+                self._error = exc
+                self._stop_event.set()
+            finally:
+                buffer.release(slot)
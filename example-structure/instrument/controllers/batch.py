@@ -0,0 +1,328 @@
+"""Batch acquisition.
+
+Runs many conditions (flow rate x valve channel x exposure) back to back
+into one dataset. Conditions are reordered to minimize device transitions,
+and each condition's setup overlaps with saving the previous one: two
+acquisition engines alternate, so while one drains its frames to disk the
+devices are already moving to the next condition.
+"""
+
+from __future__ import annotations
+
+import csv
+import itertools
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from instrument.config import ExperimentConfig
+from instrument.controllers.acquisition import AcquisitionEngine, AcquisitionStats, FrameSink
+from instrument.controllers.reduction import FrameReducer
+from instrument.controllers.scheduler import FrameScheduler
+from instrument.controllers.sensor_controller import SensorController
+from instrument.devices.base import Camera, Pump, Valve
+from instrument.metrics import Metrics
+from instrument.storage import FrameWriter, create_writer
+
+
+@dataclass
+class BatchCondition:
+    """Device settings and timing of one condition."""
+    
+    flow_rate_ul_min: float
+    duration_s: float
+    frame_interval_s: float = 1.0
+    valve_channel: int | None = None  # None leaves the valve alone
+    exposure_ms: float | None = None  # None leaves the exposure alone
+    
+    @property
+    def num_frames(self) -> int:
+        """Number of frames acquired for this condition."""
+        return int(self.duration_s / self.frame_interval_s)
+
+
+@dataclass
+class ConditionRecord:
+    """Where one condition ended up in the dataset."""
+    
+    index: int  # Position in the requested condition list
+    order: int  # Position in the executed sequence
+    condition: BatchCondition
+    first_frame: int  # Dataset frame number of the condition's frame 0
+    num_stored: int  # Frames the condition adds to the dataset (after decimation)
+    start_s: float  # Acquisition start since the batch start
+    stats: AcquisitionStats | None = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch run."""
+    
+    records: list[ConditionRecord] = field(default_factory=list)
+    transitions: dict[str, int] = field(default_factory=lambda: {"valve": 0, "flow": 0, "exposure": 0})
+    elapsed_s: float = 0.0
+
+
+def condition_grid(
+    flow_rates_ul_min: Iterable[float],
+    duration_s: float,
+    frame_interval_s: float = 1.0,
+    valve_channels: Iterable[int | None] = (None,),
+    exposures_ms: Iterable[float | None] = (None,),
+) -> list[BatchCondition]:
+    """Build every combination of flow rate, valve channel and exposure.
+    
+    Args:
+        flow_rates_ul_min: Flow rates.
+        duration_s: Acquisition time per condition.
+        frame_interval_s: Time between frames.
+        valve_channels: Valve channels (None leaves the valve alone).
+        exposures_ms: Exposure times (None leaves the exposure alone).
+    
+    Returns:
+        Conditions in grid order (valve, exposure, flow).
+    """
+    return [
+        BatchCondition(flow, duration_s, frame_interval_s, channel, exposure)
+        for channel, exposure, flow in itertools.product(valve_channels, exposures_ms, flow_rates_ul_min)
+    ]
+
+
+def order_conditions(conditions: list[BatchCondition]) -> list[int]:
+    """Order conditions to minimize device transitions.
+    
+    Conditions are grouped by valve channel (slowest to settle), then by
+    exposure; within a group flow rates are sorted, alternating between
+    ascending and descending so consecutive groups continue from a nearby
+    flow rate instead of jumping back.
+    
+    Args:
+        conditions: Conditions in requested order.
+    
+    Returns:
+        Indexes into conditions, in execution order.
+    """
+    groups: dict[tuple, list[int]] = {}
+    for index, condition in enumerate(conditions):
+        groups.setdefault((condition.valve_channel, condition.exposure_ms), []).append(index)
+    
+    def group_key(key: tuple) -> tuple:
+        # None (leave device alone) sorts first
+        return tuple((value is not None, value or 0) for value in key)
+    
+    order: list[int] = []
+    for position, key in enumerate(sorted(groups, key=group_key)):
+        order.extend(sorted(
+            groups[key],
+            key=lambda i: conditions[i].flow_rate_ul_min,
+            reverse=position % 2 == 1,
+        ))
+    return order
+
+
+class BatchRunner:
+    """Runs a list of conditions into one dataset."""
+    
+    def __init__(
+        self,
+        camera: Camera,
+        pump: Pump,
+        valve: Valve | None = None,
+        config: ExperimentConfig | None = None,
+        sensors: SensorController | None = None,
+        settle_s: float = 0.0,
+        buffer_size: int = 64,
+        num_writers: int = 1,
+        metrics: Metrics | None = None,
+        reducer: FrameReducer | None = None,
+    ) -> None:
+        """Initialize batch runner.
+        
+        As in single runs, only every config.decimation-th frame of each
+        condition is stored.
+        
+        Args:
+            camera: Camera device.
+            pump: Pump device.
+            valve: Valve device (needed for conditions with a valve channel).
+            config: Experiment configuration (storage format etc.).
+            sensors: Sensor controller; its samples are saved with the batch.
+            settle_s: Wait after a valve or flow change before acquiring.
+            buffer_size: Number of frames in each acquisition ring buffer.
+            num_writers: Number of storage writer threads per engine.
+            metrics: Records acquisition latencies.
+            reducer: ROI/binning stage applied before frames are stored.
+        """
+        self._camera = camera
+        self._pump = pump
+        self._valve = valve
+        self._config = config or ExperimentConfig()
+        self._sensors = sensors
+        self._settle_s = settle_s
+        self._reducer = reducer if reducer is not None and not reducer.is_identity else None
+        # Two engines: one saves the previous condition while the other acquires
+        self._engines = [AcquisitionEngine(camera, buffer_size, num_writers, metrics) for _ in range(2)]
+        self._writer: FrameWriter | None = None
+        self._exposure_ms: float | None = None  # Cameras have no exposure getter
+    
+    def run(
+        self,
+        conditions: list[BatchCondition],
+        save_path: Path | None = None,
+        reorder: bool = True,
+    ) -> BatchResult:
+        """Acquire all conditions.
+        
+        Args:
+            conditions: Conditions to run.
+            save_path: Directory for the dataset (None disables saving).
+            reorder: Reorder conditions to minimize device transitions.
+        
+        Returns:
+            Per-condition frame ranges, statistics and transition counts.
+        """
+        if any(c.valve_channel is not None for c in conditions) and self._valve is None:
+            raise ValueError("Conditions set a valve channel but no valve was given")
+        order = order_conditions(conditions) if reorder else list(range(len(conditions)))
+        result = BatchResult()
+        self._open_writer(save_path, sum(self._num_stored(c) for c in conditions))
+        
+        start_sensors = self._sensors is not None and not self._sensors.is_running
+        if start_sensors:
+            self._sensors.start()
+        sensor_start_s = self._sensors.now() if self._sensors is not None else 0.0
+        batch_start = time.perf_counter()
+        running: list[tuple[AcquisitionEngine, ConditionRecord]] = []
+        first_frame = 0
+        try:
+            for position, index in enumerate(order):
+                condition = conditions[index]
+                # Move devices while the previous condition is still saving
+                self._apply(condition, result.transitions)
+                engine = self._engines[position % 2]
+                running = self._finish(running, engine)
+                num_stored = self._num_stored(condition)
+                start_s = time.perf_counter() - batch_start
+                record = ConditionRecord(index, position, condition, first_frame, num_stored, start_s)
+                engine.start(
+                    self._sink(first_frame),
+                    num_frames=condition.num_frames,
+                    scheduler=FrameScheduler(condition.frame_interval_s),
+                )
+                running.append((engine, record))
+                result.records.append(record)
+                engine.wait_grabbed()
+                first_frame += num_stored
+        finally:
+            for engine in self._engines:
+                engine.stop()
+            self._finish(running, None)
+            if start_sensors:
+                self._sensors.stop()
+            result.elapsed_s = time.perf_counter() - batch_start
+            self._close_writer(result, save_path)
+            self._export_sensors(save_path, sensor_start_s)
+        return result
+    
+    def _apply(self, condition: BatchCondition, transitions: dict[str, int]) -> None:
+        """Set the devices for a condition, touching only what changes."""
+        settle = False
+        if condition.valve_channel is not None and condition.valve_channel != self._valve.get_current_channel():
+            self._valve.switch_channel(condition.valve_channel)
+            transitions["valve"] += 1
+            settle = True
+        if condition.flow_rate_ul_min != self._pump.get_flow_rate():
+            self._pump.set_flow_rate(condition.flow_rate_ul_min)
+            transitions["flow"] += 1
+            settle = True
+        if condition.exposure_ms is not None and condition.exposure_ms != self._exposure_ms:
+            self._camera.set_exposure_time(condition.exposure_ms)
+            self._exposure_ms = condition.exposure_ms
+            transitions["exposure"] += 1
+        if settle and self._settle_s > 0:
+            time.sleep(self._settle_s)
+    
+    def _finish(
+        self,
+        running: list[tuple[AcquisitionEngine, ConditionRecord]],
+        engine: AcquisitionEngine | None,
+    ) -> list[tuple[AcquisitionEngine, ConditionRecord]]:
+        """Wait for one engine's condition (or all if engine is None) to be saved.
+        
+        Returns:
+            Conditions still running.
+        """
+        still_running = []
+        for run_engine, record in running:
+            if engine is None or run_engine is engine:
+                record.stats = run_engine.wait()
+            else:
+                still_running.append((run_engine, record))
+        return still_running
+    
+    def _num_stored(self, condition: BatchCondition) -> int:
+        """Frames of a condition kept after decimation."""
+        return -(-condition.num_frames // self._config.decimation)
+    
+    def _sink(self, first_frame: int) -> FrameSink:
+        """Writer callback placing a condition's reduced, decimated frames at its dataset offset."""
+        decimation = self._config.decimation
+        
+        def sink(frame: np.ndarray, frame_number: int, _timestamp: float) -> None:
+            if self._writer is None:
+                return
+            stored_number, remainder = divmod(frame_number, decimation)
+            if remainder:
+                return
+            if self._reducer is not None:
+                frame = self._reducer.apply(frame)
+            self._writer.write_frame(frame, first_frame + stored_number)
+        return sink
+    
+    def _open_writer(self, save_path: Path | None, num_frames: int) -> None:
+        """Open one dataset for the whole batch."""
+        self._writer = None
+        if save_path is None:
+            return
+        save_path.mkdir(parents=True, exist_ok=True)
+        writer = create_writer(self._config)
+        writer.open(save_path / f"frames{writer.extension}", num_frames)
+        self._writer = writer
+    
+    def _close_writer(self, result: BatchResult, save_path: Path | None) -> None:
+        """Finalize the dataset with the per-condition index."""
+        if self._writer is None:
+            return
+        rows = [_index_row(record) for record in result.records]
+        self._writer.close({"conditions": rows, "transitions": result.transitions})
+        self._writer = None
+        columns = [key for key in rows[0] if key != "stats"] if rows else ["index"]
+        with open(save_path / "conditions.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    
+    def _export_sensors(self, save_path: Path | None, start_s: float) -> None:
+        """Export the sensor samples recorded during the batch."""
+        if self._sensors is None or save_path is None or not self._sensors.names:
+            return
+        self._sensors.export_run(save_path, self._config.sensor_export_format, start_s)
+
+
+def _index_row(record: ConditionRecord) -> dict:
+    """Flatten a condition record for metadata and the CSV index."""
+    return {
+        "index": record.index,
+        "order": record.order,
+        **asdict(record.condition),
+        "first_frame": record.first_frame,
+        "num_frames": record.condition.num_frames,
+        "num_stored": record.num_stored,
+        "start_s": round(record.start_s, 6),
+        "frames_written": record.stats.frames_written if record.stats else 0,
+        "frames_dropped": record.stats.frames_dropped if record.stats else 0,
+        "stats": asdict(record.stats) if record.stats else None,
+    }
@@ -0,0 +1,211 @@
+"""Online droplet detection.
+
+Finds bright droplets (or particles) in each frame while it is acquired:
+background subtraction, a fixed threshold and connected-component
+labelling, all vectorized with NumPy/SciPy. Per-frame counts and
+per-droplet positions and sizes are collected into a compact table that is
+saved next to the dataset.
+"""
+
+from __future__ import annotations
+
+import csv
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from scipy import ndimage  # type: ignore
+
+
+@dataclass
+class FrameDetections:
+    """Droplets found in one frame."""
+    
+    frame_number: int
+    timestamp_s: float
+    y: np.ndarray  # Centroid rows
+    x: np.ndarray  # Centroid columns
+    area_px: np.ndarray
+    
+    @property
+    def count(self) -> int:
+        """Number of droplets."""
+        return len(self.area_px)
+
+
+class DropletDetector:
+    """Background-subtracting threshold detector.
+    
+    The background is the per-pixel median of the first background_frames
+    frames (moving droplets drop out of the median), then follows slow
+    changes with an exponential average over pixels without droplets.
+    Frames seen while the background is being built report no droplets.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = 500.0,
+        min_area_px: int = 10,
+        background_frames: int = 8,
+        background_alpha: float = 0.02,
+    ) -> None:
+        """Initialize droplet detector.
+        
+        Args:
+            threshold: Minimum brightness above background of droplet pixels.
+            min_area_px: Smaller components are treated as noise.
+            background_frames: Frames used for the initial median background.
+            background_alpha: Weight of each new frame in the background update.
+        """
+        if background_frames < 1:
+            raise ValueError(f"Invalid background_frames: {background_frames}")
+        self._threshold = threshold
+        self._min_area_px = min_area_px
+        self._background_frames = background_frames
+        self._background_alpha = background_alpha
+        self._lock = threading.Lock()
+        self._startup: list[np.ndarray] = []
+        self._background: np.ndarray | None = None
+    
+    def detect(self, frame: np.ndarray, frame_number: int = 0, timestamp_s: float = 0.0) -> FrameDetections:
+        """Find droplets in a frame.
+        
+        Thread-safe; several writer threads may call this concurrently.
+        
+        Args:
+            frame: 2D frame.
+            frame_number: Frame number stored with the result.
+            timestamp_s: Frame timestamp stored with the result.
+        
+        Returns:
+            Droplet centroids and areas.
+        """
+        with self._lock:
+            background = self._background
+            if background is None:
+                self._startup.append(frame.astype(np.float32))
+                if len(self._startup) == self._background_frames:
+                    self._background = np.median(np.stack(self._startup), axis=0).astype(np.float32)
+                    self._startup = []
+                return _empty(frame_number, timestamp_s)
+        
+        foreground = np.subtract(frame, background, dtype=np.float32)
+        mask = foreground > self._threshold
+        labels, num_labels = ndimage.label(mask)
+        self._update_background(frame, mask)
+        if num_labels == 0:
+            return _empty(frame_number, timestamp_s)
+        
+        # Areas and centroids of all components from the (sparse) droplet pixels
+        rows, cols = np.nonzero(mask)
+        pixel_labels = labels[rows, cols]
+        area = np.bincount(pixel_labels, minlength=num_labels + 1)[1:]
+        y = np.bincount(pixel_labels, weights=rows, minlength=num_labels + 1)[1:] / area
+        x = np.bincount(pixel_labels, weights=cols, minlength=num_labels + 1)[1:] / area
+        keep = area >= self._min_area_px
+        return FrameDetections(frame_number, timestamp_s, y[keep], x[keep], area[keep])
+    
+    @property
+    def is_ready(self) -> bool:
+        """Check if the background has been built."""
+        return self._background is not None
+    
+    def _update_background(self, frame: np.ndarray, mask: np.ndarray) -> None:
+        """Blend the frame into the background outside droplets.
+        
+        Builds a new array instead of updating in place, so other threads
+        keep subtracting the complete background they took.
+        """
+        if self._background_alpha <= 0:
+            return
+        with self._lock:
+            update = self._background_alpha * (frame - self._background)
+            update[mask] = 0.0
+            self._background = self._background + update
+
+
+class DetectionTable:
+    """Accumulates detections and writes them as a tabular sidecar."""
+    
+    def __init__(self) -> None:
+        """Initialize empty table."""
+        self._lock = threading.Lock()
+        self._frames: list[tuple[int, float, int, int]] = []
+        self._droplets: list[FrameDetections] = []
+    
+    def add(self, detections: FrameDetections, stored_index: int = -1) -> None:
+        """Record the detections of one frame.
+        
+        Args:
+            detections: Result of DropletDetector.detect().
+            stored_index: Index of the frame in the dataset (-1 if not saved).
+        """
+        with self._lock:
+            self._frames.append((detections.frame_number, detections.timestamp_s, detections.count, stored_index))
+            if detections.count:
+                self._droplets.append(detections)
+    
+    def export(self, directory: Path, file_format: str = "parquet", suffix: str = "") -> None:
+        """Write droplet_frames and droplets tables.
+        
+        Args:
+            directory: Output directory.
+            file_format: "parquet" or "csv".
+            suffix: Appended to the file name stems, e.g. "-resume-1".
+        """
+        with self._lock:
+            frames = sorted(self._frames)
+            droplets = sorted(self._droplets, key=lambda d: d.frame_number)
+        counts = [len(d.area_px) for d in droplets]
+        frame_columns = {
+            "frame_number": np.array([f[0] for f in frames], dtype=np.int64),
+            "timestamp_s": np.array([f[1] for f in frames], dtype=np.float64),
+            "droplet_count": np.array([f[2] for f in frames], dtype=np.int32),
+            "stored_index": np.array([f[3] for f in frames], dtype=np.int64),
+        }
+        droplet_columns = {
+            "frame_number": np.repeat([d.frame_number for d in droplets], counts).astype(np.int64),
+            "y": np.concatenate([d.y for d in droplets]) if droplets else np.empty(0),
+            "x": np.concatenate([d.x for d in droplets]) if droplets else np.empty(0),
+            "area_px": np.concatenate([d.area_px for d in droplets]) if droplets else np.empty(0, dtype=np.int64),
+        }
+        _write_table(directory / f"droplet_frames{suffix}.{file_format}", frame_columns)
+        _write_table(directory / f"droplets{suffix}.{file_format}", droplet_columns)
+    
+    @property
+    def num_frames(self) -> int:
+        """Number of frames analyzed."""
+        return len(self._frames)
+    
+    @property
+    def num_droplets(self) -> int:
+        """Total number of droplets found."""
+        return sum(d.count for d in self._droplets)
+
+
+def _empty(frame_number: int, timestamp_s: float) -> FrameDetections:
+    """Detections of a frame without droplets."""
+    empty = np.empty(0)
+    return FrameDetections(frame_number, timestamp_s, empty, empty, np.empty(0, dtype=np.int64))
+
+
+def _write_table(path: Path, columns: dict[str, np.ndarray]) -> None:
+    """Write columns to Parquet or CSV, chosen by the file suffix."""
+    if path.suffix == ".parquet":
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+        
+        pq.write_table(pa.table(columns), path)
+    elif path.suffix == ".csv":
+        # Integers in full, floats (timestamps, positions) to six decimals
+        formatted = [
+            [str(value) if values.dtype.kind in "iu" else f"{value:.6f}" for value in values.tolist()]
+            for values in columns.values()
+        ]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*formatted))
+    else:
+        raise ValueError(f"Unsupported detection table format: {path.suffix}")
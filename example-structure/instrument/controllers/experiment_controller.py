@@ -5,10 +5,27 @@ Handles acquisition loops, flow ramps, time series, and other experimental proto
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import csv
+import threading
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+import numpy as np
+
+from instrument.config import ExperimentConfig
+from instrument.controllers.acquisition import AcquisitionEngine, AcquisitionStats
+from instrument.controllers.reduction import FrameReducer
+from instrument.controllers.scheduler import FrameScheduler, FrameTiming
+from instrument.controllers.sensor_controller import SensorController
+from instrument.controllers.trigger import TriggerCapture, TriggerCriterion, sensor_threshold
 from instrument.devices.base import Camera, Pump
+from instrument.metrics import Metrics
+from instrument.storage import FrameWriter, create_writer
+from instrument.storage.journal import JOURNAL_NAME, AcquisitionJournal, JournalState, recover_journal
+
+if TYPE_CHECKING:
+    from instrument.controllers.detection import DetectionTable, DropletDetector
 
 
 @dataclass
@@ -18,53 +35,514 @@ class ExperimentParams:
     flow_rate_ul_min: float
     duration_s: float
     save_path: Path | None = None
+    frame_interval_s: float = 1.0
+    jitter_tolerance_s: float = 0.005  # Lateness before a frame is flagged
+    skip_late_frames: bool = True  # Skip missed deadlines instead of lagging
+
+
+@dataclass
+class _Resume:
+    """Where a resumed run continues its dataset."""
+    
+    state: JournalState  # Recovered journal of the interrupted run
+    first_frame: int  # Frame number of the first resumed frame
+    num_frames: int  # Frames left to acquire
 
 
 class ExperimentController:
     """Controller for running experiments."""
     
-    def __init__(self, camera: Camera, pump: Pump) -> None:
+    def __init__(
+        self,
+        camera: Camera,
+        pump: Pump,
+        config: ExperimentConfig | None = None,
+        sensors: SensorController | None = None,
+        buffer_size: int = 64,
+        num_writers: int = 1,
+        metrics: Metrics | None = None,
+        reducer: FrameReducer | None = None,
+    ) -> None:
         """Initialize experiment controller.
         
         Args:
             camera: Camera device.
             pump: Pump device.
+            config: Experiment configuration (storage format etc.).
+            sensors: Sensor controller; its samples are saved with each run.
+            buffer_size: Number of frames in the acquisition ring buffer.
+            num_writers: Number of storage writer threads.
+            metrics: Records acquisition, save and pump command latencies.
+            reducer: ROI/binning stage applied before frames are stored.
         """
         self._camera = camera
         self._pump = pump
+        self._config = config or ExperimentConfig()
+        self._sensors = sensors
+        self._metrics = metrics
+        self._reducer = reducer if reducer is not None and not reducer.is_identity else None
+        self._engine = AcquisitionEngine(camera, buffer_size, num_writers, metrics)
+        self._writer: FrameWriter | None = None
+        self._scheduler: FrameScheduler | None = None
+        self._params: ExperimentParams | None = None
+        self._started_sensors = False
+        self._run_start_s = 0.0
+        self._detector: DropletDetector | None = None
+        self._detections: DetectionTable | None = None
+        self._stored_lock = threading.Lock()
+        self._num_stored = 0
+        self._trigger: TriggerCapture | None = None
+        self._journal: AcquisitionJournal | None = None
+        self._resume: _Resume | None = None
+        self._frame_offset = 0
     
-    def run_experiment(self, params: ExperimentParams) -> None:
+    def run_experiment(self, params: ExperimentParams) -> AcquisitionStats:
         """Run an experiment with given parameters.
         
+        Frames are grabbed on a background thread into a ring buffer and
+        saved by writer threads, so saving does not delay the next grab.
+        Grabs are paced by absolute deadlines every frame_interval_s.
+        
         Args:
             params: Experiment parameters.
+        
+        Returns:
+            Acquisition statistics (frames written, dropped, buffer usage).
         """
         # Set flow rate
         self._pump.set_flow_rate(params.flow_rate_ul_min)
         
-        # Simple blocking loop for now
-        # (Later you can introduce threading or asyncio if needed)
-        import time
+        self.start_acquisition(params)
+        return self.finish_acquisition()
+    
+    def resume_experiment(self, save_path: Path) -> AcquisitionStats:
+        """Continue a run that crashed or was stopped early.
+        
+        The dataset is cut back to the frames its journal lists as durable,
+        then the remaining frames are acquired into the same dataset at the
+        run's flow rate. Timestamps restart at zero. The tables written on
+        close (frame timestamps, sensors, detections, trigger index) cover
+        only the resumed part and get a "-resume-N" suffix, so those of
+        earlier parts are kept; the journal lists every stored frame.
+        
+        Args:
+            save_path: Directory of the interrupted run.
+        
+        Returns:
+            Acquisition statistics of the resumed part.
+        """
+        if self._params is not None:
+            raise RuntimeError("Acquisition already running")
+        save_path = Path(save_path)
+        state = recover_journal(save_path / JOURNAL_NAME)
+        params = replace(ExperimentParams(**state.run["params"]), save_path=save_path)
+        self._check_dataset(state)
+        # Continue after the last stored frame, on the decimation grid
+        decimation = self._config.decimation
+        first_frame = state.frames[-1][1] + 1 if state.frames else 0
+        first_frame = -(-first_frame // decimation) * decimation
+        num_frames = int(params.duration_s / params.frame_interval_s) - first_frame
+        if num_frames <= 0:
+            if not state.finalized:
+                self._finalize_recovered(save_path, state)
+            return AcquisitionStats()
+        
+        self._pump.set_flow_rate(params.flow_rate_ul_min)
+        self._resume = _Resume(state, first_frame, num_frames)
+        try:
+            self.start_acquisition(replace(params, duration_s=num_frames * params.frame_interval_s))
+        except BaseException:
+            self._resume = None
+            raise
+        return self.finish_acquisition()
+    
+    def recover_run(self, save_path: Path) -> JournalState:
+        """Make the dataset of a crashed run readable without acquiring more.
+        
+        Cuts the dataset and journal back to the last durable frame and
+        finalizes both, as if the run had been stopped there.
+        
+        Args:
+            save_path: Directory of the interrupted run.
+        
+        Returns:
+            Recovered journal contents.
+        """
+        save_path = Path(save_path)
+        state = recover_journal(save_path / JOURNAL_NAME)
+        self._check_dataset(state)
+        if not state.finalized:
+            self._finalize_recovered(save_path, state)
+        return state
+    
+    def start_acquisition(
+        self,
+        params: ExperimentParams,
+        start_ns: int | None = None,
+        external_trigger: bool = False,
+        armed: threading.Event | None = None,
+    ) -> None:
+        """Start timed acquisition and saving in the background.
+        
+        Unlike run_experiment(), this leaves the pump alone and returns at
+        once, so protocols can drive devices while frames are acquired.
+        Call finish_acquisition() to wait for the run and close the dataset.
+        
+        Args:
+            params: Experiment parameters (flow_rate_ul_min is only stored).
+            start_ns: Run start from time.perf_counter_ns() (default: now);
+                frame 0 is due then and timestamps are relative to it.
+            external_trigger: The camera waits for hardware trigger edges,
+                so grabs are not paced by frame_interval_s.
+            armed: Grabbing starts once this is set (default: at once).
+        """
+        if self._params is not None:
+            raise RuntimeError("Acquisition already running")
+        num_frames = int(params.duration_s / params.frame_interval_s)
+        self._frame_offset = 0
+        if self._resume is not None:
+            # Exact count; duration_s may round down
+            num_frames = self._resume.num_frames
+            self._frame_offset = self._resume.first_frame
+        self._scheduler = FrameScheduler(
+            params.frame_interval_s,
+            jitter_tolerance_s=params.jitter_tolerance_s,
+            skip_late=params.skip_late_frames,
+            external_trigger=external_trigger,
+        )
+        self._start_detection()
+        self._start_trigger()
+        # Only every decimation-th frame is stored
+        self._open_writer(params.save_path, -(-num_frames // self._config.decimation))
+        self._start_journal(params, -(-num_frames // self._config.decimation))
+        
+        # Poll sensors for the run unless they are already running
+        self._started_sensors = self._sensors is not None and not self._sensors.is_running
+        if self._started_sensors:
+            self._sensors.start()
+        self._run_start_s = self._sensors.now() if self._sensors is not None else 0.0
+        self._params = params
+        try:
+            self._engine.start(
+                self._save_frame,
+                num_frames=num_frames,
+                scheduler=self._scheduler,
+                start_ns=start_ns,
+                armed=armed,
+            )
+        except BaseException:
+            self.finish_acquisition()
+            raise
+    
+    def finish_acquisition(self) -> AcquisitionStats:
+        """Wait for the acquisition to end, then save metadata and sensor data.
+        
+        Returns:
+            Acquisition statistics (frames written, dropped, buffer usage).
+        """
+        params = self._params
+        if params is None:
+            raise RuntimeError("No acquisition running")
+        try:
+            return self._engine.wait()
+        finally:
+            if self._started_sensors:
+                self._sensors.stop()
+            self._close_writer(params)
+            self._export_sensors(params.save_path, self._run_start_s)
+            self._params = None
+            self._resume = None
+    
+    def stop_experiment(self) -> None:
+        """Stop a running experiment after the buffered frames are saved."""
+        self._engine.stop()
+    
+    def trigger(self, source: str = "manual") -> bool:
+        """Fire the capture trigger (e.g. from a GUI button).
+        
+        Args:
+            source: Name recorded with the trigger event.
+        
+        Returns:
+            False if no triggered acquisition is running.
+        """
+        capture = self._trigger
+        if capture is None or self._params is None:
+            return False
+        capture.trigger(source)
+        return True
+    
+    @property
+    def trigger_capture(self) -> TriggerCapture | None:
+        """Trigger state of the current or last run (None if disabled)."""
+        return self._trigger
+    
+    @property
+    def is_acquiring(self) -> bool:
+        """Check if an acquisition was started and not yet finished."""
+        return self._params is not None
+    
+    @property
+    def sensors(self) -> SensorController | None:
+        """Sensor controller whose samples are saved with each run."""
+        return self._sensors
+    
+    @property
+    def pump(self) -> Pump:
+        """Pump set by run_experiment()."""
+        return self._pump
+    
+    @property
+    def detections(self) -> DetectionTable | None:
+        """Droplet detections of the current or last run (None if disabled)."""
+        return self._detections
+    
+    @property
+    def acquisition_stats(self) -> AcquisitionStats:
+        """Statistics of the current or last acquisition."""
+        return self._engine.stats
+    
+    @property
+    def frame_timings(self) -> list[FrameTiming]:
+        """Per-frame deadlines and timestamps of the current or last run."""
+        if self._scheduler is None:
+            return []
+        return self._scheduler.timings
+    
+    def _open_writer(self, save_path: Path | None, num_frames: int) -> None:
+        """Open the storage backend selected by the configured file format.
+        
+        Args:
+            save_path: Directory to save the dataset to (None disables saving).
+            num_frames: Expected number of frames.
+        """
+        self._writer = None
+        if save_path is None:
+            return
+        save_path.mkdir(parents=True, exist_ok=True)
+        writer = create_writer(self._config)
+        path = save_path / f"frames{writer.extension}"
+        if self._resume is None:
+            writer.open(path, num_frames)
+        else:
+            state = self._resume.state
+            writer.recover(path, [index for index, _, _ in state.frames], state.run["num_frames"])
+        self._writer = writer
+    
+    def _close_writer(self, params: ExperimentParams) -> None:
+        """Finalize the dataset with the experiment metadata.
+        
+        Args:
+            params: Experiment parameters to store with the data.
+        """
+        if self._writer is None:
+            return
+        metadata = _params_metadata(params)
+        metadata["stats"] = asdict(self._engine.stats)
+        if self._frame_offset:
+            metadata["resumed_at_frame"] = self._frame_offset
+        if self._trigger is not None:
+            metadata["frames_stored"] = self._trigger.num_stored
+            metadata["trigger_events"] = [asdict(event) for event in self._trigger.events]
+        elif self._detector is not None and self._config.detection.save_only_detections:
+            metadata["frames_stored"] = self._num_stored
+        finalized = False
+        try:
+            if self._journal is not None:
+                self._journal.sync()
+            self._writer.close(metadata)
+            finalized = True
+        finally:
+            if self._journal is not None:
+                self._journal.close(finalized)
+                self._journal = None
+        self._writer = None
+        suffix = self._part_suffix
+        self._save_timings(params.save_path / f"frame_timestamps{suffix}.csv")
+        if self._trigger is not None:
+            self._trigger.save_index(params.save_path / f"trigger_frames{suffix}.csv")
+        if self._detections is not None:
+            self._detections.export(params.save_path, self._config.detection.table_format, suffix)
+    
+    def _start_detection(self) -> None:
+        """Create a fresh detector and table if detection is enabled."""
+        self._detector = None
+        self._detections = None
+        self._num_stored = 0 if self._resume is None else self._resume.state.num_stored
+        config = self._config.detection
+        if not config.enabled:
+            return
+        if config.save_only_detections and self._config.file_format.lower() not in ("zarr", "ome-zarr"):
+            # TIFF files are preallocated for every frame of the run
+            raise ValueError("detection.save_only_detections needs file_format zarr")
+        # Deferred so scipy is only needed when detection is used
+        from instrument.controllers.detection import DetectionTable, DropletDetector
+        
+        self._detector = DropletDetector(config.threshold, config.min_area_px, config.background_frames)
+        self._detections = DetectionTable()
+    
+    def _start_trigger(self) -> None:
+        """Create fresh pre/post-trigger capture if triggering is enabled."""
+        self._trigger = None
+        config = self._config.trigger
+        if not config.enabled:
+            return
+        if self._config.detection.save_only_detections:
+            raise ValueError("Trigger capture and detection.save_only_detections are mutually exclusive")
+        if config.on_detection and not self._config.detection.enabled:
+            raise ValueError("trigger.on_detection needs detection.enabled")
+        criteria: dict[str, TriggerCriterion] = {}
+        if config.sensor is not None:
+            if self._sensors is None or config.sensor not in self._sensors.names:
+                raise ValueError(f"Unknown trigger sensor: {config.sensor}")
+            # Latest polled sample; the writer threads never touch the bus
+            buffer = self._sensors.buffer(config.sensor)
+            
+            def read_value() -> float | None:
+                sample = buffer.last()
+                return None if sample is None else sample[1]
+            
+            criteria[config.sensor] = sensor_threshold(read_value, config.sensor_threshold, config.sensor_above)
+        first_stored = 0 if self._resume is None else self._resume.state.num_stored
+        self._trigger = TriggerCapture(config.pre_frames, config.post_frames, criteria, first_stored)
+    
+    def _start_journal(self, params: ExperimentParams, num_frames: int) -> None:
+        """Start the crash-safe journal next to the dataset if enabled.
+        
+        Args:
+            params: Experiment parameters recorded with the run.
+            num_frames: Expected number of stored frames.
+        """
+        self._journal = None
+        config = self._config.journal
+        if self._writer is None or not config.enabled or not self._writer.supports_recovery:
+            return
+        journal = AcquisitionJournal(
+            params.save_path / JOURNAL_NAME,
+            config.sync_frames,
+            config.sync_interval_ms / 1000.0,
+            self._writer.sync,
+            self._device_state,
+        )
+        if self._resume is None:
+            dataset = f"frames{self._writer.extension}"
+            journal.open(run={"dataset": dataset, "num_frames": num_frames, "params": _params_metadata(params)})
+        else:
+            journal.open(resume_from=self._resume.state.num_stored)
+        self._journal = journal
+    
+    def _device_state(self) -> dict[str, Any]:
+        """Pump flow rate and latest sensor values, recorded with each journal sync."""
+        state: dict[str, Any] = {"flow_rate_ul_min": self._pump.get_flow_rate()}
+        if self._sensors is not None:
+            sensors = {}
+            for name in self._sensors.names:
+                # Latest polled sample; the writer threads never touch the bus
+                sample = self._sensors.buffer(name).last()
+                if sample is not None:
+                    sensors[name] = sample[1]
+            state["sensors"] = sensors
+        return state
+    
+    @property
+    def _part_suffix(self) -> str:
+        """File name suffix of the tables of a resumed part ("" for a new run)."""
+        return "" if self._resume is None else f"-resume-{self._resume.state.resumes + 1}"
+    
+    def _check_dataset(self, state: JournalState) -> None:
+        """Check the configured file format matches the interrupted run."""
+        dataset = f"frames{create_writer(self._config).extension}"
+        if state.run["dataset"] != dataset:
+            raise ValueError(f"Run was saved as {state.run['dataset']}, but the configured format writes {dataset}")
+    
+    def _finalize_recovered(self, save_path: Path, state: JournalState) -> None:
+        """Cut the dataset back to the journaled frames and close it and the journal."""
+        writer = create_writer(self._config)
+        writer.recover(save_path / state.run["dataset"], [index for index, _, _ in state.frames], state.run["num_frames"])
+        writer.close({**state.run["params"], "recovered": True, "frames_stored": state.num_stored})
+        journal = AcquisitionJournal(save_path / JOURNAL_NAME)
+        journal.open()
+        journal.close()
+    
+    def _export_sensors(self, save_path: Path | None, start_s: float) -> None:
+        """Export the sensor samples recorded during the run.
         
-        num_frames = int(params.duration_s)
-        for i in range(num_frames):
-            frame = self._camera.grab_frame()
-            self._save_frame(frame, i, params.save_path)
-            time.sleep(1.0)  # 1 second per frame
+        Args:
+            save_path: Directory the dataset was saved to.
+            start_s: Run start on the sensor clock.
+        """
+        if self._sensors is None or save_path is None or not self._sensors.names:
+            return
+        self._sensors.export_run(save_path, self._config.sensor_export_format, start_s, self._part_suffix)
     
-    def _save_frame(self, frame: any, frame_number: int, save_path: Path | None) -> None:
-        """Save a frame to disk.
+    def _save_timings(self, path: Path) -> None:
+        """Write per-frame timestamps next to the dataset.
+        
+        Args:
+            path: CSV file path.
+        """
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame_number", "deadline_s", "timestamp_s", "late"])
+            for timing in self.frame_timings:
+                writer.writerow([timing.frame_number + self._frame_offset, f"{timing.deadline_s:.6f}", f"{timing.timestamp_s:.6f}", int(timing.late)])
+    
+    def _save_frame(self, frame: np.ndarray, frame_number: int, timestamp_s: float) -> None:
+        """Detect droplets in a frame and save it to disk.
+        
+        Called from the acquisition writer threads, so detection never
+        delays the next grab. With save_only_detections, frames without
+        droplets are dropped and the rest are stored back to back. With
+        trigger capture, frames go through the pre/post-trigger buffer.
         
         Args:
             frame: Frame data to save.
             frame_number: Frame number.
-            save_path: Directory to save frames to.
+            timestamp_s: Grab timestamp.
         """
-        if save_path is None:
+        if self._writer is None:
             return
         
-        # Minimal placeholder; real code would write to disk / Zarr / OME-TIFF
-        # Example: save as TIFF, or use tifffile, or write to Zarr
-        save_path.mkdir(parents=True, exist_ok=True)
-        # ... actual saving logic here ...
+        frame_number += self._frame_offset
+        stored_number, remainder = divmod(frame_number, self._config.decimation)
+        if remainder:
+            return
+        if self._reducer is not None:
+            frame = self._reducer.apply(frame)
+        source = None
+        if self._detector is not None:
+            detections = self._detector.detect(frame, frame_number, timestamp_s)
+            if self._trigger is not None:
+                # Stored indexes are listed in trigger_frames.csv
+                self._detections.add(detections)
+                if detections.count and self._config.trigger.on_detection:
+                    source = "detection"
+            elif not self._config.detection.save_only_detections:
+                self._detections.add(detections, stored_number)
+            elif not detections.count:
+                self._detections.add(detections)
+                return
+            else:
+                with self._stored_lock:
+                    stored_number = self._num_stored
+                    self._num_stored += 1
+                self._detections.add(detections, stored_number)
+        if self._trigger is not None:
+            self._trigger.process(frame, frame_number, timestamp_s, self._write_frame, source)
+        else:
+            self._write_frame(frame, stored_number, frame_number, timestamp_s)
+    
+    def _write_frame(self, frame: np.ndarray, stored_number: int, frame_number: int, timestamp_s: float) -> None:
+        """Write a frame at a stored index and journal it, timing the write if metrics are enabled."""
+        if self._metrics is None:
+            self._writer.write_frame(frame, stored_number)
+        else:
+            with self._metrics.timer("experiment.save_frame"):
+                self._writer.write_frame(frame, stored_number)
+        if self._journal is not None:
+            self._journal.record(stored_number, frame_number, timestamp_s)
+
 
+def _params_metadata(params: ExperimentParams) -> dict[str, Any]:
+    """Experiment parameters as plain values for metadata and the journal."""
+    return {key: str(value) if isinstance(value, Path) else value for key, value in asdict(params).items()}
@@ -5,32 +5,157 @@ Handles streaming camera previews, toggling illumination, and simple focus contr
 
 from __future__ import annotations
 
+import threading
+
+import numpy as np
+
+from instrument.controllers.acquisition import FramePool
+from instrument.controllers.reduction import FrameReducer, bin_frame
 from instrument.devices.base import Camera
 
+# Grab buffer, latest-frame slot, and the frame being rendered
+LIVE_POOL_SIZE = 3
+
+
+def make_lut(low: int = 0, high: int = 4095, gamma: float = 1.0) -> np.ndarray:
+    """Build a 16-bit to 8-bit display lookup table.
+    
+    Args:
+        low: Raw value mapped to black.
+        high: Raw value mapped to white (4095 for 12-bit cameras).
+        gamma: Display gamma.
+    
+    Returns:
+        uint8 array with 65536 entries, indexable by any uint16 pixel.
+    """
+    if high <= low:
+        raise ValueError(f"Invalid display range: {low}-{high}")
+    values = np.clip((np.arange(65536, dtype=np.float32) - low) / (high - low), 0.0, 1.0)
+    if gamma != 1.0:
+        values **= 1.0 / gamma
+    return (values * 255.0 + 0.5).astype(np.uint8)
+
+
+def downsample_to_fit(frame: np.ndarray, max_height: int, max_width: int, binning: bool = False) -> np.ndarray:
+    """Reduce a frame by an integer factor so it fits the given size.
+    
+    Args:
+        frame: 2D frame.
+        max_height: Target height in pixels.
+        max_width: Target width in pixels.
+        binning: Average factor x factor blocks instead of subsampling.
+            Subsampling returns a strided view without copying.
+    
+    Returns:
+        Downsampled frame.
+    """
+    height, width = frame.shape
+    factor = max(1, -(-height // max(max_height, 1)), -(-width // max(max_width, 1)))
+    if factor == 1:
+        return frame
+    if not binning:
+        return frame[::factor, ::factor]
+    return bin_frame(frame, factor)
+
+
+def to_display_8bit(frame: np.ndarray, lut: np.ndarray, max_height: int, max_width: int) -> np.ndarray:
+    """Convert a raw frame to a contiguous 8-bit display image.
+    
+    Args:
+        frame: Raw uint16 frame.
+        lut: Lookup table from make_lut().
+        max_height: Display height in pixels.
+        max_width: Display width in pixels.
+    
+    Returns:
+        uint8 image no larger than the display size.
+    """
+    # Downsample first so the LUT only touches displayed pixels
+    return np.take(lut, downsample_to_fit(frame, max_height, max_width))
+
+
+class LatestFrameSlot:
+    """Single-frame slot that always holds the newest frame.
+    
+    The producer replaces the frame without waiting; a frame that was never
+    taken is handed back to the producer as dropped.
+    """
+    
+    def __init__(self) -> None:
+        """Initialize empty slot."""
+        self._lock = threading.Lock()
+        self._frame: np.ndarray | None = None
+    
+    def put(self, frame: np.ndarray) -> np.ndarray | None:
+        """Store a new frame.
+        
+        Args:
+            frame: New frame buffer.
+        
+        Returns:
+            Previous frame buffer if it was never taken, else None.
+        """
+        with self._lock:
+            previous, self._frame = self._frame, frame
+        return previous
+    
+    def take(self) -> np.ndarray | None:
+        """Take the latest frame, leaving the slot empty.
+        
+        Returns:
+            Latest frame buffer, or None if no new frame arrived.
+        """
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
+
 
 class LiveController:
-    """Controller for live camera view and basic controls."""
+    """Controller for live camera view and basic controls.
+    
+    Live view grabs on a background thread into a small frame pool and keeps
+    only the latest frame. The GUI pulls display images at its own capped
+    rate, so fast cameras drop display frames instead of queueing them.
+    """
     
-    def __init__(self, camera: Camera) -> None:
+    def __init__(self, camera: Camera, reducer: FrameReducer | None = None) -> None:
         """Initialize live controller.
         
         Args:
             camera: Camera device to control.
+            reducer: ROI/binning stage applied before display.
         """
         self._camera = camera
+        self._reducer = reducer if reducer is not None and not reducer.is_identity else None
         self._is_live = False
+        self._slot = LatestFrameSlot()
+        self._pool: FramePool | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._lut = make_lut()
+        self._frames_grabbed = 0
+        self._frames_dropped = 0
+        self._error: Exception | None = None
     
     def start_live(self) -> None:
         """Start live view streaming."""
+        if self._is_live:
+            return
+        self._stop_event.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._grab_loop, name="live-grab", daemon=True)
         self._is_live = True
-        # Implementation: start camera streaming, set up callbacks, etc.
+        self._thread.start()
     
     def stop_live(self) -> None:
         """Stop live view streaming."""
         self._is_live = False
-        # Implementation: stop camera streaming
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
     
-    def grab_frame(self) -> any:  # Use np.ndarray in real code
+    def grab_frame(self) -> np.ndarray:
         """Grab a frame from the camera.
         
         Returns:
@@ -38,8 +163,81 @@ class LiveController:
         """
         return self._camera.grab_frame()
     
+    def set_display_range(self, low: int, high: int, gamma: float = 1.0) -> None:
+        """Set the raw value range mapped to the 8-bit display.
+        
+        Args:
+            low: Raw value mapped to black.
+            high: Raw value mapped to white.
+            gamma: Display gamma.
+        """
+        self._lut = make_lut(low, high, gamma)
+    
+    def latest_display_image(self, max_height: int, max_width: int) -> np.ndarray | None:
+        """Convert the latest live frame for display.
+        
+        Never blocks on the camera. Safe to call from the GUI thread.
+        
+        Args:
+            max_height: Display height in pixels.
+            max_width: Display width in pixels.
+        
+        Returns:
+            uint8 display image, or None if no new frame is available.
+        """
+        raw = self._slot.take()
+        if raw is None:
+            return None
+        try:
+            # The reducer returns a view or a copy; the pool only takes back raw
+            frame = raw if self._reducer is None else self._reducer.apply(raw)
+            return to_display_8bit(frame, self._lut, max_height, max_width)
+        finally:
+            self._pool.release(raw)
+    
     @property
     def is_live(self) -> bool:
         """Check if live view is active."""
         return self._is_live
-
+    
+    @property
+    def error(self) -> Exception | None:
+        """Error that stopped the live view, if any."""
+        return self._error
+    
+    @property
+    def frames_grabbed(self) -> int:
+        """Number of frames grabbed since live view started."""
+        return self._frames_grabbed
+    
+    @property
+    def frames_dropped(self) -> int:
+        """Number of grabbed frames replaced before they were displayed."""
+        return self._frames_dropped
+    
+    def _grab_loop(self) -> None:
+        """Grab frames into the latest-frame slot until stopped."""
+        try:
+            # Size the pool from one frame; camera settings may have changed
+            first_frame = np.asarray(self._camera.grab_frame())
+            self._pool = FramePool(LIVE_POOL_SIZE, first_frame.shape, first_frame.dtype)
+            self._frames_grabbed = 0
+            self._frames_dropped = 0
+            while not self._stop_event.is_set():
+                frame = self._pool.acquire(timeout=0.1)
+                if frame is None:
+                    continue
+                self._camera.grab_frame_into(frame)
+                self._frames_grabbed += 1
+                dropped = self._slot.put(frame)
+                if dropped is not None:
+                    self._frames_dropped += 1
+                    self._pool.release(dropped)
+        except Exception as exc:
+            self._error = exc
+            self._is_live = False
+        finally:
+            # Return an undisplayed frame so the pool is complete on restart
+            leftover = self._slot.take()
+            if leftover is not None:
+                self._pool.release(leftover)
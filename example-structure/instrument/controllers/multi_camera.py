@@ -0,0 +1,309 @@
+"""Synchronized multi-camera acquisition.
+
+Each camera gets its own ExperimentController, i.e. its own grab thread,
+ring buffer, writer threads and dataset in save_path/<camera name>, so a
+slow camera or disk never stalls the others. Cameras are synchronized
+either in software (every schedule shares one start time, so frame N of
+every camera is due at the same instant) or in hardware (cameras expose on
+a shared trigger line). Frames are matched across streams afterwards by
+timestamp and listed in frame_alignment.csv.
+"""
+
+from __future__ import annotations
+
+import csv
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from instrument.config import ExperimentConfig
+from instrument.controllers.acquisition import AcquisitionStats
+from instrument.controllers.experiment_controller import ExperimentController, ExperimentParams
+from instrument.controllers.reduction import FrameReducer
+from instrument.controllers.sensor_controller import SensorController
+from instrument.controllers.trigger import TriggerCapture
+from instrument.devices.base import Camera, Pump
+from instrument.metrics import Metrics
+
+# Delay between starting the acquisitions and the shared first deadline,
+# long enough for every camera to grab its sizing frame and open its dataset
+START_MARGIN_S = 0.1
+
+
+def align_timestamps(reference_s: np.ndarray, other_s: np.ndarray, tolerance_s: float) -> np.ndarray:
+    """Match each reference timestamp to the nearest timestamp of another stream.
+    
+    Args:
+        reference_s: Reference timestamps.
+        other_s: Sorted timestamps of the other stream.
+        tolerance_s: Largest accepted difference.
+    
+    Returns:
+        Index into other_s per reference timestamp, -1 where none is within tolerance.
+    """
+    reference_s = np.asarray(reference_s, dtype=np.float64)
+    other_s = np.asarray(other_s, dtype=np.float64)
+    if len(other_s) == 0:
+        return np.full(len(reference_s), -1, dtype=np.int64)
+    right = np.clip(np.searchsorted(other_s, reference_s), 0, len(other_s) - 1)
+    left = np.clip(right - 1, 0, len(other_s) - 1)
+    nearest = np.where(
+        np.abs(other_s[left] - reference_s) <= np.abs(other_s[right] - reference_s), left, right
+    )
+    nearest[np.abs(other_s[nearest] - reference_s) > tolerance_s] = -1
+    return nearest
+
+
+class MultiCameraController:
+    """Acquires from several cameras at once.
+    
+    Offers the run/start/finish/stop interface of ExperimentController, so
+    the protocol runner, the command-line runner and the GUI can drive it
+    unchanged. Statistics are summed over all cameras.
+    """
+    
+    def __init__(
+        self,
+        cameras: dict[str, Camera],
+        pump: Pump,
+        config: ExperimentConfig | None = None,
+        sensors: SensorController | None = None,
+        buffer_size: int = 64,
+        num_writers: int = 1,
+        metrics: Metrics | None = None,
+        reducers: dict[str, FrameReducer] | None = None,
+    ) -> None:
+        """Initialize multi-camera controller.
+        
+        Args:
+            cameras: Cameras by name; the first one is the reference stream.
+            pump: Pump device.
+            config: Experiment configuration (storage format, camera_sync etc.).
+            sensors: Sensor controller; its samples are saved with each camera's data.
+            buffer_size: Number of frames in each camera's ring buffer.
+            num_writers: Number of storage writer threads per camera.
+            metrics: Records acquisition, save and pump command latencies.
+            reducers: ROI/binning stage per camera name.
+        """
+        if not cameras:
+            raise ValueError("Multi-camera acquisition needs at least one camera")
+        self._config = config or ExperimentConfig()
+        if self._config.camera_sync not in ("software", "hardware"):
+            raise ValueError(f"Invalid camera sync: {self._config.camera_sync}")
+        self._cameras = dict(cameras)
+        self._pump = pump
+        self._sensors = sensors
+        reducers = reducers or {}
+        self._controllers = {
+            name: ExperimentController(
+                camera, pump, self._config, sensors, buffer_size, num_writers, metrics, reducers.get(name)
+            )
+            for name, camera in self._cameras.items()
+        }
+        self._params: ExperimentParams | None = None
+        self._started_sensors = False
+    
+    def run_experiment(self, params: ExperimentParams) -> AcquisitionStats:
+        """Set the flow rate, then acquire from all cameras for the run.
+        
+        Args:
+            params: Experiment parameters.
+        
+        Returns:
+            Acquisition statistics summed over all cameras.
+        """
+        self._pump.set_flow_rate(params.flow_rate_ul_min)
+        self.start_acquisition(params)
+        return self.finish_acquisition()
+    
+    def start_acquisition(self, params: ExperimentParams) -> None:
+        """Start acquisition from all cameras in the background.
+        
+        With software sync, frame N of every camera is due at the same
+        time. With hardware sync, cameras expose on trigger edges and
+        frame_interval_s only sets the number of frames.
+        
+        Args:
+            params: Experiment parameters (flow_rate_ul_min is only stored).
+        """
+        if self._params is not None:
+            raise RuntimeError("Acquisition already running")
+        hardware = self._config.camera_sync == "hardware"
+        for name, camera in self._cameras.items():
+            if hardware and not camera.supports_hardware_trigger:
+                raise ValueError(f"Camera {name} has no hardware trigger input")
+        # Sizing grabs run free; arming afterwards keeps every trigger edge for frame 0 on
+        self._disarm()
+        
+        # Poll sensors once for all cameras unless they are already running
+        self._started_sensors = self._sensors is not None and not self._sensors.is_running
+        if self._started_sensors:
+            self._sensors.start()
+        self._params = params
+        # Trigger edges pace hardware-synced cameras from the first grab on
+        start_ns = time.perf_counter_ns() + (0 if hardware else int(START_MARGIN_S * 1e9))
+        armed = threading.Event() if hardware else None
+        started: list[ExperimentController] = []
+        try:
+            for name, controller in self._controllers.items():
+                save_path = None if params.save_path is None else params.save_path / name
+                controller.start_acquisition(replace(params, save_path=save_path), start_ns, hardware, armed)
+                started.append(controller)
+            if armed is not None:
+                for camera in self._cameras.values():
+                    camera.set_hardware_trigger(True)
+                armed.set()
+        except BaseException:
+            for controller in started:
+                controller.stop_experiment()
+            for controller in started:
+                controller.finish_acquisition()
+            self._disarm()
+            self._finish_sensors()
+            self._params = None
+            raise
+    
+    def finish_acquisition(self) -> AcquisitionStats:
+        """Wait for all cameras, then save per-camera data and the frame alignment.
+        
+        Returns:
+            Acquisition statistics summed over all cameras.
+        """
+        params = self._params
+        if params is None:
+            raise RuntimeError("No acquisition running")
+        error: BaseException | None = None
+        try:
+            for controller in self._controllers.values():
+                try:
+                    controller.finish_acquisition()
+                except BaseException as e:
+                    # Finish the other cameras before reporting the first failure
+                    error = error or e
+            if error is not None:
+                raise error
+            if params.save_path is not None:
+                self._save_alignment(params.save_path / "frame_alignment.csv", params.frame_interval_s / 2)
+            return self.acquisition_stats
+        finally:
+            self._disarm()
+            self._finish_sensors()
+            self._params = None
+    
+    def stop_experiment(self) -> None:
+        """Stop all cameras after their buffered frames are saved."""
+        for controller in self._controllers.values():
+            controller.stop_experiment()
+    
+    def trigger(self, source: str = "manual") -> bool:
+        """Fire the capture trigger of every camera.
+        
+        Args:
+            source: Name recorded with the trigger events.
+        
+        Returns:
+            False if no triggered acquisition is running.
+        """
+        fired = [controller.trigger(source) for controller in self._controllers.values()]
+        return any(fired)
+    
+    @property
+    def trigger_capture(self) -> TriggerCapture | None:
+        """Trigger state of the reference camera (None if disabled)."""
+        return self._reference.trigger_capture
+    
+    @property
+    def is_acquiring(self) -> bool:
+        """Check if an acquisition was started and not yet finished."""
+        return self._params is not None
+    
+    @property
+    def sensors(self) -> SensorController | None:
+        """Sensor controller whose samples are saved with each run."""
+        return self._sensors
+    
+    @property
+    def pump(self) -> Pump:
+        """Pump set by run_experiment()."""
+        return self._pump
+    
+    @property
+    def controllers(self) -> dict[str, ExperimentController]:
+        """Per-camera controllers (statistics, frame timings, detections)."""
+        return dict(self._controllers)
+    
+    @property
+    def camera_stats(self) -> dict[str, AcquisitionStats]:
+        """Statistics of the current or last acquisition per camera."""
+        return {name: controller.acquisition_stats for name, controller in self._controllers.items()}
+    
+    @property
+    def acquisition_stats(self) -> AcquisitionStats:
+        """Statistics of the current or last acquisition summed over all cameras."""
+        stats = list(self.camera_stats.values())
+        frames_written = sum(s.frames_written for s in stats)
+        bytes_written = sum(s.frames_written * s.frame_bytes for s in stats)
+        return AcquisitionStats(
+            frames_acquired=sum(s.frames_acquired for s in stats),
+            frames_written=frames_written,
+            frames_dropped=sum(s.frames_dropped for s in stats),
+            frames_late=sum(s.frames_late for s in stats),
+            frames_skipped=sum(s.frames_skipped for s in stats),
+            high_water_mark=max(s.high_water_mark for s in stats),
+            buffer_capacity=max(s.buffer_capacity for s in stats),
+            # Mean over written frames, so write_mb_s is the combined data rate
+            frame_bytes=bytes_written // frames_written if frames_written else max(s.frame_bytes for s in stats),
+            elapsed_s=max(s.elapsed_s for s in stats),
+        )
+    
+    @property
+    def _reference(self) -> ExperimentController:
+        """Controller of the first camera."""
+        return next(iter(self._controllers.values()))
+    
+    def _disarm(self) -> None:
+        """Return every camera with a trigger input to free running."""
+        for camera in self._cameras.values():
+            if camera.supports_hardware_trigger:
+                camera.set_hardware_trigger(False)
+    
+    def _finish_sensors(self) -> None:
+        """Stop sensor polling if start_acquisition() started it."""
+        if self._started_sensors:
+            self._sensors.stop()
+            self._started_sensors = False
+    
+    def _save_alignment(self, path: Path, tolerance_s: float) -> None:
+        """Write which frame of every camera matches each reference frame.
+        
+        Args:
+            path: CSV file path.
+            tolerance_s: Largest timestamp difference of matched frames.
+        """
+        names = list(self._controllers)
+        timings = {name: self._controllers[name].frame_timings for name in names}
+        reference = timings[names[0]]
+        reference_s = np.array([timing.timestamp_s for timing in reference])
+        matches = {}
+        for name in names[1:]:
+            other = sorted(timings[name], key=lambda timing: timing.timestamp_s)
+            matches[name] = (other, align_timestamps(reference_s, [timing.timestamp_s for timing in other], tolerance_s))
+        
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            header = [f"{names[0]}_frame_number", f"{names[0]}_timestamp_s"]
+            for name in names[1:]:
+                header += [f"{name}_frame_number", f"{name}_offset_s"]
+            writer.writerow(header)
+            for i, timing in enumerate(reference):
+                row = [timing.frame_number, f"{timing.timestamp_s:.6f}"]
+                for other, index in matches.values():
+                    if index[i] < 0:
+                        row += [-1, ""]
+                    else:
+                        match = other[index[i]]
+                        row += [match.frame_number, f"{match.timestamp_s - timing.timestamp_s:.6f}"]
+                writer.writerow(row)
@@ -0,0 +1,481 @@
+"""Protocol engine.
+
+A protocol is a timeline of steps (flow ramps, valve switches, acquisition
+blocks, waits on sensor thresholds). It is compiled ahead of time into a
+time-ordered event schedule and run by a single executor thread that fires
+each device command at its absolute deadline, while acquisition runs on the
+acquisition engine's own threads. Pump set-points and ramps are handed to
+each pump's PumpController, so the executor never waits on the pump bus.
+
+Each step starts when the previous one ends, unless it sets at_s (seconds
+from the start of the current segment). A step with at_s can therefore
+overlap an acquisition block. WaitForSensor steps end a segment: the next
+segment's clock starts once the condition is met.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Callable, Union
+
+from instrument.config_cache import load_yaml
+from instrument.controllers.acquisition import AcquisitionStats
+from instrument.controllers.experiment_controller import ExperimentController, ExperimentParams
+from instrument.controllers.pump_controller import PumpController, exponential_ramp
+from instrument.controllers.scheduler import sleep_until
+from instrument.controllers.sensor_controller import SensorController
+from instrument.devices.base import Valve
+
+
+@dataclass
+class SetFlow:
+    """Set a pump to a constant flow rate."""
+    
+    pump: str
+    rate_ul_min: float
+    at_s: float | None = None
+
+
+@dataclass
+class FlowRamp:
+    """Ramp a pump between two flow rates."""
+    
+    pump: str
+    start_ul_min: float
+    end_ul_min: float
+    duration_s: float
+    step_s: float = 0.1  # Time between set-points of sampled ramps
+    profile: str = "linear"  # "linear" or "exponential"
+    at_s: float | None = None
+
+
+@dataclass
+class SwitchValve:
+    """Switch a valve to a channel."""
+    
+    valve: str
+    channel: int
+    at_s: float | None = None
+
+
+@dataclass
+class Acquire:
+    """Acquire and save frames for a fixed duration."""
+    
+    duration_s: float
+    frame_interval_s: float = 1.0
+    name: str = "acquisition"  # Subdirectory of the protocol save path
+    at_s: float | None = None
+
+
+@dataclass
+class Wait:
+    """Do nothing for a fixed duration."""
+    
+    duration_s: float
+    at_s: float | None = None
+
+
+@dataclass
+class WaitForSensor:
+    """Wait until a sensor reading crosses a threshold; ends a segment."""
+    
+    sensor: str
+    above: float | None = None
+    below: float | None = None
+    timeout_s: float = 60.0
+    poll_interval_s: float = 0.01
+    
+    def __post_init__(self) -> None:
+        """Validate that exactly one threshold is set."""
+        if (self.above is None) == (self.below is None):
+            raise ValueError(f"WaitForSensor on {self.sensor} needs exactly one of above/below")
+    
+    def is_met(self, value: float) -> bool:
+        """Check a reading against the threshold."""
+        if self.above is not None:
+            return value > self.above
+        return value < self.below
+
+
+ProtocolStep = Union[SetFlow, FlowRamp, SwitchValve, Acquire, Wait, WaitForSensor]
+
+# Ramp profile -> PumpController method; native pump ramps are used when available
+RAMP_PROFILES = {"linear": PumpController.ramp_linear, "exponential": PumpController.ramp_exponential}
+
+# YAML step keys
+STEP_TYPES: dict[str, type] = {
+    "set_flow": SetFlow,
+    "flow_ramp": FlowRamp,
+    "switch_valve": SwitchValve,
+    "acquire": Acquire,
+    "wait": Wait,
+    "wait_for_sensor": WaitForSensor,
+}
+
+
+@dataclass
+class Protocol:
+    """Named list of protocol steps."""
+    
+    name: str
+    steps: list[ProtocolStep] = field(default_factory=list)
+    
+    @classmethod
+    def from_file(cls, path: Path | str) -> Protocol:
+        """Load a protocol from a YAML file.
+        
+        Each step is a one-key mapping from the step type to its fields:
+        
+            name: ramp-and-image
+            steps:
+              - flow_ramp: {pump: sample_pump, start_ul_min: 0, end_ul_min: 100, duration_s: 10}
+              - acquire: {duration_s: 30, frame_interval_s: 0.5}
+              - switch_valve: {valve: sorting_valve, channel: 1, at_s: 20}
+              - wait_for_sensor: {sensor: pressure_sensor, above: 50, timeout_s: 30}
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Protocol file not found: {path}")
+        return cls.from_dict(load_yaml(path))
+    
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Protocol:
+        """Build a protocol from parsed YAML data."""
+        steps = []
+        for index, entry in enumerate(data.get("steps", [])):
+            if not isinstance(entry, dict) or len(entry) != 1:
+                raise ValueError(f"Step {index}: expected one step type, got {entry!r}")
+            (kind, options), = entry.items()
+            if kind not in STEP_TYPES:
+                raise ValueError(f"Step {index}: unknown step type {kind!r}")
+            step_type = STEP_TYPES[kind]
+            unknown = set(options or {}) - {f.name for f in fields(step_type)}
+            if unknown:
+                raise ValueError(f"Step {index} ({kind}): unknown fields {sorted(unknown)}")
+            steps.append(step_type(**(options or {})))
+        return cls(name=data.get("name", "protocol"), steps=steps)
+
+
+@dataclass
+class ProtocolEvent:
+    """One device command at a fixed time within a segment."""
+    
+    time_s: float
+    description: str
+    action: Callable[[], None]
+
+
+@dataclass
+class Segment:
+    """Events timed from one common start, optionally followed by a sensor wait."""
+    
+    events: list[ProtocolEvent]
+    duration_s: float
+    gate: WaitForSensor | None = None
+
+
+@dataclass
+class EventRecord:
+    """When a scheduled event actually ran."""
+    
+    segment: int
+    description: str
+    deadline_s: float  # Planned time since protocol start
+    timestamp_s: float  # Actual time since protocol start
+    
+    @property
+    def latency_s(self) -> float:
+        """How late the event fired."""
+        return self.timestamp_s - self.deadline_s
+
+
+@dataclass
+class ProtocolResult:
+    """Outcome of a protocol run."""
+    
+    events: list[EventRecord] = field(default_factory=list)
+    acquisitions: dict[str, AcquisitionStats] = field(default_factory=dict)
+    elapsed_s: float = 0.0
+    
+    @property
+    def max_latency_s(self) -> float:
+        """Largest event latency."""
+        return max((event.latency_s for event in self.events), default=0.0)
+
+
+class ProtocolRunner:
+    """Compiles protocols against named devices and runs them."""
+    
+    def __init__(
+        self,
+        pumps: dict[str, PumpController] | None = None,
+        valves: dict[str, Valve] | None = None,
+        sensors: SensorController | None = None,
+        experiment: ExperimentController | None = None,
+    ) -> None:
+        """Initialize protocol runner.
+        
+        Args:
+            pumps: Pump controllers by name; started when a protocol runs.
+            valves: Valves by name.
+            sensors: Sensor controller for WaitForSensor steps.
+            experiment: Experiment controller for Acquire steps.
+        """
+        self._pumps = pumps or {}
+        self._valves = valves or {}
+        self._sensors = sensors
+        self._experiment = experiment
+        self._save_path: Path | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._finisher: threading.Thread | None = None
+        self._result = ProtocolResult()
+        self._error: BaseException | None = None
+    
+    def compile(self, protocol: Protocol) -> list[Segment]:
+        """Resolve devices and expand steps into time-ordered events.
+        
+        Args:
+            protocol: Protocol to compile.
+        
+        Returns:
+            Segments separated by sensor waits.
+        """
+        segments = []
+        events: list[ProtocolEvent] = []
+        cursor_s = 0.0
+        for step in protocol.steps:
+            if isinstance(step, WaitForSensor):
+                if self._sensors is None or step.sensor not in self._sensors.names:
+                    raise ValueError(f"Unknown sensor: {step.sensor}")
+                segments.append(_segment(events, cursor_s, step))
+                events, cursor_s = [], 0.0
+                continue
+            start_s = cursor_s if step.at_s is None else step.at_s
+            step_events, duration_s = self._compile_step(step)
+            events.extend(
+                ProtocolEvent(start_s + event.time_s, event.description, event.action) for event in step_events
+            )
+            cursor_s = max(cursor_s, start_s + duration_s)
+        segments.append(_segment(events, cursor_s, None))
+        return segments
+    
+    def start(self, protocol: Protocol, save_path: Path | None = None) -> None:
+        """Compile a protocol and run it on a background thread.
+        
+        Args:
+            protocol: Protocol to run.
+            save_path: Directory for acquisition blocks (one subdirectory each).
+        """
+        if self.is_running:
+            raise RuntimeError("Protocol already running")
+        segments = self.compile(protocol)
+        self._save_path = save_path
+        self._stop_event.clear()
+        self._result = ProtocolResult()
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._execute, args=(segments,), name="protocol-executor", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Abort the protocol; a running acquisition is stopped and saved."""
+        self._stop_event.set()
+        if self._experiment is not None:
+            self._experiment.stop_experiment()
+    
+    def wait(self, timeout: float | None = None) -> ProtocolResult:
+        """Wait for the protocol to finish.
+        
+        Args:
+            timeout: Maximum time to wait in seconds.
+        
+        Returns:
+            Event timings and acquisition statistics.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._result
+    
+    def run(self, protocol: Protocol, save_path: Path | None = None) -> ProtocolResult:
+        """Run a protocol and block until it is done.
+        
+        Args:
+            protocol: Protocol to run.
+            save_path: Directory for acquisition blocks (one subdirectory each).
+        
+        Returns:
+            Event timings and acquisition statistics.
+        """
+        self.start(protocol, save_path)
+        return self.wait()
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if the executor thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _compile_step(self, step: ProtocolStep) -> tuple[list[ProtocolEvent], float]:
+        """Expand one step into events relative to its start, plus its duration."""
+        if isinstance(step, SetFlow):
+            pump = self._pump(step.pump)
+            description = f"{step.pump} -> {step.rate_ul_min} uL/min"
+            return [ProtocolEvent(0.0, description, _bind(pump.set_flow_rate, step.rate_ul_min))], 0.0
+        if isinstance(step, FlowRamp):
+            if step.duration_s <= 0 or step.step_s <= 0:
+                raise ValueError(f"Invalid ramp timing for {step.pump}: {step}")
+            if step.profile not in RAMP_PROFILES:
+                raise ValueError(f"Unknown ramp profile: {step.profile}")
+            if step.profile == "exponential":
+                exponential_ramp(step.start_ul_min, step.end_ul_min, step.duration_s)  # Reject bad rates now
+            pump = self._pump(step.pump)
+            description = f"{step.pump} {step.profile} ramp {step.start_ul_min} -> {step.end_ul_min} uL/min"
+            # The pump controller samples the ramp (or hands it to the pump) while later events fire
+            action = _bind(
+                RAMP_PROFILES[step.profile], pump, step.start_ul_min, step.end_ul_min, step.duration_s, step.step_s
+            )
+            return [ProtocolEvent(0.0, description, action)], step.duration_s
+        if isinstance(step, SwitchValve):
+            valve = self._valve(step.valve)
+            description = f"{step.valve} -> channel {step.channel}"
+            return [ProtocolEvent(0.0, description, _bind(valve.switch_channel, step.channel))], 0.0
+        if isinstance(step, Acquire):
+            if self._experiment is None:
+                raise ValueError("Acquire steps need an experiment controller")
+            description = f"acquire {step.name} for {step.duration_s} s"
+            return [ProtocolEvent(0.0, description, _bind(self._start_acquisition, step))], step.duration_s
+        if isinstance(step, Wait):
+            return [], step.duration_s
+        raise TypeError(f"Unsupported protocol step: {step!r}")
+    
+    def _pump(self, name: str) -> PumpController:
+        """Look up a pump controller by name."""
+        if name not in self._pumps:
+            raise ValueError(f"Unknown pump: {name}")
+        return self._pumps[name]
+    
+    def _valve(self, name: str) -> Valve:
+        """Look up a valve by name."""
+        if name not in self._valves:
+            raise ValueError(f"Unknown valve: {name}")
+        return self._valves[name]
+    
+    def _execute(self, segments: list[Segment]) -> None:
+        """Fire every event at its deadline, segment by segment."""
+        protocol_start_ns = time.perf_counter_ns()
+        start_sensors = self._sensors is not None and not self._sensors.is_running
+        if start_sensors:
+            self._sensors.start()
+        errors = {}
+        for name, pump in self._pumps.items():
+            pump.start()
+            errors[name] = pump.error
+        try:
+            for index, segment in enumerate(segments):
+                segment_start_ns = time.perf_counter_ns()
+                for event in segment.events:
+                    deadline_ns = segment_start_ns + int(event.time_s * 1e9)
+                    if not sleep_until(deadline_ns, self._stop_event):
+                        return
+                    fired_ns = time.perf_counter_ns()
+                    event.action()
+                    self._result.events.append(EventRecord(
+                        segment=index,
+                        description=event.description,
+                        deadline_s=(deadline_ns - protocol_start_ns) / 1e9,
+                        timestamp_s=(fired_ns - protocol_start_ns) / 1e9,
+                    ))
+                if not sleep_until(segment_start_ns + int(segment.duration_s * 1e9), self._stop_event):
+                    return
+                if segment.gate is not None and not self._wait_for_sensor(segment.gate):
+                    return
+            self._wait_for_pumps(errors)
+        except BaseException as exc:  # re-raised from wait()
+            self._error = exc
+            if self._experiment is not None:
+                self._experiment.stop_experiment()
+        finally:
+            if self._stop_event.is_set() or self._error is not None:
+                for pump in self._pumps.values():
+                    pump.cancel()
+            self._join_finisher()
+            if start_sensors:
+                self._sensors.stop()
+            self._result.elapsed_s = (time.perf_counter_ns() - protocol_start_ns) / 1e9
+    
+    def _wait_for_pumps(self, errors: dict[str, Exception | None]) -> None:
+        """Wait until every pump command of the protocol is sent.
+        
+        Args:
+            errors: Error of each pump controller when the protocol started.
+        """
+        for name, pump in self._pumps.items():
+            while not pump.wait_idle(0.05):
+                if self._stop_event.is_set():
+                    return
+            if pump.error is not errors[name]:
+                raise RuntimeError(f"Pump {name} command failed: {pump.error}") from pump.error
+    
+    def _wait_for_sensor(self, gate: WaitForSensor) -> bool:
+        """Poll the sensor buffer until the threshold is crossed.
+        
+        Returns:
+            True when the condition was met, False if stopped.
+        """
+        buffer = self._sensors.buffer(gate.sensor)
+        deadline = time.perf_counter() + gate.timeout_s
+        while True:
+            sample = buffer.last()
+            if sample is not None and gate.is_met(sample[1]):
+                return True
+            if time.perf_counter() >= deadline:
+                raise TimeoutError(f"Sensor {gate.sensor} did not reach threshold within {gate.timeout_s} s")
+            if self._stop_event.wait(gate.poll_interval_s):
+                return False
+    
+    def _start_acquisition(self, step: Acquire) -> None:
+        """Start an acquisition block; it is finished on a helper thread."""
+        # A block starting while the previous one is still saving waits for it
+        self._join_finisher()
+        params = ExperimentParams(
+            flow_rate_ul_min=self._experiment.pump.get_flow_rate(),
+            duration_s=step.duration_s,
+            save_path=None if self._save_path is None else self._save_path / step.name,
+            frame_interval_s=step.frame_interval_s,
+        )
+        self._experiment.start_acquisition(params)
+        self._finisher = threading.Thread(
+            target=self._finish_acquisition, args=(step.name,), name="protocol-acquisition", daemon=True
+        )
+        self._finisher.start()
+    
+    def _finish_acquisition(self, name: str) -> None:
+        """Wait for an acquisition block and store its statistics."""
+        try:
+            self._result.acquisitions[name] = self._experiment.finish_acquisition()
+        except BaseException as exc:  # re-raised from wait()
+            self._error = exc
+            self._stop_event.set()
+    
+    def _join_finisher(self) -> None:
+        """Wait until the last acquisition block is saved."""
+        if self._finisher is not None:
+            self._finisher.join()
+            self._finisher = None
+
+
+def _bind(method: Callable[..., None], *args: Any) -> Callable[[], None]:
+    """Bind arguments ahead of time so firing an event is a single call."""
+    return lambda: method(*args)
+
+
+def _segment(events: list[ProtocolEvent], duration_s: float, gate: WaitForSensor | None) -> Segment:
+    """Build a segment with its events in time order."""
+    return Segment(sorted(events, key=lambda event: event.time_s), duration_s, gate)
@@ -0,0 +1,268 @@
+"""Pump controller.
+
+Sends flow set-points to a pump from a worker thread, no faster than the
+pump accepts them. Callers never block on the bus: a new set-point replaces
+any pending one, so bursts (e.g. spinbox ticks) collapse into a single
+command. Ramps are sampled at the same rate, or handed to the pump firmware
+when the driver supports native ramps.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from instrument.devices.base import Pump
+
+logger = logging.getLogger(__name__)
+
+# Flow rate as a function of time since the ramp started
+RampProfile = Callable[[float], float]
+
+
+def linear_ramp(start_ul_min: float, end_ul_min: float, duration_s: float) -> RampProfile:
+    """Linear ramp profile.
+    
+    Args:
+        start_ul_min: Flow rate at t = 0.
+        end_ul_min: Flow rate at t = duration_s.
+        duration_s: Ramp duration in seconds.
+    
+    Returns:
+        Profile function of time.
+    """
+    if duration_s <= 0:
+        return lambda t: end_ul_min
+    return lambda t: start_ul_min + (end_ul_min - start_ul_min) * min(1.0, max(0.0, t / duration_s))
+
+
+def exponential_ramp(start_ul_min: float, end_ul_min: float, duration_s: float) -> RampProfile:
+    """Exponential ramp profile (constant relative change per second).
+    
+    Args:
+        start_ul_min: Flow rate at t = 0 (must be positive).
+        end_ul_min: Flow rate at t = duration_s (must be positive).
+        duration_s: Ramp duration in seconds.
+    
+    Returns:
+        Profile function of time.
+    """
+    if start_ul_min <= 0 or end_ul_min <= 0:
+        raise ValueError(f"Exponential ramp needs positive flow rates: {start_ul_min} -> {end_ul_min}")
+    if duration_s <= 0:
+        return lambda t: end_ul_min
+    ratio = end_ul_min / start_ul_min
+    return lambda t: start_ul_min * ratio ** min(1.0, max(0.0, t / duration_s))
+
+
+class PumpController:
+    """Rate-limited, coalescing command layer over a pump."""
+    
+    def __init__(self, pump: Pump, max_rate_hz: float = 10.0, name: str | None = None) -> None:
+        """Initialize pump controller.
+        
+        Args:
+            pump: Initialized pump device.
+            max_rate_hz: Maximum number of commands per second sent to the pump.
+            name: Name used for the worker thread (default: class name).
+        """
+        if max_rate_hz <= 0:
+            raise ValueError(f"Invalid command rate: {max_rate_hz}")
+        self._pump = pump
+        self._period_s = 1.0 / max_rate_hz
+        self._name = name or type(pump).__name__
+        self._condition = threading.Condition()
+        self._device_lock = threading.Lock()
+        self._pending: tuple[Callable[..., Any], tuple] | None = None
+        self._ramp: tuple[RampProfile, float, float, float] | None = None  # profile, t0, duration, step
+        self._next_sample = 0.0
+        self._busy = False
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._last_sent: float | None = None
+        self._commands_sent = 0
+        self._commands_dropped = 0
+        self._error: Exception | None = None
+    
+    def start(self) -> None:
+        """Start the command thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=f"pump-{self._name}", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Send the last pending set-point, then stop the command thread.
+        
+        A ramp still in progress is abandoned at its current set-point.
+        """
+        with self._condition:
+            self._stopping = True
+            self._ramp = None
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def set_flow_rate(self, rate_ul_min: float) -> None:
+        """Request a flow rate without waiting for the pump.
+        
+        Replaces any pending set-point and cancels a running ramp.
+        
+        Args:
+            rate_ul_min: Flow rate in microliters per minute.
+        """
+        self._submit((self._pump.set_flow_rate, (rate_ul_min,)), ramp=None)
+    
+    def ramp(self, profile: RampProfile, duration_s: float, step_s: float = 0.0) -> None:
+        """Follow an arbitrary flow profile, sampled at the command rate.
+        
+        The final set-point, profile(duration_s), is always sent.
+        
+        Args:
+            profile: Flow rate as a function of seconds since the ramp start.
+            duration_s: Ramp duration in seconds.
+            step_s: Time between samples; never faster than the command rate.
+        """
+        self._submit(None, ramp=(profile, time.perf_counter(), duration_s, step_s))
+    
+    def ramp_linear(self, start_ul_min: float, end_ul_min: float, duration_s: float, step_s: float = 0.0) -> None:
+        """Linear ramp; uses the pump's native ramp command when available.
+        
+        Args:
+            start_ul_min: Flow rate at the start of the ramp.
+            end_ul_min: Flow rate at the end of the ramp.
+            duration_s: Ramp duration in seconds.
+            step_s: Time between samples when the ramp is sampled.
+        """
+        if self._pump.supports_ramp:
+            self._submit((self._pump.ramp_flow_rate, (start_ul_min, end_ul_min, duration_s)), ramp=None)
+        else:
+            self.ramp(linear_ramp(start_ul_min, end_ul_min, duration_s), duration_s, step_s)
+    
+    def ramp_exponential(
+        self, start_ul_min: float, end_ul_min: float, duration_s: float, step_s: float = 0.0
+    ) -> None:
+        """Exponential ramp, sampled at the command rate.
+        
+        Args:
+            start_ul_min: Flow rate at the start of the ramp (positive).
+            end_ul_min: Flow rate at the end of the ramp (positive).
+            duration_s: Ramp duration in seconds.
+            step_s: Time between samples; never faster than the command rate.
+        """
+        self.ramp(exponential_ramp(start_ul_min, end_ul_min, duration_s), duration_s, step_s)
+    
+    def cancel(self) -> None:
+        """Drop the pending set-point and any running ramp; the pump keeps its current flow."""
+        self._submit(None, ramp=None)
+    
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until all requested set-points and ramps have been sent.
+        
+        Args:
+            timeout: Maximum time to wait in seconds.
+        
+        Returns:
+            True if idle, False on timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and self._ramp is None and not self._busy, timeout
+            )
+    
+    def get_flow_rate(self) -> float:
+        """Read the current flow rate from the pump."""
+        with self._device_lock:
+            return self._pump.get_flow_rate()
+    
+    @property
+    def pump(self) -> Pump:
+        """Controlled pump."""
+        return self._pump
+    
+    @property
+    def commands_sent(self) -> int:
+        """Number of commands sent to the pump."""
+        return self._commands_sent
+    
+    @property
+    def commands_dropped(self) -> int:
+        """Number of set-points replaced before they were sent."""
+        return self._commands_dropped
+    
+    @property
+    def error(self) -> Exception | None:
+        """Last error raised by the pump, if any."""
+        return self._error
+    
+    def _submit(
+        self,
+        command: tuple[Callable[..., Any], tuple] | None,
+        ramp: tuple[RampProfile, float, float, float] | None,
+    ) -> None:
+        """Replace the pending command and ramp, then wake the worker."""
+        with self._condition:
+            if self._pending is not None:
+                self._commands_dropped += 1
+            self._pending = command
+            self._ramp = ramp
+            self._next_sample = 0.0
+            self._condition.notify_all()
+    
+    def _run(self) -> None:
+        """Send the newest command whenever the rate limit allows."""
+        next_allowed = 0.0
+        while True:
+            with self._condition:
+                while self._pending is None and self._ramp is None and not self._stopping:
+                    self._condition.wait()
+                if self._pending is None and self._ramp is None:
+                    return  # Stopping with nothing left to send
+                now = time.perf_counter()
+                wake_at = next_allowed if self._pending is not None else max(next_allowed, self._next_sample)
+                if now < wake_at and not self._stopping:
+                    # New set-points may still replace this one while we wait
+                    self._condition.wait(wake_at - now)
+                    continue
+                if self._pending is not None:
+                    method, args = self._pending
+                    self._pending = None
+                else:
+                    profile, t0, duration_s, step_s = self._ramp
+                    elapsed_s = now - t0
+                    if elapsed_s >= duration_s:
+                        elapsed_s = duration_s
+                        self._ramp = None
+                    elif step_s > 0:
+                        # Next sample on the ramp's own grid, so a late sample does not delay the rest
+                        self._next_sample = t0 + min(duration_s, (elapsed_s // step_s + 1) * step_s)
+                    method, args = self._pump.set_flow_rate, (profile(elapsed_s),)
+                self._busy = True
+            try:
+                self._send(method, args)
+            finally:
+                next_allowed = time.perf_counter() + self._period_s
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+    
+    def _send(self, method: Callable[..., Any], args: tuple) -> None:
+        """Run one pump command, skipping repeats of the last set-point."""
+        is_set_point = method == self._pump.set_flow_rate
+        try:
+            with self._device_lock:
+                # The pump may have been set elsewhere (experiment, batch runner) since
+                if is_set_point and args[0] == self._last_sent and self._pump.get_flow_rate() == args[0]:
+                    return
+                method(*args)
+        except Exception as exc:
+            self._error = exc
+            self._last_sent = None
+            logger.exception("Pump %s command failed", self._name)
+            return
+        self._commands_sent += 1
+        self._last_sent = args[0] if is_set_point else None
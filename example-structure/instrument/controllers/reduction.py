@@ -0,0 +1,109 @@
+"""Frame reduction.
+
+ROI cropping and software binning applied to frames before storage and live
+view. Cropping is a view into the frame (no copy); binning is one reshape
+and reduction. When the camera supports a hardware ROI, the crop is pushed
+to the driver instead, so fewer pixels ever leave the camera.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from instrument.devices.base import Camera
+
+
+def bin_frame(frame: np.ndarray, factor: int) -> np.ndarray:
+    """Average factor x factor pixel blocks.
+    
+    Rows and columns that do not fill a whole block are dropped.
+    
+    Args:
+        frame: 2D frame.
+        factor: Block size.
+    
+    Returns:
+        Binned frame with the input dtype (the frame itself if factor is 1).
+    """
+    if factor == 1:
+        return frame
+    binned_height, binned_width = frame.shape[0] // factor, frame.shape[1] // factor
+    blocks = frame[:binned_height * factor, :binned_width * factor].reshape(
+        binned_height, factor, binned_width, factor
+    )
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(frame.dtype)
+
+
+class FrameReducer:
+    """Software ROI crop followed by binning."""
+    
+    def __init__(self, roi: tuple[int, int, int, int] | None = None, binning: int = 1) -> None:
+        """Initialize frame reducer.
+        
+        Args:
+            roi: Region (y, x, height, width) to keep; None keeps the full frame.
+            binning: Binning factor applied after cropping.
+        """
+        if binning < 1:
+            raise ValueError(f"Invalid binning factor: {binning}")
+        if roi is not None and (len(roi) != 4 or min(roi) < 0 or roi[2] == 0 or roi[3] == 0):
+            raise ValueError(f"Invalid ROI (y, x, height, width): {roi}")
+        self._roi = tuple(roi) if roi is not None else None
+        self._binning = binning
+    
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Reduce a frame.
+        
+        Args:
+            frame: 2D frame.
+        
+        Returns:
+            A view of the frame when only cropping, otherwise a new array.
+        """
+        if self._roi is not None:
+            y, x, height, width = self._roi
+            if y + height > frame.shape[0] or x + width > frame.shape[1]:
+                raise ValueError(f"ROI {self._roi} exceeds frame shape {frame.shape}")
+            frame = frame[y:y + height, x:x + width]
+        return bin_frame(frame, self._binning)
+    
+    def output_shape(self, shape: tuple[int, int]) -> tuple[int, int]:
+        """Shape of reduced frames for a given input shape."""
+        height, width = shape if self._roi is None else self._roi[2:]
+        return height // self._binning, width // self._binning
+    
+    @property
+    def is_identity(self) -> bool:
+        """Check if frames pass through unchanged."""
+        return self._roi is None and self._binning == 1
+    
+    @property
+    def roi(self) -> tuple[int, int, int, int] | None:
+        """Software ROI (y, x, height, width)."""
+        return self._roi
+    
+    @property
+    def binning(self) -> int:
+        """Binning factor."""
+        return self._binning
+
+
+def configure_reduction(
+    camera: Camera,
+    roi: tuple[int, int, int, int] | None = None,
+    binning: int = 1,
+) -> FrameReducer:
+    """Push the ROI to the camera if it can crop, and build the software stage.
+    
+    Args:
+        camera: Initialized camera.
+        roi: Region (y, x, height, width); None keeps the full frame.
+        binning: Software binning factor.
+    
+    Returns:
+        Reducer for whatever the camera does not do itself.
+    """
+    if roi is not None and camera.supports_roi:
+        camera.set_roi(*roi)
+        roi = None
+    return FrameReducer(roi, binning)
@@ -0,0 +1,177 @@
+"""Frame scheduler.
+
+Paces acquisition against absolute deadlines on a monotonic clock, so grab
+and save time never accumulate as drift.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+# Sleep until this close to a deadline, then spin for the last stretch
+SPIN_THRESHOLD_NS = 500_000
+
+
+def sleep_until(deadline_ns: int, stop_event: threading.Event | None = None) -> bool:
+    """Sleep until an absolute deadline, spinning for the last stretch.
+    
+    Args:
+        deadline_ns: Deadline on the time.perf_counter_ns() clock.
+        stop_event: Event that aborts the wait when set.
+    
+    Returns:
+        True when the deadline was reached, False if stop_event was set.
+    """
+    remaining_ns = deadline_ns - time.perf_counter_ns()
+    if remaining_ns > SPIN_THRESHOLD_NS:
+        sleep_s = (remaining_ns - SPIN_THRESHOLD_NS) / 1e9
+        if stop_event is not None:
+            if stop_event.wait(sleep_s):
+                return False
+        else:
+            time.sleep(sleep_s)
+    while time.perf_counter_ns() < deadline_ns:
+        pass
+    return stop_event is None or not stop_event.is_set()
+
+
+@dataclass
+class FrameTiming:
+    """Timing record of one scheduled frame."""
+    
+    frame_number: int
+    deadline_s: float  # Planned time since start
+    timestamp_s: float  # Actual time since start
+    late: bool
+
+
+class FrameScheduler:
+    """Drift-free frame scheduler.
+    
+    Frame k is due at start + k * interval. If a frame starts later than the
+    jitter tolerance, it is either flagged as late, or (with skip_late) the
+    scheduler skips ahead to the next deadline that can still be met, so lag
+    never builds up.
+    """
+    
+    def __init__(
+        self,
+        interval_s: float,
+        jitter_tolerance_s: float = 0.005,
+        skip_late: bool = True,
+        external_trigger: bool = False,
+    ) -> None:
+        """Initialize frame scheduler.
+        
+        Args:
+            interval_s: Time between frames in seconds.
+            jitter_tolerance_s: Allowed lateness before a frame counts as late.
+            skip_late: Skip deadlines that were missed instead of running late.
+            external_trigger: The camera is paced by a hardware trigger;
+                wait_next() returns at once and frames are only recorded.
+        """
+        if interval_s <= 0:
+            raise ValueError(f"Invalid frame interval: {interval_s}")
+        self._interval_ns = int(interval_s * 1e9)
+        self._tolerance_ns = int(jitter_tolerance_s * 1e9)
+        self._skip_late = skip_late
+        self._external_trigger = external_trigger
+        self._start_ns = 0
+        self._next_frame = 0
+        self._timings: list[FrameTiming] = []
+        self._late_frames = 0
+        self._skipped_frames = 0
+    
+    def start(self, start_ns: int | None = None) -> None:
+        """Start the schedule; frame 0 is due immediately.
+        
+        Args:
+            start_ns: Start time from time.perf_counter_ns() (default: now).
+        """
+        self._start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        self._next_frame = 0
+        self._timings = []
+        self._late_frames = 0
+        self._skipped_frames = 0
+    
+    def wait_next(self, stop_event: threading.Event | None = None) -> int | None:
+        """Wait for the next frame deadline.
+        
+        Args:
+            stop_event: Event that aborts the wait when set.
+        
+        Returns:
+            Frame number that is due, or None if stop_event was set.
+        """
+        frame_number = self._next_frame
+        if self._external_trigger:
+            if stop_event is not None and stop_event.is_set():
+                return None
+            self._next_frame = frame_number + 1
+            return frame_number
+        deadline_ns = self._deadline_ns(frame_number)
+        now_ns = time.perf_counter_ns()
+        
+        if self._skip_late and now_ns > deadline_ns + self._tolerance_ns:
+            # Jump to the next deadline still ahead of us
+            missed = (now_ns - deadline_ns) // self._interval_ns + 1
+            self._skipped_frames += missed
+            frame_number += missed
+            deadline_ns = self._deadline_ns(frame_number)
+        
+        if not sleep_until(deadline_ns, stop_event):
+            return None
+        
+        self._next_frame = frame_number + 1
+        return frame_number
+    
+    def record(self, frame_number: int, timestamp_ns: int | None = None) -> FrameTiming:
+        """Record when a frame was actually acquired.
+        
+        Args:
+            frame_number: Frame number returned by wait_next().
+            timestamp_ns: Acquisition time from time.perf_counter_ns() (default: now).
+        
+        Returns:
+            Timing record of the frame.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.perf_counter_ns()
+        deadline_ns = self._deadline_ns(frame_number)
+        late = not self._external_trigger and timestamp_ns - deadline_ns > self._tolerance_ns
+        if late:
+            self._late_frames += 1
+        timing = FrameTiming(
+            frame_number=frame_number,
+            deadline_s=(deadline_ns - self._start_ns) / 1e9,
+            timestamp_s=(timestamp_ns - self._start_ns) / 1e9,
+            late=late,
+        )
+        self._timings.append(timing)
+        return timing
+    
+    @property
+    def interval_s(self) -> float:
+        """Time between frames in seconds."""
+        return self._interval_ns / 1e9
+    
+    @property
+    def timings(self) -> list[FrameTiming]:
+        """Timing records of all recorded frames."""
+        return list(self._timings)
+    
+    @property
+    def late_frames(self) -> int:
+        """Number of frames acquired later than the jitter tolerance."""
+        return self._late_frames
+    
+    @property
+    def skipped_frames(self) -> int:
+        """Number of deadlines skipped because they were already missed."""
+        return self._skipped_frames
+    
+    def _deadline_ns(self, frame_number: int) -> int:
+        """Absolute deadline of a frame."""
+        return self._start_ns + frame_number * self._interval_ns
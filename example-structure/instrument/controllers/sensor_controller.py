@@ -0,0 +1,321 @@
+"""Sensor controller.
+
+Polls sensors at their configured rates on background threads and keeps the
+readings in array-backed ring buffers for windowed statistics and export.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from instrument.devices.base import Sensor
+
+# File suffix per sensor export format (ExperimentConfig.sensor_export_format)
+EXPORT_SUFFIXES = {"parquet": ".parquet", "hdf5": ".h5"}
+
+
+class TimeSeriesBuffer:
+    """Fixed-capacity ring buffer of (timestamp, value) samples.
+    
+    Samples live in two preallocated float64 arrays; once full, the oldest
+    samples are overwritten.
+    """
+    
+    def __init__(self, capacity: int) -> None:
+        """Initialize buffer.
+        
+        Args:
+            capacity: Maximum number of samples kept.
+        """
+        if capacity < 1:
+            raise ValueError(f"Invalid buffer capacity: {capacity}")
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._capacity = capacity
+        self._count = 0  # Total samples ever appended
+        self._lock = threading.Lock()
+    
+    def append(self, timestamp: float, value: float) -> None:
+        """Append one sample.
+        
+        Args:
+            timestamp: Sample time in seconds.
+            value: Sample value.
+        """
+        with self._lock:
+            index = self._count % self._capacity
+            self._timestamps[index] = timestamp
+            self._values[index] = value
+            self._count += 1
+    
+    def arrays(self, start_s: float | None = None, end_s: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Get samples in chronological order.
+        
+        Args:
+            start_s: Keep samples at or after this time.
+            end_s: Keep samples before this time.
+        
+        Returns:
+            Tuple of (timestamps, values) copies.
+        """
+        with self._lock:
+            segments = self._segments()
+            timestamps = np.concatenate([self._timestamps[lo:hi] for lo, hi in segments])
+            values = np.concatenate([self._values[lo:hi] for lo, hi in segments])
+        if start_s is not None or end_s is not None:
+            # Timestamps are sorted, so the window is a contiguous slice
+            lo = 0 if start_s is None else np.searchsorted(timestamps, start_s, side="left")
+            hi = len(timestamps) if end_s is None else np.searchsorted(timestamps, end_s, side="left")
+            timestamps, values = timestamps[lo:hi], values[lo:hi]
+        return timestamps, values
+    
+    def latest(self, window_s: float) -> tuple[np.ndarray, np.ndarray]:
+        """Get the samples of the last window_s seconds.
+        
+        Only the window is copied, not the whole buffer.
+        
+        Args:
+            window_s: Window length in seconds.
+        
+        Returns:
+            Tuple of (timestamps, values) copies.
+        """
+        with self._lock:
+            if self._count == 0:
+                return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+            start_s = self._timestamps[(self._count - 1) % self._capacity] - window_s
+            # Walk back from the newest segment until the window start falls inside one
+            window = []
+            for lo, hi in reversed(self._segments()):
+                first = lo + int(np.searchsorted(self._timestamps[lo:hi], start_s, side="left"))
+                window.insert(0, (first, hi))
+                if first > lo:
+                    break
+            timestamps = np.concatenate([self._timestamps[lo:hi] for lo, hi in window])
+            values = np.concatenate([self._values[lo:hi] for lo, hi in window])
+        return timestamps, values
+    
+    def last(self) -> tuple[float, float] | None:
+        """Most recent (timestamp, value) sample, or None if empty."""
+        with self._lock:
+            if self._count == 0:
+                return None
+            index = (self._count - 1) % self._capacity
+            return float(self._timestamps[index]), float(self._values[index])
+    
+    def mean(self, window_s: float) -> float:
+        """Mean value over the last window_s seconds (NaN if empty)."""
+        _, values = self.latest(window_s)
+        return float(values.mean()) if len(values) else float("nan")
+    
+    def min_max(self, window_s: float) -> tuple[float, float]:
+        """Minimum and maximum over the last window_s seconds (NaN if empty)."""
+        _, values = self.latest(window_s)
+        if len(values) == 0:
+            return float("nan"), float("nan")
+        return float(values.min()), float(values.max())
+    
+    def rolling_mean(self, num_samples: int) -> np.ndarray:
+        """Rolling mean over num_samples consecutive samples.
+        
+        Args:
+            num_samples: Window length in samples.
+        
+        Returns:
+            Array with one value per full window.
+        """
+        _, values = self.arrays()
+        if num_samples < 1 or len(values) < num_samples:
+            return np.empty(0, dtype=np.float64)
+        cumsum = np.cumsum(np.concatenate(([0.0], values)))
+        return (cumsum[num_samples:] - cumsum[:-num_samples]) / num_samples
+    
+    def _segments(self) -> list[tuple[int, int]]:
+        """Index ranges of the held samples, oldest first; call with the lock held."""
+        if self._count <= self._capacity:
+            return [(0, self._count)]
+        split = self._count % self._capacity
+        return [(split, self._capacity), (0, split)]
+    
+    def __len__(self) -> int:
+        """Number of samples currently held."""
+        return min(self._count, self._capacity)
+    
+    @property
+    def capacity(self) -> int:
+        """Maximum number of samples kept."""
+        return self._capacity
+
+
+@dataclass
+class _SensorChannel:
+    """Sensor polled by the controller."""
+    
+    sensor: Sensor
+    rate_hz: float
+    buffer: TimeSeriesBuffer
+    errors: int = 0
+
+
+class SensorController:
+    """Polls sensors on background threads, one thread per sensor."""
+    
+    def __init__(self) -> None:
+        """Initialize sensor controller without sensors."""
+        self._channels: dict[str, _SensorChannel] = {}
+        self._threads: list[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._start_ns = time.perf_counter_ns()
+    
+    def add_sensor(self, name: str, sensor: Sensor, rate_hz: float = 10.0, history_s: float = 3600.0) -> None:
+        """Register a sensor for polling.
+        
+        Args:
+            name: Sensor name.
+            sensor: Initialized sensor device.
+            rate_hz: Sampling rate.
+            history_s: Seconds of samples kept in memory.
+        """
+        if rate_hz <= 0:
+            raise ValueError(f"Invalid sample rate for {name}: {rate_hz}")
+        capacity = max(1, int(rate_hz * history_s))
+        self._channels[name] = _SensorChannel(sensor, rate_hz, TimeSeriesBuffer(capacity))
+    
+    def start(self) -> None:
+        """Start polling all sensors."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._poll_loop, args=(channel,), name=f"sensor-{name}", daemon=True)
+            for name, channel in self._channels.items()
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self) -> None:
+        """Stop polling and wait for the threads to finish."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+    
+    def now(self) -> float:
+        """Current time on the sample clock, in seconds."""
+        return (time.perf_counter_ns() - self._start_ns) / 1e9
+    
+    def buffer(self, name: str) -> TimeSeriesBuffer:
+        """Get the sample buffer of a sensor.
+        
+        Args:
+            name: Sensor name.
+        
+        Returns:
+            Sample buffer.
+        """
+        return self._channels[name].buffer
+    
+    def export(self, path: Path, start_s: float | None = None, end_s: float | None = None) -> None:
+        """Export samples to Parquet (.parquet) or HDF5 (.h5, .hdf5).
+        
+        Args:
+            path: Output file; the suffix selects the format.
+            start_s: Export samples at or after this time.
+            end_s: Export samples before this time.
+        """
+        path = Path(path)
+        data = {name: channel.buffer.arrays(start_s, end_s) for name, channel in self._channels.items()}
+        if path.suffix == ".parquet":
+            _export_parquet(path, data)
+        elif path.suffix in (".h5", ".hdf5"):
+            _export_hdf5(path, data, {name: channel.rate_hz for name, channel in self._channels.items()})
+        else:
+            raise ValueError(f"Unsupported sensor export format: {path.suffix}")
+    
+    def export_run(
+        self,
+        directory: Path,
+        file_format: str = "parquet",
+        start_s: float | None = None,
+        suffix: str = "",
+    ) -> Path:
+        """Export the samples of a run next to its dataset.
+        
+        Args:
+            directory: Run directory.
+            file_format: "parquet" or "hdf5" (ExperimentConfig.sensor_export_format).
+            start_s: Run start on the sample clock.
+            suffix: Appended to the file name stem, e.g. "-resume-1".
+        
+        Returns:
+            Path of the written file.
+        """
+        if file_format not in EXPORT_SUFFIXES:
+            raise ValueError(f"Unsupported sensor export format: {file_format}")
+        path = Path(directory) / f"sensors{suffix}{EXPORT_SUFFIXES[file_format]}"
+        self.export(path, start_s=start_s)
+        return path
+    
+    @property
+    def names(self) -> list[str]:
+        """Names of all registered sensors."""
+        return list(self._channels)
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if any polling thread is alive."""
+        return any(thread.is_alive() for thread in self._threads)
+    
+    def _poll_loop(self, channel: _SensorChannel) -> None:
+        """Read one sensor at its rate against absolute deadlines."""
+        period_ns = int(1e9 / channel.rate_hz)
+        next_ns = time.perf_counter_ns()
+        read_value = channel.sensor.read_value
+        append = channel.buffer.append
+        while not self._stop_event.is_set():
+            try:
+                value = read_value()
+            except Exception:
+                channel.errors += 1
+                value = float("nan")
+            now_ns = time.perf_counter_ns()
+            append((now_ns - self._start_ns) / 1e9, value)
+            
+            next_ns += period_ns
+            if next_ns < now_ns:
+                # Fell behind (slow sensor); skip missed samples instead of bursting
+                next_ns += ((now_ns - next_ns) // period_ns + 1) * period_ns
+            self._stop_event.wait((next_ns - now_ns) / 1e9)
+
+
+def _export_parquet(path: Path, data: dict[str, tuple[np.ndarray, np.ndarray]]) -> None:
+    """Write all sensors into one long-format Parquet table."""
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+    
+    names = list(data)
+    lengths = [len(data[name][0]) for name in names]
+    sensor_index = np.repeat(np.arange(len(names), dtype=np.int32), lengths)
+    table = pa.table({
+        "sensor": pa.DictionaryArray.from_arrays(pa.array(sensor_index), pa.array(names, type=pa.string())),
+        "timestamp_s": np.concatenate([data[name][0] for name in names]) if names else np.empty(0),
+        "value": np.concatenate([data[name][1] for name in names]) if names else np.empty(0),
+    })
+    pq.write_table(table, path)
+
+
+def _export_hdf5(path: Path, data: dict[str, tuple[np.ndarray, np.ndarray]], rates_hz: dict[str, float]) -> None:
+    """Write one HDF5 group per sensor with timestamp and value datasets."""
+    import h5py  # type: ignore
+    
+    with h5py.File(path, "w") as f:
+        for name, (timestamps, values) in data.items():
+            group = f.create_group(name)
+            group.attrs["rate_hz"] = rates_hz[name]
+            group.create_dataset("timestamp_s", data=timestamps, compression="gzip")
+            group.create_dataset("value", data=values, compression="gzip")
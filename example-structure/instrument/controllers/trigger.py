@@ -0,0 +1,207 @@
+"""Event-triggered capture.
+
+Keeps the last pre_frames frames in a preallocated in-memory ring and
+stores nothing until a trigger fires (sensor threshold, image criterion,
+external event or the GUI button). The pre-trigger frames are then
+flushed to storage followed by the next post_frames frames, so fast
+acquisition around rare events needs no sustained disk bandwidth.
+"""
+
+from __future__ import annotations
+
+import csv
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+# Image criterion: True if the frame should fire the trigger
+TriggerCriterion = Callable[[np.ndarray], bool]
+
+# Storage callback: write(frame, stored_index, frame_number, timestamp_s)
+StoreFrame = Callable[[np.ndarray, int, int, float], None]
+
+
+def sensor_threshold(
+    read_value: Callable[[], float | None],
+    threshold: float,
+    above: bool = True,
+) -> TriggerCriterion:
+    """Criterion firing while a sensor value is beyond a threshold.
+    
+    Args:
+        read_value: Returns the current sensor value, e.g. Sensor.read_value
+            (None means no value yet and never fires).
+        threshold: Threshold value.
+        above: Fire above the threshold (otherwise below).
+    
+    Returns:
+        Criterion ignoring the frame itself.
+    """
+    def criterion(_frame: np.ndarray) -> bool:
+        value = read_value()
+        if value is None:
+            return False
+        return value > threshold if above else value < threshold
+    return criterion
+
+
+@dataclass
+class TriggerEvent:
+    """One trigger and where its frames were stored."""
+    
+    source: str  # Criterion name, "manual", ...
+    frame_number: int  # Frame on which the trigger fired
+    first_stored: int  # Stored index of the first (pre-trigger) frame
+    pre_frames: int  # Pre-trigger frames flushed from the ring
+
+
+class TriggerCapture:
+    """Pre/post-trigger frame buffer in front of a storage writer.
+    
+    Triggers are level-sensitive: a trigger firing during the post-trigger
+    window extends it by another post_frames frames.
+    """
+    
+    def __init__(
+        self,
+        pre_frames: int,
+        post_frames: int,
+        criteria: dict[str, TriggerCriterion] | None = None,
+        first_stored: int = 0,
+    ) -> None:
+        """Initialize trigger capture.
+        
+        Args:
+            pre_frames: Frames kept before a trigger.
+            post_frames: Frames stored after a trigger.
+            criteria: Named criteria evaluated on every frame.
+            first_stored: Stored index of the first stored frame (when
+                continuing an existing dataset).
+        """
+        if pre_frames < 0 or post_frames < 0:
+            raise ValueError(f"Invalid pre/post frame counts: {pre_frames}/{post_frames}")
+        self._pre_frames = pre_frames
+        self._post_frames = post_frames
+        self._criteria = dict(criteria or {})
+        self._lock = threading.Lock()
+        self._ring: np.ndarray | None = None  # Allocated on the first frame
+        self._ring_info: list[tuple[int, float]] = []  # (frame_number, timestamp_s) per slot
+        self._ring_next = 0
+        self._ring_count = 0
+        self._post_remaining = 0
+        self._manual: str | None = None
+        self._num_stored = first_stored
+        self._stored: list[tuple[int, int, float]] = []  # (stored_index, frame_number, timestamp_s)
+        self._events: list[TriggerEvent] = []
+    
+    def trigger(self, source: str = "manual") -> None:
+        """Fire the trigger on the next processed frame.
+        
+        Thread-safe; meant for GUI buttons and other external events.
+        
+        Args:
+            source: Name recorded with the event.
+        """
+        with self._lock:
+            self._manual = source
+    
+    def process(
+        self,
+        frame: np.ndarray,
+        frame_number: int,
+        timestamp_s: float,
+        store: StoreFrame,
+        source: str | None = None,
+    ) -> bool:
+        """Buffer or store one frame.
+        
+        Called from the acquisition writer threads. The frame is copied into
+        the ring, so the caller may reuse its buffer afterwards.
+        
+        Args:
+            frame: Frame data.
+            frame_number: Frame number.
+            timestamp_s: Grab timestamp.
+            store: Writes a frame at a stored index.
+            source: Name of an external criterion that fired on this frame.
+        
+        Returns:
+            True if the frame was stored.
+        """
+        if source is None:
+            source = next((name for name, criterion in self._criteria.items() if criterion(frame)), None)
+        with self._lock:
+            if source is None and self._manual is not None:
+                source = self._manual
+            self._manual = None
+            if source is not None:
+                if self._post_remaining == 0:
+                    self._flush_ring(source, frame_number, store)
+                self._post_remaining = self._post_frames + 1  # Including this frame
+            if self._post_remaining == 0:
+                self._buffer(frame, frame_number, timestamp_s)
+                return False
+            self._post_remaining -= 1
+            stored_index = self._num_stored
+            self._num_stored += 1
+            self._stored.append((stored_index, frame_number, timestamp_s))
+        store(frame, stored_index, frame_number, timestamp_s)
+        return True
+    
+    def save_index(self, path: Path) -> None:
+        """Write which frame ended up at which stored index.
+        
+        Args:
+            path: CSV file path.
+        """
+        with self._lock:
+            rows = sorted(self._stored)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["stored_index", "frame_number", "timestamp_s"])
+            for stored_index, frame_number, timestamp_s in rows:
+                writer.writerow([stored_index, frame_number, f"{timestamp_s:.6f}"])
+    
+    @property
+    def events(self) -> list[TriggerEvent]:
+        """Triggers fired so far (extensions of a window are not listed)."""
+        return list(self._events)
+    
+    @property
+    def num_stored(self) -> int:
+        """Number of frames stored."""
+        return self._num_stored
+    
+    @property
+    def is_capturing(self) -> bool:
+        """Check if post-trigger frames are being stored."""
+        return self._post_remaining > 0
+    
+    def _buffer(self, frame: np.ndarray, frame_number: int, timestamp_s: float) -> None:
+        """Copy a frame into the oldest ring slot (lock held)."""
+        if self._pre_frames == 0:
+            return
+        if self._ring is None or self._ring.shape[1:] != frame.shape or self._ring.dtype != frame.dtype:
+            self._ring = np.empty((self._pre_frames, *frame.shape), dtype=frame.dtype)
+            self._ring_info = [(0, 0.0)] * self._pre_frames
+            self._ring_next = self._ring_count = 0
+        np.copyto(self._ring[self._ring_next], frame)
+        self._ring_info[self._ring_next] = (frame_number, timestamp_s)
+        self._ring_next = (self._ring_next + 1) % self._pre_frames
+        self._ring_count = min(self._ring_count + 1, self._pre_frames)
+    
+    def _flush_ring(self, source: str, frame_number: int, store: StoreFrame) -> None:
+        """Store the buffered pre-trigger frames in frame order (lock held)."""
+        slots = [(self._ring_next - self._ring_count + i) % self._pre_frames for i in range(self._ring_count)]
+        # Several writer threads may have buffered frames slightly out of order
+        slots.sort(key=lambda slot: self._ring_info[slot][0])
+        self._events.append(TriggerEvent(source, frame_number, self._num_stored, len(slots)))
+        for slot in slots:
+            slot_frame_number, slot_timestamp_s = self._ring_info[slot]
+            store(self._ring[slot], self._num_stored, slot_frame_number, slot_timestamp_s)
+            self._stored.append((self._num_stored, slot_frame_number, slot_timestamp_s))
+            self._num_stored += 1
+        self._ring_count = 0
@@ -1,6 +1,24 @@
 """Device abstractions and drivers."""
 
-from .base import Camera, Device, Pump, Sensor, Valve
+from __future__ import annotations
 
-__all__ = ["Device", "Camera", "Pump", "Valve", "Sensor"]
+from typing import TYPE_CHECKING
 
+from instrument._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .async_ import AsyncDevice, wrap_async
+    from .base import Camera, Device, Pump, Sensor, Valve
+
+__all__ = ["Device", "Camera", "Pump", "Valve", "Sensor", "AsyncDevice", "wrap_async"]
+
+# Exported name -> defining submodule
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "AsyncDevice": ".async_",
+    "wrap_async": ".async_",
+    "Camera": ".base",
+    "Device": ".base",
+    "Pump": ".base",
+    "Sensor": ".base",
+    "Valve": ".base",
+})
@@ -0,0 +1,164 @@
+"""Asyncio adapters for device drivers.
+
+Wraps the synchronous drivers from base.py so controllers can await device
+commands and gather them across devices. Each device gets its own worker
+thread: commands to one device stay in order, while commands to different
+devices run in parallel.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+from .base import Camera, Device, Pump, Sensor, Valve
+
+
+class AsyncDevice:
+    """Async adapter around a synchronous device driver."""
+    
+    def __init__(self, device: Device, name: str | None = None) -> None:
+        """Initialize adapter.
+        
+        Args:
+            device: Synchronous device driver.
+            name: Name used for the worker thread (default: class name).
+        """
+        self._device = device
+        self._name = name or type(device).__name__
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"device-{self._name}")
+    
+    async def call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking driver call on the device's worker thread.
+        
+        Args:
+            method: Bound method (or any callable) to run.
+            *args: Positional arguments for the call.
+        
+        Returns:
+            Result of the call.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
+    
+    async def initialize(self) -> None:
+        """Initialize the device."""
+        await self.call(self._device.initialize)
+    
+    async def close(self) -> None:
+        """Close the device and stop its worker thread."""
+        try:
+            await self.call(self._device.close)
+        finally:
+            self._executor.shutdown(wait=False)
+    
+    def abandon(self) -> Future:
+        """Close the device once its running call returns, then stop the worker thread.
+        
+        For a call that timed out: the driver call cannot be interrupted, so
+        the close is queued behind it. The adapter cannot be used afterwards.
+        
+        Returns:
+            Future of the queued close.
+        """
+        closing = self._executor.submit(self._device.close)
+        self._executor.shutdown(wait=False)
+        return closing
+    
+    @property
+    def device(self) -> Device:
+        """Wrapped synchronous driver."""
+        return self._device
+    
+    @property
+    def name(self) -> str:
+        """Device name."""
+        return self._name
+
+
+class AsyncCamera(AsyncDevice):
+    """Async camera adapter."""
+    
+    async def grab_frame(self) -> Any:
+        """Grab a single frame from the camera."""
+        return await self.call(self._device.grab_frame)
+    
+    async def set_exposure_time(self, exposure_ms: float) -> None:
+        """Set camera exposure time."""
+        await self.call(self._device.set_exposure_time, exposure_ms)
+
+
+class AsyncPump(AsyncDevice):
+    """Async pump adapter."""
+    
+    async def set_flow_rate(self, rate_ul_min: float) -> None:
+        """Set the pump flow rate."""
+        await self.call(self._device.set_flow_rate, rate_ul_min)
+    
+    async def get_flow_rate(self) -> float:
+        """Get the current flow rate."""
+        return await self.call(self._device.get_flow_rate)
+
+
+class AsyncValve(AsyncDevice):
+    """Async valve adapter."""
+    
+    async def switch_channel(self, channel: int) -> None:
+        """Switch valve to specified channel."""
+        await self.call(self._device.switch_channel, channel)
+    
+    async def get_current_channel(self) -> int:
+        """Get the current valve channel."""
+        return await self.call(self._device.get_current_channel)
+
+
+class AsyncSensor(AsyncDevice):
+    """Async sensor adapter."""
+    
+    async def read_value(self) -> float:
+        """Read current sensor value."""
+        return await self.call(self._device.read_value)
+
+
+def wrap_async(device: Device, name: str | None = None) -> AsyncDevice:
+    """Wrap a synchronous driver in the matching async adapter.
+    
+    Args:
+        device: Synchronous device driver.
+        name: Device name.
+    
+    Returns:
+        Async adapter for the device type.
+    """
+    for device_type, adapter in (
+        (Camera, AsyncCamera),
+        (Pump, AsyncPump),
+        (Valve, AsyncValve),
+        (Sensor, AsyncSensor),
+    ):
+        if isinstance(device, device_type):
+            return adapter(device, name)
+    return AsyncDevice(device, name)
+
+
+async def initialize_all(devices: Iterable[AsyncDevice]) -> None:
+    """Initialize devices concurrently.
+    
+    Args:
+        devices: Devices to initialize.
+    """
+    await asyncio.gather(*(device.initialize() for device in devices))
+
+
+async def close_all(devices: Iterable[AsyncDevice]) -> list[BaseException]:
+    """Close devices concurrently; one failure does not stop the others.
+    
+    Args:
+        devices: Devices to close.
+    
+    Returns:
+        Errors raised while closing.
+    """
+    results = await asyncio.gather(*(device.close() for device in devices), return_exceptions=True)
+    return [result for result in results if isinstance(result, BaseException)]
@@ -42,6 +42,22 @@ class Camera(Device):
         """
         ...
     
+    def grab_frame_into(self, out: Any) -> Any:
+        """Grab a single frame into a preallocated buffer.
+        
+        Drivers whose SDK can write into caller-provided memory should
+        override this to avoid allocating a new array per frame. The default
+        implementation copies the result of grab_frame().
+        
+        Args:
+            out: Preallocated array with the camera's frame shape and dtype.
+        
+        Returns:
+            The filled buffer (out).
+        """
+        out[...] = self.grab_frame()
+        return out
+    
     @abstractmethod
     def set_exposure_time(self, exposure_ms: float) -> None:
         """Set camera exposure time.
@@ -50,6 +66,42 @@ class Camera(Device):
             exposure_ms: Exposure time in milliseconds.
         """
         ...
+    
+    @property
+    def supports_roi(self) -> bool:
+        """Check if the camera can crop frames on the sensor."""
+        return False
+    
+    def set_roi(self, y: int, x: int, height: int, width: int) -> None:
+        """Read out only a region of the sensor.
+        
+        Drivers whose camera supports a hardware ROI should override this
+        and supports_roi; later frames then have shape (height, width).
+        
+        Args:
+            y: Top row.
+            x: Left column.
+            height: Region height in pixels.
+            width: Region width in pixels.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no hardware ROI")
+    
+    @property
+    def supports_hardware_trigger(self) -> bool:
+        """Check if the camera can expose on an external trigger line."""
+        return False
+    
+    def set_hardware_trigger(self, enabled: bool) -> None:
+        """Expose on external trigger edges instead of free running.
+        
+        Drivers whose camera has a trigger input should override this and
+        supports_hardware_trigger; grab_frame() then blocks until the next
+        edge, so cameras wired to the same line expose together.
+        
+        Args:
+            enabled: Wait for trigger edges (False returns to free running).
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no trigger input")
 
 
 class Pump(Device):
@@ -72,6 +124,24 @@ class Pump(Device):
             Current flow rate in microliters per minute.
         """
         ...
+    
+    @property
+    def supports_ramp(self) -> bool:
+        """Check if the pump can run a linear ramp on its own."""
+        return False
+    
+    def ramp_flow_rate(self, start_ul_min: float, end_ul_min: float, duration_s: float) -> None:
+        """Start a linear flow ramp executed by the pump firmware.
+        
+        Drivers for pumps with a built-in ramp command should override this
+        and supports_ramp; the call returns once the ramp has started.
+        
+        Args:
+            start_ul_min: Flow rate at the start of the ramp.
+            end_ul_min: Flow rate at the end of the ramp.
+            duration_s: Ramp duration in seconds.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no native ramp command")
 
 
 class Valve(Device):
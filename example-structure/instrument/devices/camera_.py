@@ -12,5 +12,8 @@ from __future__ import annotations
 
 # class DahengCamera(Camera):
 #     """Daheng camera driver."""
-#     ...
+#     
+#     def initialize(self) -> None:
+#         import gxipy  # Vendor SDKs load only when the driver is used
+#         ...
 
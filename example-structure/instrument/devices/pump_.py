@@ -8,9 +8,11 @@ from __future__ import annotations
 
 # Example: Placeholder for actual pump implementations
 # from .base import Pump
-# import pyvisa
 
 # class PyVisaPump(Pump):
 #     """Pump controlled via PyVISA/SCPI."""
-#     ...
+#     
+#     def initialize(self) -> None:
+#         import pyvisa  # Vendor libraries load only when the driver is used
+#         ...
 
@@ -0,0 +1,290 @@
+"""Device registry.
+
+Builds every device listed in the instrument configuration, initializes
+them concurrently with per-device timeouts, and closes them in reverse
+dependency order.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from instrument.config import CameraConfig, InstrumentConfig, PumpConfig, SensorConfig, ValveConfig
+
+from .async_ import AsyncDevice, wrap_async
+from .base import Camera, Device, Pump, Sensor, Valve
+
+
+@dataclass
+class _Entry:
+    """Registered device and its startup settings."""
+    
+    device: AsyncDevice
+    depends_on: list[str] = field(default_factory=list)
+    timeout_s: float | None = None
+    initialized: bool = False
+    closing: Future | None = None  # Close queued behind a timed-out initialize
+
+
+class DeviceRegistry:
+    """Named collection of devices with concurrent startup and teardown.
+    
+    Devices are initialized in dependency levels: all devices whose
+    dependencies are ready start at the same time, each with its own
+    timeout. Closing runs the levels in reverse.
+    """
+    
+    def __init__(self, default_timeout_s: float = 30.0) -> None:
+        """Initialize empty registry.
+        
+        Args:
+            default_timeout_s: Initialization timeout for devices without their own.
+        """
+        self._default_timeout_s = default_timeout_s
+        self._entries: dict[str, _Entry] = {}
+        self._init_timings: dict[str, float] = {}
+    
+    @classmethod
+    def from_config(cls, config: InstrumentConfig, default_timeout_s: float = 30.0) -> DeviceRegistry:
+        """Build all devices listed in the configuration.
+        
+        Args:
+            config: Instrument configuration.
+            default_timeout_s: Initialization timeout for devices without their own.
+        
+        Returns:
+            Registry with uninitialized devices.
+        """
+        registry = cls(default_timeout_s)
+        for camera_config in config.all_cameras:
+            registry.add(
+                camera_config.name,
+                _build_camera(camera_config, config.simulation),
+                camera_config.depends_on,
+                camera_config.init_timeout_s,
+            )
+        for pump_config in config.pumps:
+            registry.add(
+                pump_config.name,
+                _build_pump(pump_config, config.simulation),
+                pump_config.depends_on,
+                pump_config.init_timeout_s,
+            )
+        for valve_config in config.valves:
+            registry.add(
+                valve_config.name,
+                _build_valve(valve_config, config.simulation),
+                valve_config.depends_on,
+                valve_config.init_timeout_s,
+            )
+        for sensor_config in config.sensors:
+            registry.add(
+                sensor_config.name,
+                _build_sensor(sensor_config, config.simulation),
+                sensor_config.depends_on,
+                sensor_config.init_timeout_s,
+            )
+        return registry
+    
+    def add(
+        self,
+        name: str,
+        device: Device,
+        depends_on: list[str] | None = None,
+        timeout_s: float | None = None,
+    ) -> None:
+        """Register a device.
+        
+        Args:
+            name: Unique device name.
+            device: Device driver.
+            depends_on: Names of devices that must be initialized first.
+            timeout_s: Initialization timeout (None uses the registry default).
+        """
+        if name in self._entries:
+            raise ValueError(f"Duplicate device name: {name}")
+        self._entries[name] = _Entry(wrap_async(device, name), list(depends_on or []), timeout_s)
+    
+    def get(self, name: str) -> Device:
+        """Get a device by name.
+        
+        Args:
+            name: Device name.
+        
+        Returns:
+            Device driver.
+        """
+        if name not in self._entries:
+            raise KeyError(f"Unknown device: {name}")
+        return self._entries[name].device.device
+    
+    def initialize(self) -> dict[str, float]:
+        """Initialize all devices concurrently, level by level.
+        
+        If any device fails or times out, the devices that did start are
+        closed again before the error is raised.
+        
+        Returns:
+            Initialization time per device in seconds.
+        """
+        self._init_timings = {}
+        errors = asyncio.run(self._initialize_levels())
+        if errors:
+            self.close()
+            details = ", ".join(f"{name}: {error!r}" for name, error in errors.items())
+            raise RuntimeError(f"Device initialization failed ({details})")
+        return dict(self._init_timings)
+    
+    def close(self) -> None:
+        """Close all initialized devices in reverse dependency order."""
+        errors = asyncio.run(self._close_levels())
+        if errors:
+            details = ", ".join(f"{name}: {error!r}" for name, error in errors.items())
+            raise RuntimeError(f"Device close failed ({details})")
+    
+    @property
+    def init_timings(self) -> dict[str, float]:
+        """Initialization time per device in seconds, from the last initialize()."""
+        return dict(self._init_timings)
+    
+    @property
+    def names(self) -> list[str]:
+        """Names of all registered devices."""
+        return list(self._entries)
+    
+    @property
+    def cameras(self) -> list[Camera]:
+        """All registered cameras."""
+        return self._devices_of_type(Camera)
+    
+    @property
+    def pumps(self) -> list[Pump]:
+        """All registered pumps."""
+        return self._devices_of_type(Pump)
+    
+    @property
+    def valves(self) -> list[Valve]:
+        """All registered valves."""
+        return self._devices_of_type(Valve)
+    
+    @property
+    def sensors(self) -> list[Sensor]:
+        """All registered sensors."""
+        return self._devices_of_type(Sensor)
+    
+    def _devices_of_type(self, device_type: type) -> list:
+        """Registered devices of one type, in registration order."""
+        return [entry.device.device for entry in self._entries.values() if isinstance(entry.device.device, device_type)]
+    
+    def _levels(self) -> list[list[str]]:
+        """Group device names into dependency levels (topological order)."""
+        remaining = {name: set(entry.depends_on) for name, entry in self._entries.items()}
+        for name, deps in remaining.items():
+            unknown = deps - remaining.keys()
+            if unknown:
+                raise ValueError(f"Device {name} depends on unknown devices: {sorted(unknown)}")
+        levels = []
+        done: set[str] = set()
+        while remaining:
+            level = [name for name, deps in remaining.items() if deps <= done]
+            if not level:
+                raise ValueError(f"Circular device dependencies: {sorted(remaining)}")
+            levels.append(level)
+            done.update(level)
+            for name in level:
+                del remaining[name]
+        return levels
+    
+    async def _initialize_levels(self) -> dict[str, BaseException]:
+        """Initialize each level concurrently; stop at the first failing level."""
+        for level in self._levels():
+            results = await asyncio.gather(
+                *(self._initialize_one(name) for name in level), return_exceptions=True
+            )
+            errors = {name: result for name, result in zip(level, results) if isinstance(result, BaseException)}
+            if errors:
+                return errors
+        return {}
+    
+    async def _initialize_one(self, name: str) -> None:
+        """Initialize one device with its timeout and record the duration."""
+        entry = self._entries[name]
+        timeout_s = entry.timeout_s if entry.timeout_s is not None else self._default_timeout_s
+        start = time.perf_counter()
+        if entry.closing is not None:
+            # A retry must not start before the timed-out attempt is closed;
+            # shielded, so timing out here does not cancel the queued close
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(entry.closing)), timeout_s)
+            entry.closing = None
+        try:
+            await asyncio.wait_for(entry.device.initialize(), timeout_s)
+        except asyncio.TimeoutError:
+            # A timed-out driver call cannot be interrupted: close the device
+            # once it returns, and give a retry a fresh worker thread
+            entry.closing = entry.device.abandon()
+            entry.device = wrap_async(entry.device.device, name)
+            raise
+        self._init_timings[name] = time.perf_counter() - start
+        entry.initialized = True
+    
+    async def _close_levels(self) -> dict[str, BaseException]:
+        """Close initialized devices level by level, dependents first."""
+        errors: dict[str, BaseException] = {}
+        for level in reversed(self._levels()):
+            names = [name for name in level if self._entries[name].initialized]
+            results = await asyncio.gather(
+                *(self._entries[name].device.close() for name in names), return_exceptions=True
+            )
+            for name, result in zip(names, results):
+                entry = self._entries[name]
+                entry.initialized = False
+                # close() stops the worker thread; a later initialize() needs a new one
+                entry.device = wrap_async(entry.device.device, name)
+                if isinstance(result, BaseException):
+                    errors[name] = result
+        return errors
+
+
+def _build_camera(config: CameraConfig, simulation: bool) -> Camera:
+    """Build the configured camera driver."""
+    from .simulated_ import SimulatedCamera
+    
+    if simulation:
+        return SimulatedCamera(frame_rate_hz=config.frame_rate_hz, name=config.name)
+    # This is where you would instantiate actual camera drivers by type.
+    # Import vendor SDK modules here, not at module level, so only the
+    # selected driver's SDK is loaded. For now, using simulated as placeholder.
+    return SimulatedCamera(frame_rate_hz=config.frame_rate_hz, name=config.name)
+
+
+def _build_pump(config: PumpConfig, simulation: bool) -> Pump:
+    """Build a configured pump driver."""
+    from .simulated_ import SimulatedPump
+    
+    if simulation:
+        return SimulatedPump(config.name)
+    # This is where you would instantiate actual pump drivers by backend
+    return SimulatedPump(config.name)
+
+
+def _build_valve(config: ValveConfig, simulation: bool) -> Valve:
+    """Build a configured valve driver."""
+    from .simulated_ import SimulatedValve
+    
+    if simulation:
+        return SimulatedValve(config.name)
+    # This is where you would instantiate actual valve drivers by backend
+    return SimulatedValve(config.name)
+
+
+def _build_sensor(config: SensorConfig, simulation: bool) -> Sensor:
+    """Build a configured sensor driver."""
+    from .simulated_ import SimulatedSensor
+    
+    if simulation:
+        return SimulatedSensor(config.name, config.unit or "units")
+    # This is where you would instantiate actual sensor drivers by backend
+    return SimulatedSensor(config.name, config.unit or "units")
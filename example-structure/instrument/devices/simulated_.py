@@ -6,29 +6,92 @@ requiring actual hardware. Useful for testing and development.
 
 from __future__ import annotations
 
+import math
 import time
+
 import numpy as np
+
+from instrument.log import device_logger
+
 from .base import Camera, Pump, Sensor, Valve
 
 
 class SimulatedCamera(Camera):
-    """Simulated camera that generates synthetic images."""
+    """Simulated camera that generates synthetic images.
+    
+    Patterns:
+        "random": fresh uniform 12-bit noise every frame (slowest).
+        "tiles": cycles through precomputed, seeded noise frames.
+        "droplets": dim noise tiles with bright droplets moving along x.
+    """
     
-    def __init__(self, width: int = 1024, height: int = 1024) -> None:
+    def __init__(
+        self,
+        width: int = 1024,
+        height: int = 1024,
+        pattern: str = "random",
+        seed: int | None = None,
+        num_tiles: int = 8,
+        num_droplets: int = 10,
+        droplet_radius: int = 12,
+        frame_rate_hz: float | None = None,
+        name: str = "camera",
+    ) -> None:
+        """Initialize simulated camera.
+        
+        Args:
+            width: Frame width in pixels.
+            height: Frame height in pixels.
+            pattern: "random", "tiles" or "droplets".
+            seed: Seed for reproducible content (PCG64).
+            num_tiles: Number of precomputed noise frames.
+            num_droplets: Number of droplets for the "droplets" pattern.
+            droplet_radius: Droplet radius in pixels.
+            frame_rate_hz: Target frame rate; None grabs as fast as possible.
+                Frames are never faster than the exposure time allows. Also
+                the rate of the simulated hardware trigger line.
+            name: Device name (selects the logger).
+        """
+        if pattern not in ("random", "tiles", "droplets"):
+            raise ValueError(f"Invalid pattern: {pattern}")
         self._width = width
         self._height = height
+        self._log = device_logger(name)
+        self._pattern = pattern
         self._exposure_ms = 20.0
+        self._frame_rate_hz = frame_rate_hz
         self._initialized = False
+        self._rng = np.random.Generator(np.random.PCG64(seed))
+        self._roi = (0, 0, height, width)
+        self._scratch = np.empty((height, width), dtype=np.float32)
+        self._frame_count = 0
+        self._next_frame_time = 0.0
+        self._hardware_trigger = False
+        self._last_edge = -1
+        
+        self._tiles: np.ndarray | None = None
+        if pattern != "random":
+            low, high = (0, 4095) if pattern == "tiles" else (100, 300)
+            self._tiles = self._rng.integers(low, high, (num_tiles, height, width), dtype=np.uint16)
+        
+        # Droplets: positions (y, x) and per-frame velocity along the channel
+        self._droplet_stamp = self._make_droplet_stamp(droplet_radius)
+        self._droplet_pos = np.column_stack([
+            self._rng.uniform(0, height, num_droplets),
+            self._rng.uniform(0, width, num_droplets),
+        ])
+        self._droplet_velocity = self._rng.uniform(2.0, 8.0, num_droplets)
     
     def initialize(self) -> None:
         """Initialize simulated camera."""
         self._initialized = True
-        print("[SimulatedCamera] Initialized")
+        self._next_frame_time = time.perf_counter()
+        self._log.info("Initialized")
     
     def close(self) -> None:
         """Close simulated camera."""
         self._initialized = False
-        print("[SimulatedCamera] Closed")
+        self._log.info("Closed")
     
     def grab_frame(self) -> np.ndarray:
         """Generate a synthetic frame."""
@@ -36,43 +99,169 @@ class SimulatedCamera(Camera):
             raise RuntimeError("Camera not initialized")
         
         # Generate a simple synthetic image
-        frame = np.random.randint(0, 4095, (self._height, self._width), dtype=np.uint16)
-        return frame
+        return self.grab_frame_into(np.empty(self._roi[2:], dtype=np.uint16))
+    
+    def grab_frame_into(self, out: np.ndarray) -> np.ndarray:
+        """Generate a synthetic frame into a preallocated buffer."""
+        if not self._initialized:
+            raise RuntimeError("Camera not initialized")
+        if self._hardware_trigger:
+            self._wait_for_trigger()
+        else:
+            self._wait_for_frame()
+        
+        if self._tiles is None:
+            # Reuse a float scratch buffer so no per-frame arrays are allocated
+            self._rng.random(dtype=np.float32, out=self._scratch)
+            np.multiply(self._scratch, 4095, out=out, casting="unsafe")
+        else:
+            y, x, height, width = self._roi
+            np.copyto(out, self._tiles[self._frame_count % len(self._tiles), y:y + height, x:x + width])
+            if self._pattern == "droplets":
+                self._draw_droplets(out)
+        self._frame_count += 1
+        return out
     
     def set_exposure_time(self, exposure_ms: float) -> None:
         """Set exposure time (simulated)."""
         self._exposure_ms = exposure_ms
-        print(f"[SimulatedCamera] Exposure set to {exposure_ms} ms")
+        self._log.info("Exposure set to %s ms", exposure_ms)
+    
+    @property
+    def supports_roi(self) -> bool:
+        """Simulated camera supports a hardware ROI."""
+        return True
+    
+    def set_roi(self, y: int, x: int, height: int, width: int) -> None:
+        """Only generate pixels inside the region (simulated sensor crop)."""
+        if y < 0 or x < 0 or height < 1 or width < 1 or y + height > self._height or x + width > self._width:
+            raise ValueError(f"ROI outside the {self._height}x{self._width} sensor: {(y, x, height, width)}")
+        self._roi = (y, x, height, width)
+        self._scratch = np.empty((height, width), dtype=np.float32)
+        self._log.info("ROI set to y=%s x=%s %sx%s", y, x, height, width)
+    
+    @property
+    def supports_hardware_trigger(self) -> bool:
+        """Simulated camera has a simulated trigger input."""
+        return True
+    
+    def set_hardware_trigger(self, enabled: bool) -> None:
+        """Wait for edges of a simulated trigger line shared by all simulated cameras.
+        
+        The line fires every 1 / frame_rate_hz seconds on the perf_counter
+        clock, so simulated cameras with the same rate expose together.
+        """
+        if enabled and self._frame_rate_hz is None:
+            raise ValueError("Hardware trigger needs frame_rate_hz for the simulated trigger line")
+        self._hardware_trigger = enabled
+        self._last_edge = -1
+        self._log.info("Hardware trigger %s", "enabled" if enabled else "disabled")
+    
+    def _wait_for_trigger(self) -> None:
+        """Sleep until the next trigger edge; edges missed while busy are lost."""
+        period = 1.0 / self._frame_rate_hz
+        edge = max(math.floor(time.perf_counter() / period) + 1, self._last_edge + 1)
+        delay = edge * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_edge = edge
+    
+    def _wait_for_frame(self) -> None:
+        """Pace frames to the target frame rate, never faster than the exposure."""
+        if self._frame_rate_hz is None:
+            return
+        period = max(1.0 / self._frame_rate_hz, self._exposure_ms / 1000.0)
+        now = time.perf_counter()
+        if self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        # Absolute deadlines, restarting from now if we fell behind
+        self._next_frame_time = max(self._next_frame_time, now) + period
+    
+    def _draw_droplets(self, out: np.ndarray) -> None:
+        """Advance droplets along x and draw them into the frame (ROI coordinates)."""
+        self._droplet_pos[:, 1] = (self._droplet_pos[:, 1] + self._droplet_velocity) % self._width
+        radius = self._droplet_stamp.shape[0] // 2
+        roi_y, roi_x, roi_height, roi_width = self._roi
+        for y, x in self._droplet_pos.astype(np.int64):
+            y0, x0 = y - radius - roi_y, x - radius - roi_x
+            # Clip the stamp to the frame borders
+            sy0, sx0 = max(0, -y0), max(0, -x0)
+            fy0, fx0 = max(0, y0), max(0, x0)
+            fy1 = min(roi_height, y0 + self._droplet_stamp.shape[0])
+            fx1 = min(roi_width, x0 + self._droplet_stamp.shape[1])
+            if fy1 <= fy0 or fx1 <= fx0:
+                continue
+            region = out[fy0:fy1, fx0:fx1]
+            stamp = self._droplet_stamp[sy0:sy0 + fy1 - fy0, sx0:sx0 + fx1 - fx0]
+            np.maximum(region, stamp, out=region)
+    
+    @staticmethod
+    def _make_droplet_stamp(radius: int) -> np.ndarray:
+        """Precompute a bright disk image for one droplet."""
+        yy, xx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        disk = (yy**2 + xx**2) <= radius**2
+        return (disk * 3000).astype(np.uint16)
 
 
 class SimulatedPump(Pump):
     """Simulated pump that maintains flow rate state."""
     
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, native_ramp: bool = False) -> None:
+        """Initialize simulated pump.
+        
+        Args:
+            name: Pump name.
+            native_ramp: Simulate a pump with a built-in ramp command.
+        """
         self._name = name
+        self._log = device_logger(name)
         self._current_rate = 0.0
         self._initialized = False
+        self._native_ramp = native_ramp
+        self._ramp: tuple[float, float, float, float] | None = None  # start, end, t0, duration
     
     def initialize(self) -> None:
         """Initialize simulated pump."""
         self._initialized = True
-        print(f"[SimulatedPump {self._name}] Initialized")
+        self._log.info("Initialized")
     
     def close(self) -> None:
         """Close simulated pump."""
         self._initialized = False
-        print(f"[SimulatedPump {self._name}] Closed")
+        self._log.info("Closed")
     
     def set_flow_rate(self, rate_ul_min: float) -> None:
         """Set flow rate (simulated)."""
         if not self._initialized:
             raise RuntimeError("Pump not initialized")
+        self._ramp = None
         self._current_rate = rate_ul_min
-        print(f"[SimulatedPump {self._name}] Flow rate set to {rate_ul_min} uL/min")
+        self._log.info("Flow rate set to %s uL/min", rate_ul_min)
     
     def get_flow_rate(self) -> float:
         """Get current flow rate."""
+        if self._ramp is not None:
+            start, end, t0, duration = self._ramp
+            fraction = min(1.0, (time.perf_counter() - t0) / duration) if duration > 0 else 1.0
+            self._current_rate = start + (end - start) * fraction
+            if fraction >= 1.0:
+                self._ramp = None
         return self._current_rate
+    
+    @property
+    def supports_ramp(self) -> bool:
+        """Check if the simulated pump has a native ramp command."""
+        return self._native_ramp
+    
+    def ramp_flow_rate(self, start_ul_min: float, end_ul_min: float, duration_s: float) -> None:
+        """Start a linear ramp (simulated firmware ramp)."""
+        if not self._native_ramp:
+            super().ramp_flow_rate(start_ul_min, end_ul_min, duration_s)
+        if not self._initialized:
+            raise RuntimeError("Pump not initialized")
+        self._current_rate = start_ul_min
+        self._ramp = (start_ul_min, end_ul_min, time.perf_counter(), duration_s)
+        self._log.info("Ramping %s -> %s uL/min over %s s", start_ul_min, end_ul_min, duration_s)
 
 
 class SimulatedValve(Valve):
@@ -80,6 +269,7 @@ class SimulatedValve(Valve):
     
     def __init__(self, name: str, num_channels: int = 2) -> None:
         self._name = name
+        self._log = device_logger(name)
         self._num_channels = num_channels
         self._current_channel = 0
         self._initialized = False
@@ -87,12 +277,12 @@ class SimulatedValve(Valve):
     def initialize(self) -> None:
         """Initialize simulated valve."""
         self._initialized = True
-        print(f"[SimulatedValve {self._name}] Initialized")
+        self._log.info("Initialized")
     
     def close(self) -> None:
         """Close simulated valve."""
         self._initialized = False
-        print(f"[SimulatedValve {self._name}] Closed")
+        self._log.info("Closed")
     
     def switch_channel(self, channel: int) -> None:
         """Switch to channel (simulated)."""
@@ -101,7 +291,7 @@ class SimulatedValve(Valve):
         if channel < 0 or channel >= self._num_channels:
             raise ValueError(f"Invalid channel: {channel}")
         self._current_channel = channel
-        print(f"[SimulatedValve {self._name}] Switched to channel {channel}")
+        self._log.info("Switched to channel %s", channel)
     
     def get_current_channel(self) -> int:
         """Get current channel."""
@@ -113,18 +303,19 @@ class SimulatedSensor(Sensor):
     
     def __init__(self, name: str, unit: str = "units") -> None:
         self._name = name
+        self._log = device_logger(name)
         self._unit = unit
         self._initialized = False
     
     def initialize(self) -> None:
         """Initialize simulated sensor."""
         self._initialized = True
-        print(f"[SimulatedSensor {self._name}] Initialized")
+        self._log.info("Initialized")
     
     def close(self) -> None:
         """Close simulated sensor."""
         self._initialized = False
-        print(f"[SimulatedSensor {self._name}] Closed")
+        self._log.info("Closed")
     
     def read_value(self) -> float:
         """Read sensor value (simulated)."""
@@ -1,6 +1,21 @@
-"""GUI components for the instrument control software."""
+"""GUI components for the instrument control software.
 
-from .main_window import MainWindow
+Imported on first access, so headless code importing other parts of the
+package never loads Qt.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from instrument._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .main_window import MainWindow
 
 __all__ = ["MainWindow"]
 
+# Exported name -> defining submodule
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "MainWindow": ".main_window",
+})
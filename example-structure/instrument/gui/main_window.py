@@ -7,22 +7,39 @@ from __future__ import annotations
 
 from qtpy.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QWidget
 
+from instrument.controllers.experiment_controller import ExperimentController
 from instrument.controllers.live_controller import LiveController
+from instrument.controllers.pump_controller import PumpController
 from instrument.gui.widgets.camera_widget import CameraWidget
+from instrument.gui.widgets.pump_widget import PumpWidget
 from instrument.gui.widgets.status_widget import StatusWidget
+from instrument.gui.widgets.trigger_widget import TriggerWidget
+from instrument.metrics import Metrics
 
 
 class MainWindow(QMainWindow):
     """Main application window."""
     
-    def __init__(self, live_controller: LiveController) -> None:
+    def __init__(
+        self,
+        live_controller: LiveController,
+        metrics: Metrics | None = None,
+        experiment_controller: ExperimentController | None = None,
+        pumps: dict[str, PumpController] | None = None,
+    ) -> None:
         """Initialize main window.
         
         Args:
             live_controller: Live view controller.
+            metrics: Runtime metrics shown in the status tab.
+            experiment_controller: Adds a trigger tab for triggered capture.
+            pumps: Started pump controllers by name; one tab each.
         """
         super().__init__()
         self._live_controller = live_controller
+        self._experiment_controller = experiment_controller
+        self._metrics = metrics
+        self._pumps = pumps or {}
         self.setWindowTitle("Example Instrument Control")
         self._setup_ui()
     
@@ -33,8 +50,12 @@ class MainWindow(QMainWindow):
         
         # Create tabbed interface
         tabs = QTabWidget()
-        tabs.addTab(CameraWidget(self._live_controller), "Camera")
-        tabs.addTab(StatusWidget(), "Status")
+        tabs.addTab(CameraWidget(self._live_controller, metrics=self._metrics), "Camera")
+        for name, pump in self._pumps.items():
+            tabs.addTab(PumpWidget(pump), name)
+        if self._experiment_controller is not None:
+            tabs.addTab(TriggerWidget(self._experiment_controller), "Trigger")
+        tabs.addTab(StatusWidget(self._metrics), "Status")
         
         layout.addWidget(tabs)
         central_widget.setLayout(layout)
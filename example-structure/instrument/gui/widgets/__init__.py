@@ -1,12 +1,27 @@
 """GUI widgets.
 
 One widget per file - not monolithic. Each widget handles a specific
-aspect of the user interface.
+aspect of the user interface. Widgets are imported on first access.
 """
 
-from .camera_widget import CameraWidget
-from .pump_widget import PumpWidget
-from .status_widget import StatusWidget
+from __future__ import annotations
 
-__all__ = ["CameraWidget", "PumpWidget", "StatusWidget"]
+from typing import TYPE_CHECKING
 
+from instrument._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .camera_widget import CameraWidget
+    from .pump_widget import PumpWidget
+    from .status_widget import StatusWidget
+    from .trigger_widget import TriggerWidget
+
+__all__ = ["CameraWidget", "PumpWidget", "StatusWidget", "TriggerWidget"]
+
+# Exported name -> defining submodule
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "CameraWidget": ".camera_widget",
+    "PumpWidget": ".pump_widget",
+    "StatusWidget": ".status_widget",
+    "TriggerWidget": ".trigger_widget",
+})
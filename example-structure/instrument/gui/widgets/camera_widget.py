@@ -5,28 +5,49 @@ Provides UI for camera settings and live view.
 
 from __future__ import annotations
 
-from qtpy.QtWidgets import QPushButton, QVBoxLayout, QWidget
+import time
+
+from qtpy.QtCore import Qt, QTimer
+from qtpy.QtGui import QImage, QPixmap
+from qtpy.QtWidgets import QLabel, QPushButton, QSizePolicy, QVBoxLayout, QWidget
 
 from instrument.controllers.live_controller import LiveController
+from instrument.metrics import Metrics
 
 
 class CameraWidget(QWidget):
     """Widget for camera control."""
     
-    def __init__(self, live_controller: LiveController) -> None:
+    def __init__(
+        self,
+        live_controller: LiveController,
+        max_display_fps: float = 30.0,
+        metrics: Metrics | None = None,
+    ) -> None:
         """Initialize camera widget.
         
         Args:
             live_controller: Live view controller.
+            max_display_fps: Maximum live view repaint rate.
+            metrics: Records live view repaint latency.
         """
         super().__init__()
         self._live_controller = live_controller
+        self._max_display_fps = max_display_fps
+        self._metrics = metrics if metrics is not None and metrics.enabled else None
         self._setup_ui()
     
     def _setup_ui(self) -> None:
         """Set up the widget UI."""
         layout = QVBoxLayout()
         
+        # Live image display
+        self._image_label = QLabel()
+        self._image_label.setAlignment(Qt.AlignCenter)
+        self._image_label.setMinimumSize(320, 240)
+        self._image_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self._image_label)
+        
         # Example: Add live view toggle button
         self._live_button = QPushButton("Start Live")
         self._live_button.clicked.connect(self._toggle_live)
@@ -35,13 +56,44 @@ class CameraWidget(QWidget):
         # Add more camera controls here (exposure, gain, etc.)
         
         self.setLayout(layout)
+        
+        # Repaint timer; frames arriving faster than this are dropped
+        self._display_timer = QTimer(self)
+        self._display_timer.setInterval(int(1000 / self._max_display_fps))
+        self._display_timer.timeout.connect(self._update_image)
     
     def _toggle_live(self) -> None:
         """Toggle live view on/off."""
         if self._live_controller.is_live:
+            self._display_timer.stop()
             self._live_controller.stop_live()
             self._live_button.setText("Start Live")
         else:
             self._live_controller.start_live()
+            self._display_timer.start()
             self._live_button.setText("Stop Live")
-
+    
+    def _update_image(self) -> None:
+        """Show the latest live frame, if a new one arrived."""
+        start_ns = time.perf_counter_ns()
+        image = self._live_controller.latest_display_image(
+            self._image_label.height(), self._image_label.width()
+        )
+        if image is None:
+            if not self._live_controller.is_live:
+                # Live view stopped on its own (e.g. camera error)
+                self._display_timer.stop()
+                self._live_button.setText("Start Live")
+            return
+        height, width = image.shape
+        qimage = QImage(image.data, width, height, image.strides[0], QImage.Format_Grayscale8)
+        # QPixmap copies the pixels, so the numpy buffer may be freed afterwards
+        self._image_label.setPixmap(QPixmap.fromImage(qimage))
+        if self._metrics is not None:
+            self._metrics.observe("gui.repaint", (time.perf_counter_ns() - start_ns) / 1e9)
+    
+    def closeEvent(self, event) -> None:  # noqa: N802 (Qt naming)
+        """Stop live view when the widget closes."""
+        self._display_timer.stop()
+        self._live_controller.stop_live()
+        super().closeEvent(event)
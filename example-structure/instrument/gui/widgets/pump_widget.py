@@ -7,17 +7,18 @@ from __future__ import annotations
 
 from qtpy.QtWidgets import QDoubleSpinBox, QLabel, QVBoxLayout, QWidget
 
-from instrument.devices.base import Pump
+from instrument.controllers.pump_controller import PumpController
 
 
 class PumpWidget(QWidget):
     """Widget for pump control."""
     
-    def __init__(self, pump: Pump) -> None:
+    def __init__(self, pump: PumpController) -> None:
         """Initialize pump widget.
         
         Args:
-            pump: Pump device to control.
+            pump: Started pump controller. Spinbox ticks only replace its
+                pending set-point, so fast scrolling never floods the bus.
         """
         super().__init__()
         self._pump = pump
@@ -45,5 +46,5 @@ class PumpWidget(QWidget):
         Args:
             value: New flow rate value.
         """
-        self._pump.set_flow_rate(value)
+        self._pump.set_flow_rate(value)  # Returns at once; coalesced by the controller
 
@@ -5,15 +5,26 @@ Shows instrument status, logs, and system information.
 
 from __future__ import annotations
 
+from qtpy.QtCore import QTimer
+from qtpy.QtGui import QFontDatabase
 from qtpy.QtWidgets import QLabel, QVBoxLayout, QWidget
 
+from instrument.metrics import Metrics
+
 
 class StatusWidget(QWidget):
     """Widget for displaying instrument status."""
     
-    def __init__(self) -> None:
-        """Initialize status widget."""
+    def __init__(self, metrics: Metrics | None = None, refresh_s: float = 1.0) -> None:
+        """Initialize status widget.
+        
+        Args:
+            metrics: Runtime metrics to display (None hides the table).
+            refresh_s: Metrics refresh interval in seconds.
+        """
         super().__init__()
+        self._metrics = metrics
+        self._refresh_s = refresh_s
         self._setup_ui()
     
     def _setup_ui(self) -> None:
@@ -24,7 +35,44 @@ class StatusWidget(QWidget):
         status_label = QLabel("Status: Ready")
         layout.addWidget(status_label)
         
+        # Latency table (p50/p99/max per stage) and frame counters
+        self._metrics_label = QLabel()
+        self._metrics_label.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self._metrics_label)
+        layout.addStretch()
+        
         # Add more status information here (logs, system info, etc.)
         
         self.setLayout(layout)
+        
+        self._metrics_timer = QTimer(self)
+        self._metrics_timer.setInterval(int(1000 * self._refresh_s))
+        self._metrics_timer.timeout.connect(self._update_metrics)
+        if self._metrics is not None and self._metrics.enabled:
+            self._metrics_timer.start()
+            self._update_metrics()
+    
+    def _update_metrics(self) -> None:
+        """Refresh the metrics table."""
+        self._metrics_label.setText(format_metrics(self._metrics.snapshot()))
+
 
+def format_metrics(snapshot: dict) -> str:
+    """Format a metrics snapshot as a fixed-width text table.
+    
+    Args:
+        snapshot: Result of Metrics.snapshot().
+    
+    Returns:
+        Table with one row per latency stage, then the counters.
+    """
+    lines = [f"{'stage':<32}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, stats in snapshot["latency"].items():
+        lines.append(
+            f"{name:<32}{stats['count']:>8}{stats['p50_s'] * 1e3:>10.3f}"
+            f"{stats['p99_s'] * 1e3:>10.3f}{stats['max_s'] * 1e3:>10.3f}"
+        )
+    lines.append("")
+    for name, value in snapshot["counters"].items():
+        lines.append(f"{name:<32}{value:>8}")
+    return "\n".join(lines)
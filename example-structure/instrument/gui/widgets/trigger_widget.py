@@ -0,0 +1,45 @@
+"""Trigger widget.
+
+Manual trigger button for event-triggered capture.
+"""
+
+from __future__ import annotations
+
+from qtpy.QtWidgets import QLabel, QPushButton, QVBoxLayout, QWidget
+
+from instrument.controllers.experiment_controller import ExperimentController
+
+
+class TriggerWidget(QWidget):
+    """Widget for firing the capture trigger."""
+    
+    def __init__(self, experiment_controller: ExperimentController) -> None:
+        """Initialize trigger widget.
+        
+        Args:
+            experiment_controller: Controller running the triggered acquisition.
+        """
+        super().__init__()
+        self._experiment_controller = experiment_controller
+        self._setup_ui()
+    
+    def _setup_ui(self) -> None:
+        """Set up the widget UI."""
+        layout = QVBoxLayout()
+        
+        # Stores the pre-trigger frames plus the next post-trigger frames
+        self._trigger_button = QPushButton("Trigger")
+        self._trigger_button.clicked.connect(self._on_trigger)
+        layout.addWidget(self._trigger_button)
+        
+        self._status_label = QLabel("No triggered acquisition running")
+        layout.addWidget(self._status_label)
+        
+        self.setLayout(layout)
+    
+    def _on_trigger(self) -> None:
+        """Fire the trigger if a triggered acquisition is running."""
+        if not self._experiment_controller.trigger("manual"):
+            self._status_label.setText("No triggered acquisition running")
+        else:
+            self._status_label.setText("Trigger sent")
@@ -0,0 +1,130 @@
+"""Non-blocking structured logging.
+
+Log calls only put the record on an in-memory queue; a background listener
+thread writes them as rotating JSON-lines files into PathsConfig.log_dir.
+Device drivers log through device_logger(name), so each device's level can
+be set from the configuration.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from instrument.config import LoggingConfig
+
+ROOT_LOGGER = "instrument"
+DEVICE_LOGGER = "instrument.devices"
+
+
+def device_logger(name: str) -> logging.Logger:
+    """Get the logger of one device.
+    
+    Args:
+        name: Device name from the configuration.
+    
+    Returns:
+        Logger "instrument.devices.<name>".
+    """
+    return logging.getLogger(f"{DEVICE_LOGGER}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record as a JSON line."""
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class LogPipeline:
+    """Queue handler on the "instrument" logger plus its listener thread."""
+    
+    def __init__(self, log_dir: Path | str, config: LoggingConfig | None = None) -> None:
+        """Initialize logging pipeline (not started).
+        
+        Args:
+            log_dir: Directory for the JSON-lines log files.
+            config: Levels and rotation settings.
+        """
+        self._config = config or LoggingConfig()
+        self._log_dir = Path(log_dir)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._queue_handler = logging.handlers.QueueHandler(self._queue)
+        self._listener: logging.handlers.QueueListener | None = None
+    
+    def start(self) -> None:
+        """Attach the queue handler and start writing log files."""
+        if self._listener is not None:
+            return
+        self._log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            self._log_dir / self._config.filename,
+            maxBytes=self._config.max_bytes,
+            backupCount=self._config.backup_count,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers: list[logging.Handler] = [file_handler]
+        if self._config.console_level is not None:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setLevel(self._config.console_level)
+            console_handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+            handlers.append(console_handler)
+        
+        # respect_handler_level lets the console stay quieter than the file
+        self._listener = logging.handlers.QueueListener(self._queue, *handlers, respect_handler_level=True)
+        self._listener.start()
+        
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(self._config.level)
+        root.addHandler(self._queue_handler)
+        root.propagate = False
+        for name, level in self._config.device_levels.items():
+            device_logger(name).setLevel(level)
+    
+    def stop(self) -> None:
+        """Detach the queue handler and flush all queued records to disk."""
+        if self._listener is None:
+            return
+        root = logging.getLogger(ROOT_LOGGER)
+        root.removeHandler(self._queue_handler)
+        root.propagate = True
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        self._listener = None
+    
+    @property
+    def log_file(self) -> Path:
+        """Current log file."""
+        return self._log_dir / self._config.filename
+
+
+def setup_logging(log_dir: Path | str, config: LoggingConfig | None = None) -> LogPipeline:
+    """Start the logging pipeline.
+    
+    Args:
+        log_dir: Directory for the JSON-lines log files.
+        config: Levels and rotation settings.
+    
+    Returns:
+        Running pipeline; call stop() on shutdown.
+    """
+    pipeline = LogPipeline(log_dir, config)
+    pipeline.start()
+    return pipeline
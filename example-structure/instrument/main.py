@@ -5,48 +5,107 @@ Builds devices, controllers, and GUI based on configuration.
 
 from __future__ import annotations
 
+import logging
 import sys
 from pathlib import Path
 
-from qtpy.QtWidgets import QApplication
-
 from instrument.config import InstrumentConfig
 from instrument.controllers.experiment_controller import ExperimentController
 from instrument.controllers.live_controller import LiveController
-from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump
-from instrument.gui.main_window import MainWindow
+from instrument.controllers.multi_camera import MultiCameraController
+from instrument.controllers.pump_controller import PumpController
+from instrument.controllers.reduction import configure_reduction
+from instrument.controllers.sensor_controller import SensorController
+from instrument.devices.registry import DeviceRegistry
+from instrument.log import setup_logging
+from instrument.metrics import Metrics
+
+logger = logging.getLogger(__name__)
 
 
-def build_instrument(config: InstrumentConfig) -> tuple[LiveController, ExperimentController]:
+def build_instrument(
+    config: InstrumentConfig,
+    metrics: Metrics | None = None,
+) -> tuple[LiveController, ExperimentController | MultiCameraController, DeviceRegistry]:
     """Build instrument from configuration.
     
+    With more than one camera configured, experiments acquire from all of
+    them in sync while the live view shows the primary camera.
+    
     Args:
         config: Instrument configuration.
+        metrics: Records grab, save and device command latencies.
     
     Returns:
-        Tuple of (live_controller, experiment_controller).
+        Tuple of (live_controller, experiment_controller, device_registry).
+        Close the registry to shut down all devices.
     """
-    # Build devices based on config
-    if config.simulation:
-        # Use simulated devices
-        camera = SimulatedCamera()
-        pump = SimulatedPump("sample_pump")
-    else:
-        # Build real devices based on config
-        # This is where you would instantiate actual camera/pump drivers
-        # For now, using simulated as placeholder
-        camera = SimulatedCamera()
-        pump = SimulatedPump("sample_pump")
+    # Build all configured devices (simulated or real, per config.simulation)
+    registry = DeviceRegistry.from_config(config)
+    if not registry.cameras or not registry.pumps:
+        raise ValueError("Configuration needs a camera and at least one pump")
+    
+    # Initialize devices concurrently
+    for name, elapsed_s in registry.initialize().items():
+        logger.info("Initialized %s in %.2f s", name, elapsed_s)
+    camera = registry.cameras[0]
+    pump = registry.pumps[0]
     
-    # Initialize devices
-    camera.initialize()
-    pump.initialize()
+    # Time every pump and valve command
+    if metrics is not None and metrics.enabled:
+        for pump_config in config.pumps:
+            metrics.wrap(registry.get(pump_config.name), "set_flow_rate", f"pump.{pump_config.name}.set_flow_rate")
+        for valve_config in config.valves:
+            metrics.wrap(registry.get(valve_config.name), "switch_channel", f"valve.{valve_config.name}.switch_channel")
+    
+    # Poll every configured sensor at its own rate
+    sensors = SensorController()
+    for sensor_config in config.sensors:
+        sensors.add_sensor(
+            sensor_config.name,
+            registry.get(sensor_config.name),
+            sensor_config.sample_rate_hz,
+            sensor_config.history_s,
+        )
+    
+    # Crop on the camera when it can, otherwise in software before display and storage
+    reducers = {
+        camera_config.name: configure_reduction(registry.get(camera_config.name), camera_config.roi, camera_config.binning)
+        for camera_config in config.all_cameras
+    }
+    reducer = reducers[config.all_cameras[0].name]
     
     # Build controllers
-    live_controller = LiveController(camera)
-    experiment_controller = ExperimentController(camera, pump)
+    live_controller = LiveController(camera, reducer)
+    if len(reducers) > 1:
+        experiment_controller = MultiCameraController(
+            {name: registry.get(name) for name in reducers}, pump, config.experiment, sensors,
+            metrics=metrics, reducers=reducers,
+        )
+    else:
+        experiment_controller = ExperimentController(
+            camera, pump, config.experiment, sensors, metrics=metrics, reducer=reducer
+        )
+    
+    return live_controller, experiment_controller, registry
+
+
+def build_pump_controllers(config: InstrumentConfig, registry: DeviceRegistry) -> dict[str, PumpController]:
+    """Start a rate-limited pump controller for every configured pump.
     
-    return live_controller, experiment_controller
+    Args:
+        config: Instrument configuration.
+        registry: Registry with initialized devices.
+    
+    Returns:
+        Started pump controllers by pump name; stop them before closing the registry.
+    """
+    controllers = {}
+    for pump_config in config.pumps:
+        controller = PumpController(registry.get(pump_config.name), pump_config.command_rate_hz, pump_config.name)
+        controller.start()
+        controllers[pump_config.name] = controller
+    return controllers
 
 
 def main() -> int:
@@ -54,6 +113,7 @@ def main() -> int:
     
     Run with: python -m instrument.main
     Or: python instrument/main.py
+    Headless runs without Qt: python -m instrument.cli
     """
     # Load configuration
     config_path = Path("instrument-config.yaml")
@@ -63,18 +123,44 @@ def main() -> int:
     
     config = InstrumentConfig.from_file(config_path)
     
+    # Write logs to paths.log_dir from a background thread
+    log_pipeline = setup_logging(config.paths.log_dir, config.logging)
+    
+    # Latency metrics, optionally scraped by Prometheus
+    metrics = Metrics(config.metrics.enabled)
+    metrics_server = None
+    if config.metrics.enabled and config.metrics.prometheus_port is not None:
+        metrics_server = metrics.serve_prometheus(config.metrics.prometheus_port)
+    
     # Build instrument
-    live_controller, experiment_controller = build_instrument(config)
+    live_controller, experiment_controller, registry = build_instrument(config, metrics)
+    pump_controllers = build_pump_controllers(config, registry)
+    
+    # Qt is only imported here, so build_instrument() stays headless
+    from qtpy.QtWidgets import QApplication
+    
+    from instrument.gui.main_window import MainWindow
     
     # Create Qt application
     app = QApplication(sys.argv)
     
     # Create main window
-    window = MainWindow(live_controller)
+    window = MainWindow(live_controller, metrics, experiment_controller, pump_controllers)
     window.show()
     
     # Run event loop
-    return app.exec_()
+    try:
+        return app.exec_()
+    finally:
+        live_controller.stop_live()
+        for pump_controller in pump_controllers.values():
+            pump_controller.stop()
+        registry.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if config.metrics.enabled and config.metrics.json_path:
+            metrics.write_json(config.metrics.json_path)
+        log_pipeline.stop()
 
 
 if __name__ == "__main__":
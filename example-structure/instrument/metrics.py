@@ -0,0 +1,263 @@
+"""Lightweight runtime metrics.
+
+Latency histograms and counters for the acquisition, storage, device and
+GUI hot paths, with JSON and Prometheus text export. Components take an
+optional Metrics object; when none is given they skip timing entirely.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Histogram bucket upper edges: 10 per decade from 1 us to 100 s
+_BUCKET_EDGES_S = [10 ** (exponent / 10) for exponent in range(-60, 21)]
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with exact count, sum and max."""
+    
+    def __init__(self) -> None:
+        """Initialize empty histogram."""
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(_BUCKET_EDGES_S) + 1)
+        self._count = 0
+        self._sum_s = 0.0
+        self._max_s = 0.0
+    
+    def record(self, seconds: float) -> None:
+        """Record one latency sample.
+        
+        Args:
+            seconds: Latency in seconds.
+        """
+        index = bisect.bisect_left(_BUCKET_EDGES_S, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_s += seconds
+            if seconds > self._max_s:
+                self._max_s = seconds
+    
+    def percentile(self, percent: float) -> float:
+        """Approximate percentile (upper edge of the containing bucket).
+        
+        Args:
+            percent: Percentile in [0, 100].
+        
+        Returns:
+            Latency in seconds (0 if empty).
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            max_s = self._max_s
+        if total == 0:
+            return 0.0
+        rank = percent / 100.0 * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                edge = _BUCKET_EDGES_S[index] if index < len(_BUCKET_EDGES_S) else max_s
+                return min(edge, max_s)
+        return max_s
+    
+    def snapshot(self) -> dict[str, float]:
+        """Summary statistics: count, mean, p50, p99 and max in seconds."""
+        with self._lock:
+            count, sum_s, max_s = self._count, self._sum_s, self._max_s
+        return {
+            "count": count,
+            "mean_s": sum_s / count if count else 0.0,
+            "p50_s": self.percentile(50),
+            "p99_s": self.percentile(99),
+            "max_s": max_s,
+        }
+    
+    def buckets(self) -> list[tuple[float, int]]:
+        """Cumulative (upper edge, count) pairs, ending with +inf."""
+        with self._lock:
+            counts = list(self._counts)
+        cumulative = 0
+        result = []
+        for edge, count in zip([*_BUCKET_EDGES_S, float("inf")], counts):
+            cumulative += count
+            result.append((edge, cumulative))
+        return result
+
+
+class Metrics:
+    """Registry of named latency histograms and counters."""
+    
+    def __init__(self, enabled: bool = True) -> None:
+        """Initialize metrics registry.
+        
+        Args:
+            enabled: Record measurements; when False every call is a no-op.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._counters: dict[str, int] = {}
+    
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Get or create a histogram.
+        
+        Args:
+            name: Metric name, e.g. "camera.grab_frame".
+        
+        Returns:
+            Histogram.
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+    
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a latency sample.
+        
+        Args:
+            name: Metric name.
+            seconds: Latency in seconds.
+        """
+        if self.enabled:
+            self.histogram(name).record(seconds)
+    
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increase a counter.
+        
+        Args:
+            name: Counter name, e.g. "frames_dropped".
+            amount: Increment.
+        """
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + amount
+    
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time a block of code into a histogram.
+        
+        Args:
+            name: Metric name.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.histogram(name).record((time.perf_counter_ns() - start) / 1e9)
+    
+    def wrap(self, obj: Any, method_name: str, metric_name: str | None = None) -> None:
+        """Time every call of an object's method.
+        
+        Replaces the bound method on this instance only; other instances and
+        the class are untouched.
+        
+        Args:
+            obj: Object (usually a device driver) to instrument.
+            method_name: Name of the method to time.
+            metric_name: Metric name (default: "<class>.<method>").
+        """
+        method: Callable[..., Any] = getattr(obj, method_name)
+        histogram = self.histogram(metric_name or f"{type(obj).__name__}.{method_name}")
+        
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return method(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.record((time.perf_counter_ns() - start) / 1e9)
+        
+        setattr(obj, method_name, timed)
+    
+    def snapshot(self) -> dict[str, Any]:
+        """All metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        return {
+            "timestamp": time.time(),
+            "latency": {name: histogram.snapshot() for name, histogram in sorted(histograms.items())},
+            "counters": dict(sorted(counters.items())),
+        }
+    
+    def write_json(self, path: Path | str) -> None:
+        """Write a snapshot to a JSON file.
+        
+        Args:
+            path: Output file.
+        """
+        Path(path).write_text(json.dumps(self.snapshot(), indent=2))
+    
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        for name, histogram in sorted(histograms.items()):
+            metric = "instrument_" + _prometheus_name(name) + "_seconds"
+            summary = histogram.snapshot()
+            lines.append(f"# TYPE {metric} histogram")
+            for edge, count in histogram.buckets():
+                le = "+Inf" if edge == float("inf") else f"{edge:.6g}"
+                lines.append(f'{metric}_bucket{{le="{le}"}} {count}')
+            lines.append(f"{metric}_sum {summary['mean_s'] * summary['count']:.9g}")
+            lines.append(f"{metric}_count {summary['count']}")
+        for name, value in sorted(counters.items()):
+            metric = "instrument_" + _prometheus_name(name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics in Prometheus text format on a background thread.
+        
+        Args:
+            port: TCP port.
+            host: Interface to bind (local only by default).
+        
+        Returns:
+            Running server; call shutdown() to stop it.
+        """
+        # http.server is slow to import and only needed when serving
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        metrics = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # Keep scrapes out of stderr
+        
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+def _prometheus_name(name: str) -> str:
+    """Convert a metric name to a valid Prometheus identifier."""
+    return "".join(char if char.isalnum() else "_" for char in name).lower()
@@ -0,0 +1,21 @@
+"""Storage backends for streaming frames to disk."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from instrument._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base import FrameWriter, create_writer
+    from .journal import AcquisitionJournal, recover_journal
+
+__all__ = ["FrameWriter", "create_writer", "AcquisitionJournal", "recover_journal"]
+
+# Exported name -> defining submodule
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "FrameWriter": ".base",
+    "create_writer": ".base",
+    "AcquisitionJournal": ".journal",
+    "recover_journal": ".journal",
+})
@@ -0,0 +1,117 @@
+"""Abstract base class for frame writers.
+
+This module defines the interface that all storage backends must implement,
+and selects a backend from the experiment configuration.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from instrument.config import ExperimentConfig
+
+
+class FrameWriter(ABC):
+    """Base class for streaming frame writers.
+    
+    Writers are opened once per run, receive frames from the acquisition
+    writer threads, and finalize their metadata on close. write_frame() may
+    be called from several threads at once.
+    """
+    
+    # File or directory suffix used for the dataset, e.g. ".ome.zarr"
+    extension: str = ""
+    
+    @abstractmethod
+    def open(self, path: Path, num_frames: int | None = None) -> None:
+        """Open a new dataset.
+        
+        The frame shape and dtype are taken from the first written frame.
+        
+        Args:
+            path: Dataset path (including extension).
+            num_frames: Expected number of frames, if known.
+        """
+        ...
+    
+    @abstractmethod
+    def write_frame(self, frame: np.ndarray, frame_number: int) -> None:
+        """Write a frame at the given position in the time series.
+        
+        Args:
+            frame: Frame data. Only valid during the call; copy if kept.
+            frame_number: Index of the frame in the time series.
+        """
+        ...
+    
+    @abstractmethod
+    def close(self, metadata: dict[str, Any] | None = None) -> None:
+        """Flush pending data, write final metadata and close the dataset.
+        
+        Args:
+            metadata: Additional acquisition metadata to store.
+        """
+        ...
+    
+    @property
+    def supports_recovery(self) -> bool:
+        """Check if the backend implements sync() and recover()."""
+        return False
+    
+    def sync(self) -> None:
+        """Make every frame whose write_frame() call has returned durable.
+        
+        Called by the acquisition journal every few frames, possibly while
+        other threads keep writing.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot sync frames")
+    
+    def recover(self, path: Path, keep: Iterable[int], num_frames: int | None = None) -> None:
+        """Reopen a dataset left behind by an interrupted run.
+        
+        Backends that support this should override it and supports_recovery.
+        Frames after the last kept one are discarded and frames before it
+        that are not kept are cleared, so torn frames never survive. Later
+        write_frame() calls continue the time series; close() finalizes the
+        dataset as usual.
+        
+        Args:
+            path: Dataset path (including extension).
+            keep: Frame numbers recorded as durable.
+            num_frames: Expected number of frames of the whole run.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot recover datasets")
+
+
+def create_writer(config: ExperimentConfig) -> FrameWriter:
+    """Create the frame writer selected by config.file_format.
+    
+    Backends are imported on demand so their optional dependencies are only
+    needed when selected.
+    
+    Args:
+        config: Experiment configuration.
+    
+    Returns:
+        Unopened frame writer.
+    """
+    file_format = config.file_format.lower()
+    if file_format in ("zarr", "ome-zarr"):
+        from .zarr_ import ZarrWriter
+        
+        return ZarrWriter(
+            chunk_frames=config.chunk_frames,
+            chunk_shape=config.chunk_shape,
+            compressor=config.compressor,
+            compression_level=config.compression_level,
+            compression_workers=config.compression_workers,
+        )
+    if file_format in ("ome-tiff", "tiff"):
+        from .tiff_ import TiffWriter
+        
+        return TiffWriter(ome=file_format == "ome-tiff")
+    raise ValueError(f"Unsupported file format: {config.file_format}")
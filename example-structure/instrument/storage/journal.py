@@ -0,0 +1,235 @@
+"""Crash-safe acquisition journal.
+
+An append-only JSON Lines file next to the dataset records the run, every
+stored frame (stored index, frame number, timestamp) and the device state.
+Frame records are buffered and written in batches, every sync_frames
+frames or sync_interval_s seconds. Each batch first makes the dataset
+durable (FrameWriter.sync()), then appends the records and a sync marker
+with one fsync. Every frame listed before a sync marker is therefore
+complete on disk.
+
+After a crash, recover_journal() drops everything after the last marker;
+the dataset is then cut back to the same frames (FrameWriter.recover())
+and the run can be resumed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+JOURNAL_NAME = "journal.jsonl"
+
+# Records that end a consistent stretch of the journal
+_MARKERS = ("run", "sync", "resume", "recover", "end")
+
+
+@dataclass
+class JournalState:
+    """Consistent contents of a journal."""
+    
+    run: dict[str, Any]  # Run record: params, dataset name, expected frames
+    frames: list[tuple[int, int, float]]  # (stored_index, frame_number, timestamp_s), by stored index
+    finalized: bool  # The dataset was closed normally
+    resumes: int = 0  # Times the run was resumed
+    
+    @property
+    def num_stored(self) -> int:
+        """Length of the stored time series, including frames that were never written."""
+        return self.frames[-1][0] + 1 if self.frames else 0
+
+
+class AcquisitionJournal:
+    """Append-only, fsync-batched journal of one acquisition."""
+    
+    def __init__(
+        self,
+        path: Path,
+        sync_frames: int = 256,
+        sync_interval_s: float = 1.0,
+        sync_dataset: Callable[[], None] | None = None,
+        read_state: Callable[[], dict[str, Any]] | None = None,
+    ) -> None:
+        """Initialize journal.
+        
+        Args:
+            path: Journal file path.
+            sync_frames: Frames recorded between syncs.
+            sync_interval_s: Longest time between syncs while frames arrive.
+            sync_dataset: Makes the written frames durable, e.g. FrameWriter.sync.
+            read_state: Returns the device state recorded with each sync.
+        """
+        if sync_frames < 1:
+            raise ValueError(f"Invalid sync_frames: {sync_frames}")
+        self._path = Path(path)
+        self._sync_frames = sync_frames
+        self._sync_interval_s = sync_interval_s
+        self._sync_dataset = sync_dataset
+        self._read_state = read_state
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._file = None
+        self._lines: list[bytes] = []
+        self._next_sync_s = 0.0
+        self._num_stored = 0
+    
+    def open(self, run: dict[str, Any] | None = None, resume_from: int | None = None) -> None:
+        """Open the journal for appending.
+        
+        Args:
+            run: Run record starting a new journal.
+            resume_from: Length of the kept time series when resuming a run.
+        """
+        self._file = open(self._path, "ab")
+        self._lines = []
+        self._num_stored = resume_from or 0
+        self._next_sync_s = time.perf_counter() + self._sync_interval_s
+        if run is not None:
+            self._lines.append(_encode({"type": "run", "time": time.time(), **run}))
+        if resume_from is not None:
+            self._lines.append(_encode({"type": "resume", "time": time.time(), "frames": resume_from}))
+        self._write(self._lines)
+        self._lines = []
+    
+    def record(self, stored_index: int, frame_number: int, timestamp_s: float) -> None:
+        """Record a frame whose write has returned; syncs when a batch is due.
+        
+        Called from the acquisition writer threads. A thread finding a sync
+        already in progress leaves it to that thread instead of waiting.
+        
+        Args:
+            stored_index: Position in the stored time series.
+            frame_number: Acquisition frame number.
+            timestamp_s: Grab timestamp.
+        """
+        line = _encode({"type": "frame", "stored": stored_index, "frame": frame_number, "t": round(timestamp_s, 6)})
+        with self._lock:
+            self._lines.append(line)
+            self._num_stored = max(self._num_stored, stored_index + 1)
+            due = len(self._lines) >= self._sync_frames or time.perf_counter() >= self._next_sync_s
+        if due and self._sync_lock.acquire(blocking=False):
+            try:
+                self._sync()
+            finally:
+                self._sync_lock.release()
+    
+    def sync(self) -> None:
+        """Make the dataset durable, then write and fsync the recorded frames."""
+        with self._sync_lock:
+            self._sync()
+    
+    def close(self, finalized: bool = True) -> None:
+        """Write the remaining records and close the journal.
+        
+        Args:
+            finalized: The dataset was closed normally; recovery then leaves it alone.
+        """
+        if self._file is None:
+            return
+        if finalized:
+            # Records still buffered here were made durable by closing the dataset
+            with self._lock:
+                lines, self._lines = self._lines, []
+            lines.append(_encode({"type": "end", "time": time.time()}))
+            self._write(lines)
+        self._file.close()
+        self._file = None
+    
+    def _sync(self) -> None:
+        """Sync one batch (sync lock held)."""
+        with self._lock:
+            lines, self._lines = self._lines, []
+            self._next_sync_s = time.perf_counter() + self._sync_interval_s
+        # The records were taken first, so the dataset sync covers all of them
+        if self._sync_dataset is not None:
+            self._sync_dataset()
+        if self._read_state is not None:
+            lines.append(_encode({"type": "state", "time": time.time(), **self._read_state()}))
+        lines.append(_encode({"type": "sync", "frames": self._num_stored}))
+        self._write(lines)
+    
+    def _write(self, lines: list[bytes]) -> None:
+        """Append lines with one write and fsync."""
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def read_journal(path: Path) -> tuple[JournalState, int]:
+    """Read the consistent part of a journal.
+    
+    Args:
+        path: Journal file path.
+    
+    Returns:
+        Consistent state and the byte length of the consistent part.
+    """
+    run: dict[str, Any] | None = None
+    frames: dict[int, tuple[int, float]] = {}
+    batch: dict[int, tuple[int, float]] = {}  # Frames after the last marker
+    finalized = False
+    resumes = consistent_bytes = offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            offset += len(line)
+            try:
+                record = json.loads(line) if line.endswith(b"\n") else None
+            except ValueError:
+                record = None
+            if record is None:
+                break  # Torn write at the crash
+            kind = record["type"]
+            if kind == "frame":
+                batch[record["stored"]] = (record["frame"], record["t"])
+                continue
+            if kind not in _MARKERS:
+                continue
+            frames.update(batch)
+            batch = {}
+            if kind == "run":
+                run = record
+            elif kind in ("resume", "recover"):
+                resumes += kind == "resume"
+                # Frames at or after the kept length were discarded from the dataset
+                frames = {index: frame for index, frame in frames.items() if index < record["frames"]}
+            finalized = kind == "end"
+            consistent_bytes = offset
+    if run is None:
+        raise ValueError(f"No run record in journal: {path}")
+    state = JournalState(run, [(index, *frames[index]) for index in sorted(frames)], finalized, resumes)
+    return state, consistent_bytes
+
+
+def recover_journal(path: Path) -> JournalState:
+    """Cut a journal back to its last consistent record.
+    
+    Records after the last sync marker, including a torn last line, are
+    removed and a recover record is appended, so the journal matches the
+    dataset once it has been recovered with the returned frames.
+    
+    Args:
+        path: Journal file path.
+    
+    Returns:
+        Consistent state; finalized journals are returned unchanged.
+    """
+    state, consistent_bytes = read_journal(path)
+    if state.finalized:
+        return state
+    with open(path, "r+b") as f:
+        f.truncate(consistent_bytes)
+        f.seek(consistent_bytes)
+        f.write(_encode({"type": "recover", "time": time.time(), "frames": state.num_stored}))
+        f.flush()
+        os.fsync(f.fileno())
+    return state
+
+
+def _encode(record: dict[str, Any]) -> bytes:
+    """One compact JSON line."""
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
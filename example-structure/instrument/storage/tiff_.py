@@ -0,0 +1,252 @@
+"""TIFF storage backend.
+
+Preallocates a contiguous (Big)TIFF file for the whole run and memory-maps
+its pixel data, so each frame is copied once from the acquisition buffer
+straight into its page. The OME-XML header is written on close, once the
+final frame count is known, after cutting the file after the last written
+page. Since the file layout is complete from the first frame on, a file
+left by a crashed run can be reopened and continued.
+"""
+
+from __future__ import annotations
+
+import struct
+import threading
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import tifffile  # type: ignore
+
+from .base import FrameWriter
+
+# Switch to BigTIFF well below the 4 GB classic TIFF offset limit
+BIGTIFF_THRESHOLD_BYTES = 2**32 - 2**25
+
+OME_NAMESPACE = "http://www.openmicroscopy.org/Schemas/OME/2016-06"
+
+# Bytes per value of each TIFF tag type
+TAG_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4, 16: 8, 17: 8, 18: 8}
+
+
+class TiffWriter(FrameWriter):
+    """Memory-mapped, preallocated (OME-)TIFF frame writer."""
+    
+    def __init__(self, ome: bool = True) -> None:
+        """Initialize TIFF writer.
+        
+        Args:
+            ome: Write OME-XML metadata (OME-TIFF) on close.
+        """
+        self._ome = ome
+        self.extension = ".ome.tif" if ome else ".tif"
+        self._lock = threading.Lock()
+        self._path: Path | None = None
+        self._memmap: np.memmap | None = None
+        self._capacity = 0
+        self._num_frames = 0
+    
+    @property
+    def supports_recovery(self) -> bool:
+        """TIFF files can be synced and recovered."""
+        return True
+    
+    def open(self, path: Path, num_frames: int | None = None) -> None:
+        """Record the file path; the file is preallocated on the first frame.
+        
+        Args:
+            path: File path (including extension).
+            num_frames: Number of frames to preallocate (required; 0 writes no file).
+        """
+        if num_frames is None or num_frames < 0:
+            raise ValueError("TIFF writer needs the number of frames to preallocate")
+        self._path = Path(path)
+        self._capacity = num_frames
+        self._memmap = None
+        self._num_frames = 0
+    
+    def write_frame(self, frame: np.ndarray, frame_number: int) -> None:
+        """Copy a frame into its memory-mapped page."""
+        if self._path is None:
+            raise RuntimeError("Writer not open")
+        if frame_number >= self._capacity:
+            raise IndexError(f"Frame {frame_number} exceeds preallocated {self._capacity} frames")
+        with self._lock:
+            if self._memmap is None:
+                self._memmap = self._preallocate(frame)
+            self._num_frames = max(self._num_frames, frame_number + 1)
+        
+        # Each frame number owns its own page, so the copy needs no lock
+        self._memmap[frame_number] = frame
+    
+    def sync(self) -> None:
+        """Flush the written pages to disk."""
+        memmap = self._memmap
+        if memmap is not None:
+            memmap.flush()
+    
+    def recover(self, path: Path, keep: Iterable[int], num_frames: int | None = None) -> None:
+        """Map the preallocated file again and clear frames that were not kept.
+        
+        Args:
+            path: File path (including extension).
+            keep: Frame numbers recorded as durable.
+            num_frames: Frames the run needs; a shorter file is preallocated again at this size.
+        """
+        keep = sorted(keep)
+        path = Path(path)
+        if not path.exists():
+            if keep:
+                raise FileNotFoundError(f"Dataset not found: {path}")
+            self.open(path, num_frames)
+            return
+        # Ignore the OME header, which only lists the frames of a finished run
+        memmap = tifffile.memmap(path, mode="r+", is_ome=False)
+        if memmap.ndim == 2:
+            memmap = memmap[np.newaxis]
+        self._num_frames = keep[-1] + 1 if keep else 0
+        if self._num_frames > len(memmap):
+            raise ValueError(f"Cannot keep {self._num_frames} frames of a {len(memmap)}-frame file")
+        cleared = np.ones(self._num_frames, dtype=bool)
+        cleared[keep] = False
+        memmap[np.flatnonzero(cleared)] = 0
+        memmap.flush()
+        self._path = path
+        self._capacity = len(memmap)
+        if num_frames is not None and num_frames > self._capacity:
+            # A recovered run was closed, cutting the pages it never wrote; lay out the full run again
+            kept = np.array(memmap[:self._num_frames])
+            template = np.array(memmap[0])
+            del memmap
+            self._capacity = num_frames
+            memmap = self._preallocate(template)
+            memmap[:len(kept)] = kept
+            memmap.flush()
+        self._memmap = memmap
+    
+    def close(self, metadata: dict[str, Any] | None = None) -> None:
+        """Flush pages to disk, drop unwritten trailing pages and finalize the OME-XML header."""
+        if self._memmap is None:
+            self._path = None
+            return
+        self._memmap.flush()
+        dtype = self._memmap.dtype
+        height, width = self._memmap.shape[1:]
+        # Drop the mapping before rewriting the header
+        del self._memmap
+        self._memmap = None
+        if self._num_frames == 0:
+            # Nothing kept (e.g. recovered before the first journal sync): no file, as for an empty run
+            self._path.unlink()
+            self._path = None
+            return
+        if self._num_frames < self._capacity:
+            # Stopped or shortened run: trailing pages were never written
+            _truncate_pages(self._path, self._num_frames)
+        
+        if self._ome:
+            xml = self._ome_xml(dtype, height, width, metadata or {})
+            tifffile.tiffcomment(self._path, comment=xml.encode("ascii", "xmlcharrefreplace"))
+        self._path = None
+    
+    def _preallocate(self, frame: np.ndarray) -> np.memmap:
+        """Create the full-size file and memory-map its pixel data."""
+        shape = (self._capacity, *frame.shape)
+        nbytes = int(np.prod(shape)) * frame.dtype.itemsize
+        return tifffile.memmap(
+            self._path,
+            shape=shape,
+            dtype=frame.dtype,
+            photometric="minisblack",
+            bigtiff=nbytes > BIGTIFF_THRESHOLD_BYTES,
+            # Placeholder description, replaced by the OME-XML on close
+            description=" " * 64,
+            metadata=None,
+        )
+    
+    def _ome_xml(self, dtype: np.dtype, height: int, width: int, metadata: dict[str, Any]) -> str:
+        """Build the OME-XML header for the written frames."""
+        ome = ET.Element("OME", xmlns=OME_NAMESPACE)
+        image = ET.SubElement(ome, "Image", ID="Image:0", Name=self._path.name)
+        pixels = ET.SubElement(
+            image,
+            "Pixels",
+            ID="Pixels:0",
+            DimensionOrder="XYCZT",
+            Type=dtype.name,
+            SizeX=str(width),
+            SizeY=str(height),
+            SizeC="1",
+            SizeZ="1",
+            SizeT=str(self._num_frames),
+            BigEndian="false",
+        )
+        ET.SubElement(pixels, "Channel", ID="Channel:0:0", SamplesPerPixel="1")
+        ET.SubElement(pixels, "TiffData", IFD="0", PlaneCount=str(self._num_frames))
+        
+        if metadata:
+            ET.SubElement(image, "AnnotationRef", ID="Annotation:0")
+            annotations = ET.SubElement(ome, "StructuredAnnotations")
+            map_annotation = ET.SubElement(annotations, "MapAnnotation", ID="Annotation:0")
+            values = ET.SubElement(map_annotation, "Value")
+            for key, value in metadata.items():
+                ET.SubElement(values, "M", K=str(key)).text = str(value)
+        
+        return '<?xml version="1.0" encoding="UTF-8"?>' + ET.tostring(ome, encoding="unicode")
+
+
+def _truncate_pages(path: Path, num_pages: int) -> None:
+    """Cut a preallocated TIFF file after its first num_pages pages.
+    
+    tifffile writes the first IFD, then the pixel data of all pages, then
+    the IFDs of the other pages. The IFDs of the kept pages are moved to the
+    end of the kept pixel data, their offsets adjusted, and the rest of the
+    file is cut off.
+    
+    Args:
+        path: File path.
+        num_pages: Pages to keep (at least one; close() deletes files without frames).
+    """
+    with tifffile.TiffFile(path, is_ome=False) as tif:
+        byteorder = tif.byteorder
+        offset_size = tif.tiff.offsetsize
+        pages = [tif.pages[i] for i in range(num_pages)]
+        data_end = pages[-1].dataoffsets[0] + pages[-1].databytecounts[0]
+        tail_ifd = tif.pages[num_pages].offset  # First dropped page
+    # Classic TIFF: 2-byte entry count, 12-byte entries; BigTIFF: 8 and 20 bytes
+    count_format, entry_format = ("H", "HHII") if offset_size == 4 else ("Q", "HHQQ")
+    count_size = struct.calcsize(byteorder + count_format)
+    entry_size = struct.calcsize(byteorder + entry_format)
+    offset_format = byteorder + ("I" if offset_size == 4 else "Q")
+    
+    with open(path, "r+b") as f:
+        f.seek(pages[0].offset)
+        (num_tags,) = struct.unpack(byteorder + count_format, f.read(count_size))
+        first_next = pages[0].offset + count_size + num_tags * entry_size
+        if num_pages == 1:
+            new_end = data_end
+        else:
+            block_start = pages[1].offset
+            new_start = data_end + data_end % 2  # IFDs start on a word boundary
+            f.seek(block_start)
+            block = bytearray(f.read(tail_ifd - block_start))
+            shift = block_start - new_start
+            for i, page in enumerate(pages[1:], 1):
+                position = page.offset - block_start
+                (num_tags,) = struct.unpack_from(byteorder + count_format, block, position)
+                for entry in range(num_tags):
+                    at = position + count_size + entry * entry_size
+                    _, tag_type, count, value = struct.unpack_from(byteorder + entry_format, block, at)
+                    # Values that do not fit the entry are stored after the IFD
+                    if count * TAG_TYPE_SIZES.get(tag_type, 1) > offset_size and value >= block_start:
+                        struct.pack_into(offset_format, block, at + entry_size - offset_size, value - shift)
+                next_at = position + count_size + num_tags * entry_size
+                next_ifd = pages[i + 1].offset - shift if i + 1 < num_pages else 0
+                struct.pack_into(offset_format, block, next_at, next_ifd)
+            f.seek(new_start)
+            f.write(block)
+            new_end = new_start + len(block)
+        f.seek(first_next)
+        f.write(struct.pack(offset_format, new_start if num_pages > 1 else 0))
+        f.truncate(new_end)
@@ -0,0 +1,534 @@
+"""Zarr storage backend.
+
+Streams frames into a chunked, compressed OME-Zarr (NGFF 0.4) time series.
+Frames are staged in memory until a full time chunk is available and then
+written in one chunk-aligned call. Frame numbers have gaps when frames are
+dropped or skipped, so a chunk still incomplete once a frame two chunks
+later arrives is written with zeros in its gaps; at most two chunks are
+staged at a time. A frame arriving after its chunk was written is written
+on its own.
+
+With compression_workers > 0, staging buffers live in shared memory and full
+chunks are compressed by a process pool, so compression scales with cores
+instead of competing with the grab thread for the GIL. Only the compressed
+chunk bytes come back; they are written directly as Zarr v2 chunk files.
+
+sync() also writes the frames staged in incomplete chunks, so every frame
+handed to the writer can be made durable without waiting for its chunk.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Iterable
+
+import numcodecs  # type: ignore
+import numpy as np
+import zarr  # type: ignore
+
+from .base import FrameWriter
+
+# Compressor names accepted in ExperimentConfig.compressor, mapped to Blosc codecs
+BLOSC_CODECS = {
+    "blosc": "blosclz",
+    "lz4": "lz4",
+    "zstd": "zstd",
+}
+
+# Locks serializing writes to the same chunk, shared by chunk index modulo this
+NUM_CHUNK_LOCKS = 16
+
+
+def make_compressor(name: str, level: int = 5) -> numcodecs.abc.Codec | None:
+    """Create a numcodecs compressor by name.
+    
+    Args:
+        name: "blosc", "lz4", "zstd" or "none".
+        level: Compression level (0-9).
+    
+    Returns:
+        Codec, or None for uncompressed storage.
+    """
+    if name == "none":
+        return None
+    if name not in BLOSC_CODECS:
+        raise ValueError(f"Unsupported compressor: {name}")
+    return numcodecs.Blosc(cname=BLOSC_CODECS[name], clevel=level, shuffle=numcodecs.Blosc.BITSHUFFLE)
+
+
+def _compress_chunk(
+    shm_name: str,
+    shape: tuple[int, ...],
+    dtype: str,
+    spatial_chunks: tuple[int, int],
+    codec_config: dict[str, Any] | None,
+) -> list[tuple[int, int, bytes]]:
+    """Compress one staged time chunk in a worker process.
+    
+    Args:
+        shm_name: Shared memory block holding the (t, y, x) chunk.
+        shape: Chunk shape.
+        dtype: Array dtype.
+        spatial_chunks: Zarr chunk shape (y, x).
+        codec_config: numcodecs codec configuration (None stores raw bytes).
+    
+    Returns:
+        (y chunk index, x chunk index, chunk bytes) for every spatial chunk.
+    """
+    codec = numcodecs.get_codec(dict(codec_config)) if codec_config else None
+    chunk_y, chunk_x = spatial_chunks
+    shm = SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        block = None
+        results = []
+        for yi in range(math.ceil(shape[1] / chunk_y)):
+            for xi in range(math.ceil(shape[2] / chunk_x)):
+                block = data[:, yi * chunk_y:(yi + 1) * chunk_y, xi * chunk_x:(xi + 1) * chunk_x]
+                # Zarr v2 stores edge chunks padded to the full chunk shape
+                padded = np.zeros((shape[0], chunk_y, chunk_x), dtype=dtype)
+                padded[:, :block.shape[1], :block.shape[2]] = block
+                results.append((yi, xi, codec.encode(padded) if codec else padded.tobytes()))
+        del data, block  # Release the buffer before closing the block
+        return results
+    finally:
+        shm.close()
+
+
+class _PendingChunk:
+    """Staging buffer for one time chunk."""
+    
+    def __init__(self, data: np.ndarray, shm: SharedMemory | None = None) -> None:
+        self.data = data
+        self.shm = shm
+        self.filled = np.zeros(len(data), dtype=bool)
+        self.copying = 0  # Threads copying a frame into the buffer
+        self.released = False  # Out of staging; written once the copies finish
+        self.written = False  # Full chunk on disk; the buffer may be reused
+        self.synced = 0  # Filled rows already written by sync()
+
+
+class ZarrWriter(FrameWriter):
+    """Chunked, compressed OME-Zarr frame writer."""
+    
+    extension = ".ome.zarr"
+    
+    def __init__(
+        self,
+        chunk_frames: int = 16,
+        chunk_shape: list[int] | None = None,
+        compressor: str = "lz4",
+        compression_level: int = 5,
+        compression_workers: int = 0,
+    ) -> None:
+        """Initialize Zarr writer.
+        
+        Args:
+            chunk_frames: Number of frames per chunk along time.
+            chunk_shape: Spatial chunk shape (y, x); None uses full frames.
+            compressor: "blosc", "lz4", "zstd" or "none".
+            compression_level: Compression level (0-9).
+            compression_workers: Worker processes compressing full chunks
+                (0 compresses on the calling writer thread).
+        """
+        if chunk_frames < 1:
+            raise ValueError(f"Invalid chunk_frames: {chunk_frames}")
+        if compression_workers < 0:
+            raise ValueError(f"Invalid compression_workers: {compression_workers}")
+        self._chunk_frames = chunk_frames
+        self._chunk_shape = tuple(chunk_shape) if chunk_shape else None
+        self._compressor = make_compressor(compressor, compression_level)
+        self._lock = threading.Lock()
+        self._chunk_written = threading.Condition(self._lock)
+        self._chunk_locks = [threading.Lock() for _ in range(NUM_CHUNK_LOCKS)]
+        self._path: Path | None = None
+        self._group: zarr.Group | None = None
+        self._array: zarr.Array | None = None
+        self._expected_frames: int | None = None
+        self._num_frames = 0
+        self._pending: dict[int, _PendingChunk] = {}
+        self._newest_chunk = 0  # Highest chunk index staged so far
+        self._released: set[int] = set()  # Chunks written before they were complete
+        self._unwritten: set[int] = set()  # Chunks out of staging but not yet on disk
+        self._dirty: set[int] = set()  # Chunks written since the last sync
+        self._free_buffers: list[tuple[np.ndarray, SharedMemory | None]] = []
+        
+        self._compression_workers = compression_workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._shm_blocks: list[SharedMemory] = []
+        self._futures: set[Future] = set()
+        # Bounds the chunks staged (at most two) or in flight; a full pool backs up into the ring buffer
+        self._buffer_slots = threading.Semaphore(2 * compression_workers + 2)
+        self._error: BaseException | None = None
+    
+    @property
+    def supports_recovery(self) -> bool:
+        """Zarr datasets can be synced and recovered."""
+        return True
+    
+    def open(self, path: Path, num_frames: int | None = None) -> None:
+        """Create the Zarr group; the array is created on the first frame."""
+        self._reset(path, num_frames)
+        self._group = zarr.open_group(str(self._path), mode="w", zarr_format=2)
+    
+    def recover(self, path: Path, keep: Iterable[int], num_frames: int | None = None) -> None:
+        """Reopen the array, trim it after the last kept frame and clear unkept frames.
+        
+        Args:
+            path: Dataset path (including extension).
+            keep: Frame numbers recorded as durable.
+            num_frames: Expected number of frames of the whole run.
+        """
+        keep = sorted(keep)
+        path = Path(path)
+        if not (path / "0").exists():
+            # The array is only created on the first frame
+            if keep:
+                raise FileNotFoundError(f"Dataset not found: {path}")
+            self.open(path, num_frames)
+            return
+        self._reset(path, num_frames)
+        self._group = zarr.open_group(str(self._path), mode="r+", zarr_format=2)
+        self._array = self._group["0"]
+        self._num_frames = keep[-1] + 1 if keep else 0
+        self._array.resize((self._num_frames, *self._array.shape[1:]))
+        cleared = np.ones(self._num_frames, dtype=bool)
+        cleared[keep] = False
+        rows = np.flatnonzero(cleared)
+        if len(rows):
+            zeros = np.zeros((len(rows), *self._array.shape[1:]), dtype=self._array.dtype)
+            self._array.set_orthogonal_selection((rows, slice(None), slice(None)), zeros)
+        
+        # Stage the kept part of the last chunk so writes can complete it
+        chunk_index, offset = divmod(self._num_frames, self._chunk_frames)
+        self._newest_chunk = chunk_index
+        if offset:
+            chunk = self._pending[chunk_index] = _PendingChunk(*self._take_buffer())
+            chunk.data[:offset] = self._array[chunk_index * self._chunk_frames:self._num_frames]
+            chunk.filled[:offset] = True
+    
+    def write_frame(self, frame: np.ndarray, frame_number: int) -> None:
+        """Stage a frame and write its chunk once complete."""
+        if self._group is None:
+            raise RuntimeError("Writer not open")
+        if self._error is not None:
+            raise self._error
+        chunk_index, offset = divmod(frame_number, self._chunk_frames)
+        with self._lock:
+            if self._array is None:
+                self._create_array(frame)
+            self._num_frames = max(self._num_frames, frame_number + 1)
+            chunk = self._pending.get(chunk_index)
+            late = chunk_index in self._released
+            stale = []
+            if chunk is not None:
+                chunk.copying += 1
+            elif not late and chunk_index > self._newest_chunk:
+                self._newest_chunk = chunk_index
+                stale = self._release_stale()
+        for stale_index, stale_chunk in stale:
+            self._flush_chunk(stale_index, stale_chunk)
+        if chunk is None and not late:
+            # May block until a compression worker frees a buffer
+            buffer = self._take_buffer()
+            with self._lock:
+                chunk = self._pending.get(chunk_index)
+                late = chunk_index in self._released
+                if chunk is None and not late:
+                    chunk = self._pending[chunk_index] = _PendingChunk(*buffer)
+                else:
+                    self._return_buffer(buffer)
+                if chunk is not None:
+                    chunk.copying += 1
+        if chunk is None:
+            self._write_late(frame, frame_number)
+            return
+        
+        # Each frame number owns its own row, so the copy needs no lock
+        chunk.data[offset] = frame
+        
+        with self._lock:
+            chunk.filled[offset] = True
+            chunk.copying -= 1
+            if chunk.released:
+                if chunk.copying:
+                    return  # The last copying thread writes it
+            elif chunk.filled.all():
+                del self._pending[chunk_index]
+                self._unwritten.add(chunk_index)
+            else:
+                return
+        self._flush_chunk(chunk_index, chunk)
+    
+    def sync(self) -> None:
+        """Write staged frames of incomplete chunks and fsync all chunks written since the last sync."""
+        if self._array is None:
+            # Nothing written yet; the array is created with the first frame
+            return
+        with self._lock:
+            pending = list(self._pending.items())
+            # Chunks out of staging are written by the thread that took them out
+            unwritten = set(self._unwritten)
+            while not unwritten.isdisjoint(self._unwritten) and self._error is None:
+                self._chunk_written.wait()
+        if self._error is not None:
+            raise self._error
+        
+        for chunk_index, chunk in pending:
+            with self._chunk_locks[chunk_index % NUM_CHUNK_LOCKS]:
+                with self._lock:
+                    rows = np.flatnonzero(chunk.filled)
+                    # Rewrite a chunk still staged only when it grew
+                    if chunk.written or len(rows) == chunk.synced:
+                        continue
+                    self._grow(chunk_index)
+                # Rows not filled yet may be mid-copy or hold a reused buffer; they
+                # are not journaled, so recover() clears them
+                start = chunk_index * self._chunk_frames
+                self._array[start:start + self._chunk_frames] = chunk.data
+                with self._lock:
+                    chunk.synced = len(rows)
+                    self._dirty.add(chunk_index)
+        
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        array_path = self._path / "0"
+        _fsync(array_path / ".zarray")
+        for chunk_index in sorted(dirty):
+            _fsync_tree(array_path / str(chunk_index))
+        _fsync(array_path)
+    
+    def close(self, metadata: dict[str, Any] | None = None) -> None:
+        """Write partial chunks, trim the array and write OME metadata."""
+        if self._group is None:
+            return
+        try:
+            for chunk_index, chunk in sorted(self._pending.items()):
+                self._flush_chunk(chunk_index, chunk)
+            self._pending = {}
+            wait(list(self._futures))
+        finally:
+            self._shutdown_pool()
+        if self._error is not None:
+            raise self._error
+        
+        if self._array is not None:
+            self._array.resize((self._num_frames, *self._array.shape[1:]))
+            self._group.attrs.update(self._ome_metadata())
+        if metadata:
+            self._group.attrs["acquisition"] = metadata
+        self._group = None
+        self._array = None
+        self._free_buffers = []
+    
+    def _reset(self, path: Path, num_frames: int | None) -> None:
+        """Reset the per-dataset state and start the compression pool."""
+        self._path = Path(path)
+        self._array = None
+        self._expected_frames = num_frames
+        self._num_frames = 0
+        self._pending = {}
+        self._newest_chunk = 0
+        self._released = set()
+        self._unwritten = set()
+        self._dirty = set()
+        self._free_buffers = []
+        self._error = None
+        if self._compression_workers:
+            # spawn: forking a process that runs acquisition threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                self._compression_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+    
+    def _create_array(self, frame: np.ndarray) -> None:
+        """Create the image array sized from the first frame."""
+        height, width = frame.shape
+        chunks = (self._chunk_frames, *(self._chunk_shape or (height, width)))
+        initial_frames = self._expected_frames or self._chunk_frames
+        self._array = self._group.create_array(
+            "0",
+            shape=(initial_frames, height, width),
+            chunks=chunks,
+            dtype=frame.dtype,
+            compressors=self._compressor,
+            fill_value=0,
+            chunk_key_encoding={"name": "v2", "separator": "/"},
+        )
+    
+    def _take_buffer(self) -> tuple[np.ndarray, SharedMemory | None]:
+        """Get a staging buffer, reusing flushed ones."""
+        if self._pool is not None:
+            self._buffer_slots.acquire()
+        with self._lock:
+            if self._free_buffers:
+                return self._free_buffers.pop()
+            shape = (self._chunk_frames, *self._array.shape[1:])
+            dtype = self._array.dtype
+            if self._pool is None:
+                return np.empty(shape, dtype=dtype), None
+            shm = SharedMemory(create=True, size=math.prod(shape) * dtype.itemsize)
+            self._shm_blocks.append(shm)
+            return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
+    
+    def _return_buffer(self, buffer: tuple[np.ndarray, SharedMemory | None]) -> None:
+        """Put a staging buffer back for reuse (call with the lock held)."""
+        self._free_buffers.append(buffer)
+        if self._pool is not None:
+            self._buffer_slots.release()
+    
+    def _release_stale(self) -> list[tuple[int, _PendingChunk]]:
+        """Take chunks two or more behind the newest out of staging (call with the lock held).
+        
+        Returns:
+            Released chunks no thread is copying into, ready to be written.
+        """
+        ready = []
+        for chunk_index in [index for index in self._pending if index < self._newest_chunk - 1]:
+            chunk = self._pending.pop(chunk_index)
+            chunk.released = True
+            self._released.add(chunk_index)
+            self._unwritten.add(chunk_index)
+            if not chunk.copying:
+                ready.append((chunk_index, chunk))
+        return ready
+    
+    def _flush_chunk(self, chunk_index: int, chunk: _PendingChunk) -> None:
+        """Write a chunk out of staging, storing frames that never arrived as zeros."""
+        chunk.data[~chunk.filled] = 0
+        self._write_chunk(chunk_index, chunk)
+    
+    def _write_late(self, frame: np.ndarray, frame_number: int) -> None:
+        """Write a frame whose chunk already left staging into the stored chunk."""
+        chunk_index = frame_number // self._chunk_frames
+        with self._lock:
+            while chunk_index in self._unwritten and self._error is None:
+                self._chunk_written.wait()
+            self._grow(chunk_index)
+        if self._error is not None:
+            raise self._error
+        with self._chunk_locks[chunk_index % NUM_CHUNK_LOCKS]:
+            self._array[frame_number] = frame
+            with self._lock:
+                self._dirty.add(chunk_index)
+    
+    def _write_chunk(self, chunk_index: int, chunk: _PendingChunk) -> None:
+        """Write a staged chunk with one chunk-aligned assignment."""
+        start = chunk_index * self._chunk_frames
+        stop = start + self._chunk_frames
+        with self._lock:
+            self._grow(chunk_index)
+        if chunk.shm is not None:
+            self._submit_chunk(chunk_index, chunk)
+            return
+        with self._chunk_locks[chunk_index % NUM_CHUNK_LOCKS]:
+            self._array[start:stop] = chunk.data
+            with self._lock:
+                self._mark_written(chunk_index, chunk)
+                self._return_buffer((chunk.data, chunk.shm))
+    
+    def _grow(self, chunk_index: int) -> None:
+        """Make the array large enough for a chunk (call with the lock held)."""
+        stop = (chunk_index + 1) * self._chunk_frames
+        if self._array.shape[0] < stop:
+            # Grow to at least double the size to keep resizes rare
+            new_frames = max(stop, 2 * self._array.shape[0])
+            self._array.resize((new_frames, *self._array.shape[1:]))
+    
+    def _mark_written(self, chunk_index: int, chunk: _PendingChunk) -> None:
+        """Record a full chunk as on disk (call with the lock held)."""
+        chunk.written = True
+        self._unwritten.discard(chunk_index)
+        self._dirty.add(chunk_index)
+        self._chunk_written.notify_all()
+    
+    def _submit_chunk(self, chunk_index: int, chunk: _PendingChunk) -> None:
+        """Compress a shared-memory chunk in the process pool."""
+        future = self._pool.submit(
+            _compress_chunk,
+            chunk.shm.name,
+            chunk.data.shape,
+            chunk.data.dtype.str,
+            self._array.chunks[1:],
+            self._compressor.get_config() if self._compressor is not None else None,
+        )
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda done: self._store_compressed(chunk_index, chunk, done))
+    
+    def _store_compressed(self, chunk_index: int, chunk: _PendingChunk, future: Future) -> None:
+        """Write compressed chunk bytes as Zarr v2 chunk files (0/t/y/x)."""
+        with self._chunk_locks[chunk_index % NUM_CHUNK_LOCKS]:
+            try:
+                for yi, xi, data in future.result():
+                    chunk_dir = self._path / "0" / str(chunk_index) / str(yi)
+                    chunk_dir.mkdir(parents=True, exist_ok=True)
+                    (chunk_dir / str(xi)).write_bytes(data)
+            except BaseException as exc:  # re-raised from write_frame(), sync() or close()
+                self._error = exc
+            finally:
+                # Still under the chunk lock, so sync() never writes a reused buffer
+                with self._lock:
+                    self._futures.discard(future)
+                    self._mark_written(chunk_index, chunk)
+                    self._return_buffer((chunk.data, chunk.shm))
+    
+    def _shutdown_pool(self) -> None:
+        """Stop the worker processes and free the shared memory blocks."""
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=True)
+        self._pool = None
+        self._free_buffers = []
+        self._futures = set()
+        for shm in self._shm_blocks:
+            shm.close()
+            shm.unlink()
+        self._shm_blocks = []
+        self._buffer_slots = threading.Semaphore(2 * self._compression_workers + 2)
+    
+    def _ome_metadata(self) -> dict[str, Any]:
+        """Build OME-NGFF 0.4 multiscales metadata for the time series."""
+        return {
+            "multiscales": [
+                {
+                    "version": "0.4",
+                    "name": self._path.name if self._path else "",
+                    "axes": [
+                        {"name": "t", "type": "time"},
+                        {"name": "y", "type": "space"},
+                        {"name": "x", "type": "space"},
+                    ],
+                    "datasets": [
+                        {
+                            "path": "0",
+                            "coordinateTransformations": [{"type": "scale", "scale": [1.0, 1.0, 1.0]}],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+def _fsync(path: Path) -> None:
+    """Flush a file or directory to disk."""
+    if os.name == "nt" and path.is_dir():
+        return  # Directories cannot be opened for flushing on Windows
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_tree(path: Path) -> None:
+    """Flush a directory and everything below it to disk."""
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            _fsync(Path(root) / name)
+        _fsync(Path(root))
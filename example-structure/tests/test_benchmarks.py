@@ -0,0 +1,107 @@
+"""Benchmarks for the acquisition, save and device-command hot paths.
+
+Runs against the simulated devices with pytest-benchmark. The module is
+marked `benchmark` and deselected by default (pytest.ini), so a plain
+`pytest` run stays fast; run it with `pytest -m benchmark`. Each benchmark
+also asserts a conservative absolute floor, so a gross slowdown fails;
+with --benchmark-disable the functions run once and the floors are not
+checked.
+
+Catch smaller regressions against a saved baseline:
+
+    pytest -m benchmark tests/test_benchmarks.py --benchmark-autosave
+    pytest -m benchmark tests/test_benchmarks.py --benchmark-compare --benchmark-compare-fail=mean:100%
+
+A mean time increase of 100% (half the frame rate) then fails the run.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from instrument.config import ExperimentConfig
+from instrument.controllers.acquisition import AcquisitionEngine
+from instrument.controllers.live_controller import make_lut, to_display_8bit
+from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump, SimulatedValve
+from instrument.storage import create_writer
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.benchmark
+
+FRAME_SIZE = 1024
+SAVE_FRAMES = 64
+
+# Absolute floors; far below typical results so only gross regressions fail
+MIN_GRAB_FPS = 200.0
+MIN_SAVE_FPS = {"zarr": 50.0, "ome-tiff": 100.0, "tiff": 100.0}
+MAX_COMMAND_S = 0.001
+MAX_DISPLAY_CONVERT_S = 0.01
+
+
+def _mean_s(benchmark) -> float:
+    """Mean time per round of a finished benchmark."""
+    return benchmark.stats.stats.mean
+
+
+@pytest.fixture
+def camera():
+    """1024x1024 simulated camera with precomputed noise tiles."""
+    camera = SimulatedCamera(FRAME_SIZE, FRAME_SIZE, pattern="tiles", seed=0)
+    camera.initialize()
+    yield camera
+    camera.close()
+
+
+def test_bench_grab_frame_into(benchmark, camera):
+    """Throughput of grabbing into a preallocated buffer."""
+    out = np.empty((FRAME_SIZE, FRAME_SIZE), dtype=np.uint16)
+    benchmark(camera.grab_frame_into, out)
+    assert benchmark.disabled or 1.0 / _mean_s(benchmark) >= MIN_GRAB_FPS
+
+
+@pytest.mark.parametrize("file_format", ["zarr", "ome-tiff", "tiff"])
+def test_bench_grab_and_save(benchmark, camera, tmp_path, file_format):
+    """Throughput of the full grab -> ring buffer -> writer path."""
+    pytest.importorskip("zarr" if file_format == "zarr" else "tifffile")
+    config = ExperimentConfig(file_format=file_format)
+    engine = AcquisitionEngine(camera, buffer_size=SAVE_FRAMES)
+    runs = itertools.count()
+    
+    def grab_and_save() -> None:
+        writer = create_writer(config)
+        writer.open(tmp_path / f"run{next(runs)}{writer.extension}", SAVE_FRAMES)
+        stats = engine.run(lambda frame, i, _t: writer.write_frame(frame, i), num_frames=SAVE_FRAMES)
+        writer.close()
+        assert stats.frames_dropped == 0
+    
+    benchmark.pedantic(grab_and_save, rounds=3, warmup_rounds=1)
+    assert benchmark.disabled or SAVE_FRAMES / _mean_s(benchmark) >= MIN_SAVE_FPS[file_format]
+
+
+def test_bench_pump_command(benchmark):
+    """Round trip of a pump set_flow_rate command."""
+    pump = SimulatedPump("bench_pump")
+    pump.initialize()
+    benchmark(pump.set_flow_rate, 100.0)
+    assert benchmark.disabled or _mean_s(benchmark) <= MAX_COMMAND_S
+    pump.close()
+
+
+def test_bench_valve_command(benchmark):
+    """Round trip of a valve switch_channel command."""
+    valve = SimulatedValve("bench_valve")
+    valve.initialize()
+    benchmark(valve.switch_channel, 1)
+    assert benchmark.disabled or _mean_s(benchmark) <= MAX_COMMAND_S
+    valve.close()
+
+
+def test_bench_live_view_conversion(benchmark, camera):
+    """Conversion of a 12-bit frame to an 8-bit display image."""
+    frame = camera.grab_frame()
+    lut = make_lut()
+    image = benchmark(to_display_8bit, frame, lut, 512, 512)
+    assert image.shape == (512, 512)
+    assert benchmark.disabled or _mean_s(benchmark) <= MAX_DISPLAY_CONVERT_S
@@ -0,0 +1,87 @@
+"""Tests for the headless command-line runner."""
+
+import io
+
+import yaml
+
+from instrument.cli import main
+
+
+def _write_config(tmp_path):
+    """Write a simulated instrument configuration."""
+    config = {
+        "instrument_name": "cli-test",
+        "simulation": True,
+        "camera": {"name": "camera", "type": "simulated"},
+        "pumps": [{"name": "sample_pump", "backend": "simulated"}],
+        "valves": [{"name": "sorting_valve", "backend": "simulated", "num_channels": 2}],
+        "paths": {"data_root": str(tmp_path / "data"), "log_dir": str(tmp_path / "logs")},
+        "logging": {"console_level": None},
+        "experiment": {"file_format": "zarr", "journal": {"enabled": True}},
+    }
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+
+def test_cli_runs_repeated_experiments(tmp_path):
+    """Test experiments run headless and report progress and throughput."""
+    out = io.StringIO()
+    
+    code = main(
+        [
+            "--config", str(_write_config(tmp_path)),
+            "--save-path", str(tmp_path / "out"),
+            "--progress-s", "0.1",
+            "experiment", "--flow", "10", "--duration", "0.5", "--interval", "0.05", "--repeat", "2",
+        ],
+        out=out,
+    )
+    
+    lines = out.getvalue().splitlines()
+    assert code == 0
+    assert [line.split(":")[0] for line in lines if line.startswith("Run")] == [
+        "Run 1/2", "Run 1/2 done", "Run 2/2", "Run 2/2 done",
+    ]
+    assert any(line.startswith("[") and "fps" in line for line in lines)
+    assert (tmp_path / "out" / "run-001" / "frames.ome.zarr").exists()
+    assert (tmp_path / "out" / "run-002" / "frames.ome.zarr").exists()
+
+
+def test_cli_runs_protocol(tmp_path):
+    """Test a protocol file runs and its acquisitions are summarized."""
+    protocol = {
+        "name": "short",
+        "steps": [
+            {"set_flow": {"pump": "sample_pump", "rate_ul_min": 5.0}},
+            {"switch_valve": {"valve": "sorting_valve", "channel": 1}},
+            {"acquire": {"name": "block", "duration_s": 0.3, "frame_interval_s": 0.05}},
+        ],
+    }
+    protocol_path = tmp_path / "short.yaml"
+    protocol_path.write_text(yaml.safe_dump(protocol))
+    out = io.StringIO()
+    
+    code = main(["--config", str(_write_config(tmp_path)), "--no-save", "protocol", str(protocol_path)], out=out)
+    
+    assert code == 0
+    output = out.getvalue()
+    assert "Protocol short done" in output and "  block:" in output
+
+
+def test_cli_recovers_finished_run(tmp_path):
+    """Test resume --recover-only leaves a finalized run alone."""
+    config = str(_write_config(tmp_path))
+    run = ["--save-path", str(tmp_path / "out"), "experiment", "--flow", "1", "--duration", "0.2", "--interval", "0.05"]
+    assert main(["--config", config, *run], out=io.StringIO()) == 0
+    out = io.StringIO()
+    
+    code = main(["--config", config, "resume", "--recover-only", str(tmp_path / "out")], out=out)
+    
+    assert code == 0
+    assert "kept 4 of 4 frames (already finalized)" in out.getvalue()
+
+
+def test_cli_missing_config(tmp_path):
+    """Test a missing configuration file is reported with exit code 1."""
+    assert main(["--config", str(tmp_path / "missing.yaml"), "experiment", "--flow", "1"]) == 1
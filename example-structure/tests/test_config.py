@@ -0,0 +1,139 @@
+"""Tests for cached configuration loading."""
+
+import logging
+import os
+import threading
+
+import pytest
+
+from instrument.config import InstrumentConfig
+from instrument.config_cache import ConfigCache, ConfigWatcher
+
+
+def _write(path, text, bump_s=0):
+    """Write a file and move its mtime forward, so every edit is visible."""
+    path.write_text(text)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + int(bump_s * 1e9)))
+
+
+@pytest.fixture
+def config_files(tmp_path):
+    """A config including a base file."""
+    _write(tmp_path / "base.yaml", "instrument_name: base\nexperiment:\n  decimation: 2\n  chunk_frames: 8\n")
+    _write(tmp_path / "rig.yaml", "include: base.yaml\ninstrument_name: rig\nexperiment:\n  chunk_frames: 32\n")
+    return tmp_path
+
+
+def test_includes_and_overrides_merge(config_files):
+    """Test the including file wins over includes, and overrides over both."""
+    cache = ConfigCache()
+    
+    config = cache.load(config_files / "rig.yaml")
+    overridden = cache.load(config_files / "rig.yaml", overrides={"experiment": {"decimation": 4}})
+    
+    assert config.instrument_name == "rig"
+    assert (config.experiment.decimation, config.experiment.chunk_frames) == (2, 32)
+    assert (overridden.experiment.decimation, overridden.experiment.chunk_frames) == (4, 32)
+
+
+def test_cache_parses_only_on_change(config_files):
+    """Test unchanged or merely touched files are not parsed again."""
+    cache = ConfigCache()
+    path = config_files / "rig.yaml"
+    first = cache.load(path)
+    
+    assert cache.load(path) is first
+    _write(config_files / "base.yaml", (config_files / "base.yaml").read_text(), bump_s=1)  # Touch
+    assert cache.load(path) is first
+    assert cache.stats["parses"] == 1
+    
+    _write(config_files / "base.yaml", "instrument_name: base\nexperiment:\n  decimation: 3\n", bump_s=2)
+    reloaded = cache.load(path)
+    
+    assert cache.stats["parses"] == 2
+    assert reloaded.experiment.decimation == 3
+    assert cache.changed_sections(path) == {"experiment"}
+    assert reloaded.paths is first.paths  # Unchanged sections are not revalidated
+
+
+def test_snapshot_skips_parsing_in_new_cache(config_files, tmp_path):
+    """Test a pickled snapshot is reused until an include changes."""
+    snapshots = tmp_path / "snapshots"
+    path = config_files / "rig.yaml"
+    ConfigCache(snapshots).load(path)
+    
+    cache = ConfigCache(snapshots)
+    assert cache.load(path).experiment.chunk_frames == 32
+    assert cache.stats == {"hits": 0, "parses": 0, "snapshot_hits": 1}
+    
+    _write(config_files / "base.yaml", "instrument_name: base\nexperiment:\n  decimation: 5\n", bump_s=1)
+    cache = ConfigCache(snapshots)
+    assert cache.load(path).experiment.decimation == 5
+    assert cache.stats["parses"] == 1
+
+
+def test_circular_include_is_rejected(tmp_path):
+    """Test include cycles raise instead of recursing forever."""
+    _write(tmp_path / "a.yaml", "include: b.yaml\ninstrument_name: a\n")
+    _write(tmp_path / "b.yaml", "include: a.yaml\n")
+    
+    with pytest.raises(ValueError, match="Circular"):
+        ConfigCache().load(tmp_path / "a.yaml")
+
+
+def test_invalid_sensor_export_format_is_rejected(tmp_path):
+    """Test a typo in the sensor export format fails on load, not after a run."""
+    from pydantic import ValidationError
+    
+    _write(tmp_path / "rig.yaml", "instrument_name: rig\nexperiment:\n  sensor_export_format: csv\n")
+    with pytest.raises(ValidationError, match="sensor_export_format"):
+        InstrumentConfig.from_file(tmp_path / "rig.yaml")
+
+
+@pytest.mark.parametrize("section", ["file_format: zar", "detection:\n    table_format: csvv"])
+def test_invalid_storage_formats_are_rejected(tmp_path, section):
+    """Test typos in the dataset and detection table formats fail on load."""
+    from pydantic import ValidationError
+    
+    _write(tmp_path / "rig.yaml", f"instrument_name: rig\nexperiment:\n  {section}\n")
+    with pytest.raises(ValidationError):
+        InstrumentConfig.from_file(tmp_path / "rig.yaml")
+    _write(tmp_path / "rig.yaml", "instrument_name: rig\nexperiment:\n  file_format: OME-Zarr\n")
+    assert InstrumentConfig.from_file(tmp_path / "rig.yaml").experiment.file_format == "ome-zarr"
+
+
+def test_from_file_returns_private_copies(config_files):
+    """Test from_file results can be modified without affecting later loads."""
+    config = InstrumentConfig.from_file(config_files / "rig.yaml")
+    config.simulation = True
+    config.experiment.decimation = 7
+    
+    again = InstrumentConfig.from_file(config_files / "rig.yaml")
+    
+    assert not again.simulation and again.experiment.decimation == 2
+
+
+def test_watcher_reports_changed_sections(config_files, caplog):
+    """Test edits trigger the callback and invalid edits are only logged."""
+    path = config_files / "rig.yaml"
+    changes = []
+    changed = threading.Event()
+    
+    def on_change(config, sections):
+        changes.append((config.instrument_name, sections))
+        changed.set()
+    
+    watcher = ConfigWatcher(path, on_change, cache=ConfigCache(), interval_s=0.02)
+    assert watcher.start().instrument_name == "rig"
+    try:
+        with caplog.at_level(logging.ERROR, logger="instrument.config_cache"):
+            _write(path, "include: base.yaml\ninstrument_name: rig\nexperiment:\n  decimation: nope\n", bump_s=1)
+            threading.Event().wait(0.2)
+        _write(path, "include: base.yaml\ninstrument_name: rig-2\n", bump_s=2)
+        assert changed.wait(2.0)
+    finally:
+        watcher.stop()
+    
+    assert "reload" in caplog.text
+    assert changes == [("rig-2", {"instrument_name", "experiment"})]
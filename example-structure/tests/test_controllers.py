@@ -1,7 +1,16 @@
 """Tests for controllers."""
 
+import numpy as np
+import pytest
+
+from instrument.controllers.acquisition import AcquisitionEngine, FramePool, FrameRingBuffer
 from instrument.controllers.experiment_controller import ExperimentController, ExperimentParams
-from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump
+from instrument.controllers.live_controller import LiveController, make_lut, to_display_8bit
+from instrument.controllers.protocol import Acquire, FlowRamp, Protocol, ProtocolRunner, SwitchValve, WaitForSensor
+from instrument.controllers.reduction import FrameReducer
+from instrument.controllers.scheduler import FrameScheduler
+from instrument.controllers.sensor_controller import SensorController, TimeSeriesBuffer
+from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump, SimulatedSensor, SimulatedValve
 
 
 def test_experiment_controller():
@@ -20,3 +29,824 @@ def test_experiment_controller():
     camera.close()
     pump.close()
 
+
+
+def test_frame_ring_buffer():
+    """Test ring buffer slot cycling and high-water mark."""
+    buffer = FrameRingBuffer(2, (4, 4))
+    
+    first = buffer.acquire_slot()
+    second = buffer.acquire_slot()
+    assert buffer.acquire_slot() is None  # full
+    
+    buffer.commit(first, 0, 0.0)
+    buffer.commit(second, 1, 0.1)
+    assert buffer.high_water_mark == 2
+    
+    slot = buffer.next_filled(timeout=0.1)
+    assert buffer.frame_numbers[slot] == 0
+    buffer.release(slot)
+    assert buffer.fill_level == 1
+    
+    buffer.finish()
+    assert buffer.next_filled(timeout=0.1) == second
+    assert buffer.next_filled(timeout=0.1) is None
+
+
+def test_acquisition_engine():
+    """Test acquisition engine writes every frame in order of frame number."""
+    camera = SimulatedCamera(width=64, height=64)
+    camera.initialize()
+    
+    written = []
+    engine = AcquisitionEngine(camera, buffer_size=8)
+    stats = engine.run(lambda frame, i, t: written.append((i, frame.shape)), num_frames=20)
+    
+    assert stats.frames_acquired == 20
+    assert stats.frames_written + stats.frames_dropped == 20
+    assert [i for i, _ in written] == sorted(i for i, _ in written)
+    assert all(shape == (64, 64) for _, shape in written)
+    
+    camera.close()
+
+
+def test_acquisition_engine_drops_when_full():
+    """Test that a slow sink drops frames instead of stalling the grab thread."""
+    import time
+    
+    camera = SimulatedCamera(width=16, height=16)
+    camera.initialize()
+    
+    engine = AcquisitionEngine(camera, buffer_size=2)
+    stats = engine.run(lambda frame, i, t: time.sleep(0.01), num_frames=50)
+    
+    assert stats.frames_dropped > 0
+    assert stats.frames_written + stats.frames_dropped == 50
+    assert stats.high_water_mark == 2
+    
+    camera.close()
+
+
+def test_frame_pool():
+    """Test frame pool hands out and takes back preallocated buffers."""
+    pool = FramePool(2, (8, 8))
+    
+    first = pool.acquire(timeout=0.1)
+    second = pool.acquire(timeout=0.1)
+    assert first is not second
+    assert pool.acquire(timeout=0.01) is None  # exhausted
+    
+    pool.release(first)
+    assert pool.acquire(timeout=0.1) is first
+    assert pool.available == 0
+
+
+def test_frame_scheduler_skips_missed_deadlines(monkeypatch):
+    """Test scheduler keeps absolute deadlines and skips instead of lagging."""
+    import instrument.controllers.scheduler as scheduler_module
+    
+    class Clock:
+        """Fake clock that ticks 1 us per reading and jumps on sleep()."""
+        
+        now_ns = 0
+        
+        def perf_counter_ns(self):
+            self.now_ns += 1_000
+            return self.now_ns
+        
+        def sleep(self, seconds):
+            self.now_ns += int(seconds * 1e9)
+    
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module, "time", clock)
+    scheduler = FrameScheduler(0.01, jitter_tolerance_s=0.002)
+    scheduler.start()
+    
+    assert scheduler.wait_next() == 0
+    scheduler.record(0)
+    clock.sleep(0.035)  # miss frames 1-3
+    frame_number = scheduler.wait_next()
+    assert frame_number == 4
+    assert scheduler.skipped_frames == 3
+    timing = scheduler.record(frame_number)
+    assert timing.deadline_s == 0.04
+    assert 0.0 <= timing.timestamp_s - timing.deadline_s < 1e-5
+
+
+def test_experiment_controller_timed_run(tmp_path):
+    """Test timed experiment runs at the requested frame interval."""
+    camera = SimulatedCamera(width=32, height=32, pattern="tiles")
+    pump = SimulatedPump("test_pump")
+    camera.initialize()
+    pump.initialize()
+    
+    controller = ExperimentController(camera, pump)
+    params = ExperimentParams(flow_rate_ul_min=50.0, duration_s=0.2, frame_interval_s=0.01)
+    stats = controller.run_experiment(params)
+    
+    assert stats.frames_acquired + stats.frames_skipped >= 19
+    timings = controller.frame_timings
+    assert timings[-1].frame_number <= 19
+    assert all(t.timestamp_s >= t.deadline_s for t in timings)
+    
+    camera.close()
+    pump.close()
+
+
+def test_to_display_8bit():
+    """Test 12-bit frames are downsampled and mapped to 8 bits."""
+    import numpy as np
+    
+    frame = np.full((1024, 1024), 4095, dtype=np.uint16)
+    frame[0, 0] = 0
+    image = to_display_8bit(frame, make_lut(0, 4095), 256, 300)
+    
+    assert image.dtype == np.uint8
+    assert image.shape == (256, 256)
+    assert image[0, 0] == 0
+    assert image[1, 1] == 255
+
+
+def test_live_controller_latest_frame():
+    """Test live view delivers display images without blocking on the camera."""
+    import time
+    
+    camera = SimulatedCamera(width=64, height=64, pattern="tiles")
+    camera.initialize()
+    
+    controller = LiveController(camera)
+    controller.start_live()
+    image = None
+    deadline = time.perf_counter() + 2.0
+    while image is None and time.perf_counter() < deadline:
+        image = controller.latest_display_image(32, 32)
+    controller.stop_live()
+    
+    assert image is not None
+    assert image.shape == (32, 32)
+    assert controller.frames_grabbed >= 1
+    assert not controller.is_live
+    
+    camera.close()
+
+
+@pytest.mark.parametrize(
+    "reducer, shape",
+    [(FrameReducer(binning=2), (32, 32)), (FrameReducer(roi=(8, 4, 32, 40)), (32, 40))],
+    ids=["binning", "roi"],
+)
+def test_live_controller_with_reducer(reducer, shape):
+    """Test repeated repaints with a software ROI or binning hand the grab buffers back."""
+    import time
+    
+    camera = SimulatedCamera(width=64, height=64, pattern="tiles")
+    camera.initialize()
+    
+    controller = LiveController(camera, reducer)
+    controller.start_live()
+    images = []
+    deadline = time.perf_counter() + 5.0
+    while len(images) < 10 and time.perf_counter() < deadline:
+        image = controller.latest_display_image(64, 64)
+        if image is not None:
+            images.append(image)
+    controller.stop_live()
+    
+    assert controller.error is None
+    assert len(images) == 10  # More repaints than pool buffers
+    assert images[-1].shape == shape
+    
+    camera.close()
+
+
+def test_time_series_buffer():
+    """Test sample ring buffer wraps around and computes windowed aggregates."""
+    import numpy as np
+    
+    buffer = TimeSeriesBuffer(capacity=5)
+    for i in range(8):
+        buffer.append(float(i), float(i * 10))
+    
+    timestamps, values = buffer.arrays()
+    assert np.array_equal(timestamps, [3, 4, 5, 6, 7])
+    assert buffer.mean(window_s=1.0) == 65.0
+    assert buffer.min_max(window_s=10.0) == (30.0, 70.0)
+    assert np.array_equal(buffer.rolling_mean(2), [35, 45, 55, 65])
+    assert np.array_equal(buffer.arrays(start_s=4.5, end_s=6.5)[0], [5, 6])
+    # Windows inside the newest segment and across the wrap point
+    assert np.array_equal(buffer.latest(1.0)[0], [6, 7])
+    assert np.array_equal(buffer.latest(3.0)[1], [40, 50, 60, 70])
+    assert np.array_equal(buffer.latest(100.0)[0], [3, 4, 5, 6, 7])
+    assert len(TimeSeriesBuffer(capacity=3).latest(1.0)[0]) == 0
+
+
+def test_sensor_controller_polls_and_exports(tmp_path):
+    """Test sensors are polled on background threads and exported."""
+    import time
+    
+    sensor = SimulatedSensor("pressure", "mbar")
+    sensor.initialize()
+    
+    controller = SensorController()
+    controller.add_sensor("pressure", sensor, rate_hz=500.0, history_s=10.0)
+    controller.start()
+    time.sleep(0.2)
+    controller.stop()
+    
+    assert 20 <= len(controller.buffer("pressure")) <= 200
+    
+    pq = pytest.importorskip("pyarrow.parquet")
+    controller.export(tmp_path / "sensors.parquet")
+    table = pq.read_table(tmp_path / "sensors.parquet")
+    assert table.num_rows == len(controller.buffer("pressure"))
+    
+    sensor.close()
+
+
+def test_protocol_compiles_to_ordered_segments():
+    """Test ramps become one pump controller event, at_s overlaps, and sensor waits split segments."""
+    from instrument.controllers.pump_controller import PumpController
+    
+    pump = SimulatedPump("p")
+    valve = SimulatedValve("v")
+    sensors = SensorController()
+    sensors.add_sensor("s", SimulatedSensor("s"))
+    runner = ProtocolRunner({"p": PumpController(pump)}, {"v": valve}, sensors)
+    protocol = Protocol.from_dict({
+        "name": "test",
+        "steps": [
+            {"flow_ramp": {"pump": "p", "start_ul_min": 0, "end_ul_min": 10, "duration_s": 1.0, "step_s": 0.25}},
+            {"switch_valve": {"valve": "v", "channel": 1, "at_s": 0.6}},
+            {"wait_for_sensor": {"sensor": "s", "above": 1.0}},
+            {"wait": {"duration_s": 0.5}},
+            {"switch_valve": {"valve": "v", "channel": 0}},
+        ],
+    })
+    
+    first, second = runner.compile(protocol)
+    assert [event.time_s for event in first.events] == [0.0, 0.6]
+    assert first.duration_s == 1.0
+    assert first.gate.sensor == "s"
+    assert [event.time_s for event in second.events] == [0.5]
+    assert second.gate is None
+    
+    with pytest.raises(ValueError):
+        Protocol.from_dict({"steps": [{"teleport": {}}]})
+    with pytest.raises(ValueError):
+        runner.compile(Protocol("bad", [FlowRamp("missing", 0, 1, 1.0)]))
+    with pytest.raises(ValueError):
+        runner.compile(Protocol("bad", [FlowRamp("p", 0, 1, 1.0, profile="exponential")]))
+
+
+@pytest.mark.parametrize("native_ramp", [False, True])
+def test_protocol_runner_fires_events_on_time(native_ramp):
+    """Test device commands fire at their deadlines and ramps go through the pump controller."""
+    from instrument.controllers.pump_controller import PumpController
+    
+    pump = SimulatedPump("p", native_ramp=native_ramp)
+    valve = SimulatedValve("v")
+    pump.initialize()
+    valve.initialize()
+    controller = PumpController(pump, max_rate_hz=100.0)
+    runner = ProtocolRunner({"p": controller}, {"v": valve})
+    protocol = Protocol("ramp", [
+        FlowRamp("p", 0.0, 50.0, duration_s=0.2, step_s=0.05),
+        SwitchValve("v", 1, at_s=0.1),
+    ])
+    
+    result = runner.run(protocol)
+    
+    assert pump.get_flow_rate() == 50.0
+    assert valve.get_current_channel() == 1
+    assert len(result.events) == 2
+    assert [event.deadline_s for event in result.events] == sorted(event.deadline_s for event in result.events)
+    assert result.max_latency_s < 0.05
+    assert result.elapsed_s >= 0.2
+    # Sampled every step_s (0.0 to 0.2), or one firmware ramp command
+    assert controller.commands_sent == 1 if native_ramp else 3 <= controller.commands_sent <= 6
+    controller.stop()
+    pump.close()
+    valve.close()
+
+
+def test_protocol_acquisition_and_sensor_timeout(tmp_path):
+    """Test acquisition blocks save to subdirectories and sensor waits time out."""
+    pytest.importorskip("tifffile")
+    camera = SimulatedCamera(64, 64)
+    pump = SimulatedPump("p")
+    sensor = SimulatedSensor("s")
+    for device in (camera, pump, sensor):
+        device.initialize()
+    sensors = SensorController()
+    sensors.add_sensor("s", sensor, rate_hz=100.0)
+    experiment = ExperimentController(camera, pump, sensors=sensors)
+    runner = ProtocolRunner(sensors=sensors, experiment=experiment)
+    
+    result = runner.run(Protocol("acquire", [Acquire(duration_s=0.3, frame_interval_s=0.05, name="block")]), tmp_path)
+    assert result.acquisitions["block"].frames_written > 0
+    assert (tmp_path / "block" / "frames.ome.tif").exists()
+    assert not experiment.is_acquiring
+    
+    with pytest.raises(TimeoutError):
+        runner.run(Protocol("wait", [WaitForSensor("s", below=-1.0, timeout_s=0.1)]))
+    assert not sensors.is_running
+    
+    for device in (camera, pump, sensor):
+        device.close()
+
+
+def test_pump_controller_coalesces_set_points():
+    """Test bursts of set-points collapse into rate-limited commands."""
+    from instrument.controllers.pump_controller import PumpController
+    
+    pump = SimulatedPump("p")
+    pump.initialize()
+    controller = PumpController(pump, max_rate_hz=20.0)
+    controller.start()
+    
+    for rate in range(1, 101):
+        controller.set_flow_rate(float(rate))
+    assert controller.wait_idle(timeout=2.0)
+    
+    assert pump.get_flow_rate() == 100.0
+    assert controller.commands_sent <= 3
+    assert controller.commands_sent + controller.commands_dropped >= 99
+    
+    # A repeated set-point is still sent after the pump was set elsewhere
+    sent = controller.commands_sent
+    controller.set_flow_rate(100.0)
+    assert controller.wait_idle(timeout=2.0)
+    assert controller.commands_sent == sent
+    pump.set_flow_rate(5.0)
+    controller.set_flow_rate(100.0)
+    assert controller.wait_idle(timeout=2.0)
+    assert pump.get_flow_rate() == 100.0
+    controller.stop()
+    pump.close()
+
+
+def test_pump_controller_ramps():
+    """Test sampled exponential ramps and native linear ramps."""
+    import time
+    
+    from instrument.controllers.pump_controller import PumpController
+    
+    pump = SimulatedPump("p")
+    pump.initialize()
+    controller = PumpController(pump, max_rate_hz=50.0)
+    controller.start()
+    controller.ramp_exponential(1.0, 100.0, duration_s=0.2)
+    time.sleep(0.1)
+    assert 1.0 < controller.get_flow_rate() < 100.0
+    assert controller.wait_idle(timeout=2.0)
+    assert pump.get_flow_rate() == pytest.approx(100.0)
+    assert 3 <= controller.commands_sent <= 12
+    controller.stop()
+    
+    native = SimulatedPump("native", native_ramp=True)
+    native.initialize()
+    controller = PumpController(native, max_rate_hz=50.0)
+    controller.start()
+    controller.ramp_linear(0.0, 10.0, duration_s=0.1)
+    assert controller.wait_idle(timeout=2.0)
+    assert controller.commands_sent == 1
+    time.sleep(0.15)
+    assert native.get_flow_rate() == 10.0
+    controller.stop()
+    pump.close()
+    native.close()
+
+
+def test_order_conditions_minimizes_transitions():
+    """Test conditions group by valve and serpentine through flow rates."""
+    from instrument.controllers.batch import condition_grid, order_conditions
+    
+    conditions = condition_grid([30.0, 10.0, 20.0], duration_s=1.0, valve_channels=[1, 0])
+    order = [(conditions[i].valve_channel, conditions[i].flow_rate_ul_min) for i in order_conditions(conditions)]
+    assert order == [(0, 10.0), (0, 20.0), (0, 30.0), (1, 30.0), (1, 20.0), (1, 10.0)]
+
+
+def test_batch_runner_writes_one_indexed_dataset(tmp_path):
+    """Test a batch writes all conditions into one dataset with an index."""
+    import csv
+    
+    from instrument.controllers.batch import BatchRunner, condition_grid
+    
+    tifffile = pytest.importorskip("tifffile")
+    camera = SimulatedCamera(32, 32, pattern="tiles")
+    pump = SimulatedPump("p")
+    valve = SimulatedValve("v")
+    for device in (camera, pump, valve):
+        device.initialize()
+    conditions = condition_grid([20.0, 10.0], duration_s=0.1, frame_interval_s=0.02, valve_channels=[1, 0])
+    
+    result = BatchRunner(camera, pump, valve).run(conditions, tmp_path)
+    
+    assert result.transitions == {"valve": 1, "flow": 3, "exposure": 0}
+    assert [record.first_frame for record in result.records] == [0, 5, 10, 15]
+    assert all(record.stats is not None for record in result.records)
+    assert tifffile.imread(tmp_path / "frames.ome.tif").shape == (20, 32, 32)
+    with open(tmp_path / "conditions.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["first_frame"]) for row in rows] == [0, 5, 10, 15]
+    assert [row["valve_channel"] for row in rows] == ["0", "0", "1", "1"]
+    
+    for device in (camera, pump, valve):
+        device.close()
+
+
+def test_batch_runner_reduces_and_decimates(tmp_path):
+    """Test batch runs store frames through the ROI/binning stage and decimation like single runs."""
+    from instrument.config import ExperimentConfig
+    from instrument.controllers.batch import BatchRunner, condition_grid
+    from instrument.controllers.reduction import FrameReducer
+    
+    tifffile = pytest.importorskip("tifffile")
+    camera = SimulatedCamera(32, 32, pattern="tiles")
+    pump = SimulatedPump("p")
+    for device in (camera, pump):
+        device.initialize()
+    conditions = condition_grid([10.0, 20.0], duration_s=0.1, frame_interval_s=0.02)
+    runner = BatchRunner(
+        camera, pump, config=ExperimentConfig(decimation=2), reducer=FrameReducer(roi=(0, 0, 16, 32), binning=2)
+    )
+    
+    result = runner.run(conditions, tmp_path)
+    
+    assert [record.first_frame for record in result.records] == [0, 3]
+    assert tifffile.imread(tmp_path / "frames.ome.tif").shape == (6, 8, 16)
+    for device in (camera, pump):
+        device.close()
+
+
+def test_frame_reducer_crops_without_copy_and_bins():
+    """Test ROI crops are views and binning averages blocks."""
+    import numpy as np
+    
+    from instrument.controllers.reduction import FrameReducer, configure_reduction
+    
+    frame = np.arange(64, dtype=np.uint16).reshape(8, 8)
+    cropped = FrameReducer(roi=(2, 0, 4, 8)).apply(frame)
+    assert cropped.shape == (4, 8)
+    assert np.shares_memory(cropped, frame)
+    
+    binned = FrameReducer(roi=(0, 0, 4, 4), binning=2).apply(frame)
+    assert np.array_equal(binned, [[4, 6], [20, 22]])
+    assert FrameReducer(binning=2).output_shape((8, 8)) == (4, 4)
+    
+    camera = SimulatedCamera(64, 64, pattern="droplets", seed=0)
+    camera.initialize()
+    reducer = configure_reduction(camera, roi=(16, 0, 8, 64), binning=2)
+    assert reducer.roi is None  # pushed to the camera
+    assert camera.grab_frame().shape == (8, 64)
+    assert reducer.apply(camera.grab_frame()).shape == (4, 32)
+    camera.close()
+
+
+def test_experiment_stores_reduced_decimated_frames(tmp_path):
+    """Test stored frames are cropped and only every Nth frame is kept."""
+    from instrument.config import ExperimentConfig
+    from instrument.controllers.reduction import FrameReducer
+    
+    tifffile = pytest.importorskip("tifffile")
+    camera = SimulatedCamera(32, 32, pattern="tiles")
+    pump = SimulatedPump("p")
+    camera.initialize()
+    pump.initialize()
+    config = ExperimentConfig(file_format="tiff", decimation=2)
+    controller = ExperimentController(camera, pump, config, reducer=FrameReducer(roi=(8, 0, 4, 32)))
+    params = ExperimentParams(flow_rate_ul_min=1.0, duration_s=0.2, frame_interval_s=0.02, save_path=tmp_path)
+    
+    controller.run_experiment(params)
+    
+    assert tifffile.imread(tmp_path / "frames.tif").shape == (5, 4, 32)
+    camera.close()
+    pump.close()
+
+
+def test_droplet_detector_finds_simulated_droplets():
+    """Test detection after the median background is built."""
+    pytest.importorskip("scipy")
+    from instrument.controllers.detection import DropletDetector
+    
+    camera = SimulatedCamera(128, 128, pattern="droplets", seed=1, num_droplets=3, droplet_radius=5)
+    camera.initialize()
+    detector = DropletDetector(threshold=300, min_area_px=5, background_frames=5)
+    
+    results = [detector.detect(camera.grab_frame(), i) for i in range(20)]
+    
+    assert all(r.count == 0 for r in results[:5])
+    assert detector.is_ready
+    counts = [r.count for r in results[5:]]
+    assert max(counts) <= 3 and sum(counts) > 0
+    detected = [r for r in results[5:] if r.count]
+    assert all(((0 <= r.y) & (r.y < 128) & (0 <= r.x) & (r.x < 128)).all() for r in detected)
+    camera.close()
+
+
+@pytest.mark.parametrize("file_format", ["zarr", "OME-Zarr"])
+def test_experiment_saves_only_frames_with_droplets(tmp_path, file_format):
+    """Test event-triggered storage and the detection sidecar."""
+    pytest.importorskip("scipy")
+    zarr = pytest.importorskip("zarr")
+    from instrument.config import DetectionConfig, ExperimentConfig
+    
+    camera = SimulatedCamera(64, 64, pattern="droplets", seed=2, num_droplets=1, droplet_radius=4)
+    pump = SimulatedPump("p")
+    camera.initialize()
+    pump.initialize()
+    detection = DetectionConfig(
+        enabled=True, threshold=300, min_area_px=5, background_frames=4,
+        save_only_detections=True, table_format="csv",
+    )
+    config = ExperimentConfig(file_format=file_format, detection=detection)
+    controller = ExperimentController(camera, pump, config)
+    params = ExperimentParams(flow_rate_ul_min=1.0, duration_s=0.6, frame_interval_s=0.02, save_path=tmp_path)
+    
+    controller.run_experiment(params)
+    
+    frames = np.loadtxt(tmp_path / "droplet_frames.csv", delimiter=",", skiprows=1, ndmin=2)
+    droplets = np.loadtxt(tmp_path / "droplets.csv", delimiter=",", skiprows=1, ndmin=2)
+    assert len(frames) == controller.detections.num_frames == controller.acquisition_stats.frames_written
+    stored = frames[frames[:, 2] > 0]
+    assert len(stored) > 0 and len(droplets) == stored[:, 2].sum()
+    assert sorted(stored[:, 3]) == list(range(len(stored)))
+    assert (frames[frames[:, 2] == 0, 3] == -1).all()
+    assert zarr.open_group(str(tmp_path / "frames.ome.zarr"), mode="r")["0"].shape[0] == len(stored)
+    
+    tiff_controller = ExperimentController(camera, pump, ExperimentConfig(file_format="ome-tiff", detection=detection))
+    with pytest.raises(ValueError, match="zarr"):
+        tiff_controller.run_experiment(params)
+    camera.close()
+    pump.close()
+
+
+def test_detection_csv_keeps_full_precision(tmp_path):
+    """Test large frame numbers and long-run timestamps are written without rounding."""
+    import csv
+    
+    from instrument.controllers.detection import DetectionTable, FrameDetections
+    
+    table = DetectionTable()
+    table.add(FrameDetections(1234567, 3723.456789, np.array([10.25]), np.array([20.5]), np.array([42])), 2345678)
+    table.export(tmp_path, "csv")
+    
+    with open(tmp_path / "droplet_frames.csv", newline="") as f:
+        assert list(csv.DictReader(f)) == [
+            {"frame_number": "1234567", "timestamp_s": "3723.456789", "droplet_count": "1", "stored_index": "2345678"}
+        ]
+    with open(tmp_path / "droplets.csv", newline="") as f:
+        assert list(csv.DictReader(f)) == [{"frame_number": "1234567", "y": "10.250000", "x": "20.500000", "area_px": "42"}]
+
+
+def test_trigger_capture_flushes_pre_and_post_frames():
+    """Test pre-trigger frames are copied and flushed around a trigger."""
+    from instrument.controllers.trigger import TriggerCapture
+    
+    capture = TriggerCapture(3, 2, criteria={"bright": lambda frame: frame[0, 0] == 100})
+    stored = {}
+    buffer = np.zeros((2, 2), dtype=np.uint16)  # Reused like an engine slot
+    
+    def store(frame, index, frame_number, timestamp_s):
+        stored[index] = int(frame[0, 0])
+    
+    values = [1, 2, 3, 4, 5, 100, 6, 7, 8, 9]
+    results = []
+    for i, value in enumerate(values):
+        buffer[:] = value
+        results.append(capture.process(buffer, i, i * 0.1, store))
+    capture.trigger()
+    buffer[:] = 10
+    capture.process(buffer, 10, 1.0, store)
+    
+    assert results == [False] * 2 + [False] * 3 + [True] * 3 + [False] * 2
+    # Last 3 frames before the trigger, the trigger frame, 2 post frames, then the manual trigger
+    assert [stored[i] for i in range(len(stored))] == [3, 4, 5, 100, 6, 7, 8, 9, 10]
+    assert [(e.source, e.frame_number, e.first_stored, e.pre_frames) for e in capture.events] == [
+        ("bright", 5, 0, 3),
+        ("manual", 10, 6, 2),
+    ]
+
+
+def test_experiment_manual_trigger(tmp_path):
+    """Test only frames around a manual trigger are stored."""
+    import csv
+    import threading
+    
+    from instrument.config import ExperimentConfig, TriggerConfig
+    
+    zarr = pytest.importorskip("zarr")
+    camera = SimulatedCamera(16, 16, pattern="tiles")
+    pump = SimulatedPump("p")
+    camera.initialize()
+    pump.initialize()
+    config = ExperimentConfig(file_format="zarr", trigger=TriggerConfig(enabled=True, pre_frames=3, post_frames=4))
+    controller = ExperimentController(camera, pump, config)
+    params = ExperimentParams(flow_rate_ul_min=1.0, duration_s=0.6, frame_interval_s=0.02, save_path=tmp_path)
+    
+    assert not controller.trigger()
+    controller.start_acquisition(params)
+    threading.Event().wait(0.2)
+    assert controller.trigger()
+    controller.finish_acquisition()
+    
+    with open(tmp_path / "trigger_frames.csv") as f:
+        rows = list(csv.DictReader(f))
+    frame_numbers = [int(row["frame_number"]) for row in rows]
+    assert len(rows) == 8 and frame_numbers == sorted(frame_numbers)
+    assert zarr.open_group(str(tmp_path / "frames.ome.zarr"), mode="r")["0"].shape[0] == 8
+    [event] = controller.trigger_capture.events
+    assert event.source == "manual" and event.pre_frames == 3
+    camera.close()
+    pump.close()
+
+
+def test_align_timestamps():
+    """Test frames are matched to the nearest timestamp within tolerance."""
+    from instrument.controllers.multi_camera import align_timestamps
+    
+    index = align_timestamps(np.array([0.0, 0.1, 0.2, 0.3]), np.array([0.002, 0.099, 0.26]), 0.02)
+    assert index.tolist() == [0, 1, -1, -1]
+    assert align_timestamps(np.array([0.0]), np.array([]), 0.1).tolist() == [-1]
+
+
+@pytest.mark.parametrize("sync", ["software", "hardware"])
+def test_multi_camera_synchronized_run(tmp_path, sync):
+    """Test each camera saves its own dataset and frames align across cameras."""
+    import csv
+    
+    from instrument.config import ExperimentConfig
+    from instrument.controllers.multi_camera import MultiCameraController
+    
+    class RecordingCamera(SimulatedCamera):
+        trigger_states: list[bool]
+        
+        def set_hardware_trigger(self, enabled):
+            super().set_hardware_trigger(enabled)
+            self.trigger_states.append(enabled)
+    
+    cameras = {name: RecordingCamera(16, 16, pattern="tiles", frame_rate_hz=50.0, name=name) for name in ("top", "side")}
+    for camera in cameras.values():
+        camera.trigger_states = []
+    pump = SimulatedPump("p")
+    for camera in cameras.values():
+        camera.initialize()
+    pump.initialize()
+    controller = MultiCameraController(cameras, pump, ExperimentConfig(file_format="tiff", camera_sync=sync))
+    params = ExperimentParams(flow_rate_ul_min=1.0, duration_s=0.4, frame_interval_s=0.02, save_path=tmp_path)
+    
+    stats = controller.run_experiment(params)
+    
+    assert not controller.is_acquiring
+    assert stats.frames_acquired == sum(s.frames_acquired for s in controller.camera_stats.values())
+    assert all((tmp_path / name / "frame_timestamps.csv").exists() for name in cameras)
+    with open(tmp_path / "frame_alignment.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert rows and list(rows[0]) == ["top_frame_number", "top_timestamp_s", "side_frame_number", "side_offset_s"]
+    matched = [abs(float(row["side_offset_s"])) for row in rows if row["side_frame_number"] != "-1"]
+    assert len(matched) >= len(rows) // 2
+    assert max(matched) <= params.frame_interval_s / 2
+    # Cameras are armed only for the run and free-running afterwards
+    expected = [False, True, False] if sync == "hardware" else [False, False]
+    assert all(camera.trigger_states == expected for camera in cameras.values())
+    for camera in cameras.values():
+        camera.close()
+    pump.close()
+
+
+@pytest.mark.parametrize("file_format", ["zarr", "ome-tiff"])
+def test_experiment_resumes_after_crash(tmp_path, file_format):
+    """Test a run killed mid-acquisition is recovered from its journal and completed."""
+    import subprocess
+    import sys
+    from pathlib import Path
+    
+    from instrument.config import ExperimentConfig, JournalConfig
+    from instrument.storage.journal import read_journal
+    
+    config = ExperimentConfig(file_format=file_format, chunk_frames=4, journal=JournalConfig(enabled=True, sync_frames=5))
+    code = f"""
+import os, threading
+from pathlib import Path
+from instrument.config import ExperimentConfig
+from instrument.controllers.experiment_controller import ExperimentController, ExperimentParams
+from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump
+camera, pump = SimulatedCamera(16, 16, pattern="tiles"), SimulatedPump("p")
+camera.initialize()
+pump.initialize()
+controller = ExperimentController(camera, pump, ExperimentConfig.model_validate({config.model_dump()!r}))
+controller.start_acquisition(ExperimentParams(7.0, 1.0, Path({str(tmp_path)!r}), frame_interval_s=0.02))
+threading.Event().wait(0.4)
+os._exit(1)
+"""
+    root = Path(__file__).resolve().parents[1]
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 1
+    crashed = read_journal(tmp_path / "journal.jsonl")[0]
+    assert not crashed.finalized and 0 < len(crashed.frames) < 50
+    
+    camera = SimulatedCamera(16, 16, pattern="tiles")
+    pump = SimulatedPump("p")
+    camera.initialize()
+    pump.initialize()
+    controller = ExperimentController(camera, pump, config)
+    stats = controller.resume_experiment(tmp_path)
+    
+    state = read_journal(tmp_path / "journal.jsonl")[0]
+    assert state.finalized and len(crashed.frames) < len(state.frames) <= 50
+    assert state.frames[:len(crashed.frames)] == crashed.frames
+    assert stats.frames_acquired + stats.frames_skipped == 50 - (crashed.frames[-1][1] + 1)
+    assert pump.get_flow_rate() == 7.0
+    camera.close()
+    pump.close()
+
+
+def test_resumed_run_keeps_tables_of_earlier_parts(tmp_path):
+    """Test a run stopped early and resumed writes its tables next to the first part's."""
+    import csv
+    import threading
+    
+    from instrument.config import ExperimentConfig, JournalConfig
+    from instrument.storage.journal import read_journal
+    
+    pytest.importorskip("zarr")
+    camera = SimulatedCamera(16, 16, pattern="tiles")
+    pump = SimulatedPump("p")
+    camera.initialize()
+    pump.initialize()
+    config = ExperimentConfig(file_format="zarr", chunk_frames=4, journal=JournalConfig(enabled=True))
+    controller = ExperimentController(camera, pump, config)
+    params = ExperimentParams(flow_rate_ul_min=1.0, duration_s=1.0, frame_interval_s=0.02, save_path=tmp_path)
+    controller.start_acquisition(params)
+    threading.Event().wait(0.3)
+    controller.stop_experiment()
+    controller.finish_acquisition()
+    with open(tmp_path / "frame_timestamps.csv") as f:
+        first_part = f.read()
+    last_frame = max(int(row["frame_number"]) for row in csv.DictReader(first_part.splitlines()))
+    
+    controller.resume_experiment(tmp_path)
+    
+    with open(tmp_path / "frame_timestamps.csv") as f:
+        assert f.read() == first_part
+    with open(tmp_path / "frame_timestamps-resume-1.csv") as f:
+        resumed = list(csv.DictReader(f))
+    assert resumed and all(last_frame < int(row["frame_number"]) < 50 for row in resumed)
+    state = read_journal(tmp_path / "journal.jsonl")[0]
+    assert state.finalized and state.resumes == 1
+    camera.close()
+    pump.close()
+
+
+@pytest.mark.parametrize("num_synced", [0, 3])
+@pytest.mark.parametrize("file_format", ["ome-tiff", "zarr"])
+def test_recover_run_before_and_after_first_sync(tmp_path, file_format, num_synced):
+    """Test a crashed run is recovered and resumed whether or not a journal sync happened."""
+    from dataclasses import asdict
+    
+    from instrument.config import ExperimentConfig, JournalConfig
+    from instrument.storage import create_writer
+    from instrument.storage.journal import AcquisitionJournal
+    
+    pytest.importorskip("zarr" if file_format == "zarr" else "tifffile")
+    config = ExperimentConfig(file_format=file_format, chunk_frames=4, journal=JournalConfig(enabled=True))
+    writer = create_writer(config)
+    dataset = f"frames{writer.extension}"
+    writer.open(tmp_path / dataset, 10)
+    journal = AcquisitionJournal(tmp_path / "journal.jsonl", sync_frames=num_synced or 100, sync_dataset=writer.sync)
+    params = ExperimentParams(flow_rate_ul_min=1.0, duration_s=0.2, frame_interval_s=0.02)
+    journal.open(run={"dataset": dataset, "num_frames": 10, "params": asdict(params)})
+    frames = np.arange(5 * 8 * 8, dtype=np.uint16).reshape(5, 8, 8) + 1
+    for i in range(5):
+        writer.write_frame(frames[i], i)
+        journal.record(i, i, i * 0.02)
+    del writer, journal  # Crash: neither was closed
+    
+    camera = SimulatedCamera(8, 8, pattern="tiles")
+    pump = SimulatedPump("p")
+    camera.initialize()
+    pump.initialize()
+    controller = ExperimentController(camera, pump, config)
+    state = controller.recover_run(tmp_path)
+    
+    assert state.num_stored == num_synced
+    if file_format == "zarr":
+        import zarr
+        
+        stored = zarr.open_group(str(tmp_path / dataset), mode="r")["0"][:] if num_synced else np.empty((0, 8, 8))
+    else:
+        import tifffile
+        
+        stored = tifffile.imread(tmp_path / dataset) if num_synced else np.empty((0, 8, 8))
+        assert (tmp_path / dataset).exists() == bool(num_synced)
+    assert np.array_equal(stored, frames[:num_synced])
+    
+    stats = controller.resume_experiment(tmp_path)
+    assert stats.frames_acquired + stats.frames_skipped == 10 - num_synced
+    if file_format == "zarr":
+        resumed = zarr.open_group(str(tmp_path / dataset), mode="r")["0"][:]
+    else:
+        resumed = tifffile.imread(tmp_path / dataset)
+    assert len(resumed) == 10
+    assert np.array_equal(resumed[:num_synced], frames[:num_synced])
+    camera.close()
+    pump.close()
@@ -1,5 +1,8 @@
 """Tests for device implementations."""
 
+from instrument.config import InstrumentConfig
+from instrument.devices.async_ import close_all, initialize_all, wrap_async
+from instrument.devices.registry import DeviceRegistry
 from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump, SimulatedValve
 
 
@@ -36,3 +39,139 @@ def test_simulated_valve():
     
     valve.close()
 
+
+
+def test_simulated_camera_grab_frame_into():
+    """Test simulated camera fills a preallocated buffer in place."""
+    import numpy as np
+    
+    camera = SimulatedCamera(width=64, height=32)
+    camera.initialize()
+    
+    out = np.zeros((32, 64), dtype=np.uint16)
+    result = camera.grab_frame_into(out)
+    assert result is out
+    assert out.max() <= 4095
+    
+    camera.close()
+
+
+def test_simulated_camera_droplets_reproducible():
+    """Test seeded droplet pattern gives identical frames across cameras."""
+    import numpy as np
+    
+    first = SimulatedCamera(width=128, height=64, pattern="droplets", seed=42)
+    second = SimulatedCamera(width=128, height=64, pattern="droplets", seed=42)
+    first.initialize()
+    second.initialize()
+    
+    for _ in range(3):
+        a = first.grab_frame()
+        b = second.grab_frame()
+        assert np.array_equal(a, b)
+    assert a.max() == 3000  # droplets are drawn over the dim background
+    
+    first.close()
+    second.close()
+
+
+def test_simulated_camera_frame_rate():
+    """Test frame pacing honors the exposure time."""
+    import time
+    
+    camera = SimulatedCamera(width=16, height=16, pattern="tiles", frame_rate_hz=1000.0)
+    camera.initialize()
+    camera.set_exposure_time(10.0)  # limits to 100 fps
+    
+    start = time.perf_counter()
+    for _ in range(6):
+        camera.grab_frame()
+    assert time.perf_counter() - start >= 0.05
+    
+    camera.close()
+
+
+def test_async_devices_run_concurrently():
+    """Test commands to different devices overlap instead of adding up."""
+    import asyncio
+    import time
+    
+    class SlowValve(SimulatedValve):
+        def switch_channel(self, channel: int) -> None:
+            time.sleep(0.1)  # serial round trip
+            super().switch_channel(channel)
+    
+    valves = [wrap_async(SlowValve(f"valve_{i}"), f"valve_{i}") for i in range(5)]
+    pump = wrap_async(SimulatedPump("test_pump"))
+    
+    async def step() -> float:
+        await initialize_all([*valves, pump])
+        start = time.perf_counter()
+        await asyncio.gather(pump.set_flow_rate(10.0), *(valve.switch_channel(1) for valve in valves))
+        elapsed = time.perf_counter() - start
+        assert await pump.get_flow_rate() == 10.0
+        assert await close_all([*valves, pump]) == []
+        return elapsed
+    
+    assert asyncio.run(step()) < 0.3
+
+
+def test_device_registry_from_config():
+    """Test registry builds every configured device and closes them."""
+    config = InstrumentConfig.model_validate({
+        "instrument_name": "test",
+        "simulation": True,
+        "camera": {"type": "simulated"},
+        "pumps": [{"name": "sample_pump", "backend": "serial"}],
+        "valves": [{"name": "valve", "backend": "gpio", "depends_on": ["sample_pump"]}],
+        "sensors": [{"name": "pressure", "backend": "serial"}],
+    })
+    registry = DeviceRegistry.from_config(config)
+    
+    timings = registry.initialize()
+    assert set(timings) == {"camera", "sample_pump", "valve", "pressure"}
+    registry.get("valve").switch_channel(1)
+    assert len(registry.pumps) == 1
+    
+    registry.close()
+
+
+def test_device_registry_timeout():
+    """Test a hanging device fails after its timeout, is closed once it returns, and can be retried."""
+    import time
+    
+    import pytest
+    
+    events = []
+    
+    class HangingPump(SimulatedPump):
+        delay_s = 0.5
+        
+        def initialize(self) -> None:
+            time.sleep(self.delay_s)
+            events.append("initialize")
+        
+        def close(self) -> None:
+            events.append("close")
+    
+    pump = HangingPump("slow_pump")
+    registry = DeviceRegistry()
+    registry.add("camera", SimulatedCamera())
+    registry.add("slow_pump", pump, timeout_s=0.05)
+    
+    with pytest.raises(RuntimeError, match="slow_pump"):
+        registry.initialize()
+    assert events == []
+    
+    with pytest.raises(RuntimeError, match="slow_pump"):
+        registry.initialize()  # Still initializing from the first attempt
+    deadline = time.perf_counter() + 5.0
+    while "close" not in events and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert events == ["initialize", "close"]
+    
+    pump.delay_s = 0.0
+    registry.initialize()
+    assert events == ["initialize", "close", "initialize"]
+    registry.close()
+    assert events[-1] == "close"
@@ -10,6 +10,7 @@ def test_gui_imports():
     from instrument.gui.widgets.camera_widget import CameraWidget
     from instrument.gui.widgets.pump_widget import PumpWidget
     from instrument.gui.widgets.status_widget import StatusWidget
+    from instrument.gui.widgets.trigger_widget import TriggerWidget
     
     # If we get here, imports worked
     assert True
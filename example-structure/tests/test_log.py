@@ -0,0 +1,46 @@
+"""Tests for the logging pipeline."""
+
+import json
+
+from instrument.config import LoggingConfig
+from instrument.devices.simulated_ import SimulatedPump, SimulatedValve
+from instrument.log import setup_logging
+
+
+def test_device_logs_written_as_json_lines(tmp_path):
+    """Test device records reach the log file as JSON objects."""
+    pipeline = setup_logging(tmp_path, LoggingConfig(console_level=None))
+    try:
+        pump = SimulatedPump("log_pump")
+        pump.initialize()
+        pump.set_flow_rate(12.5)
+        pump.close()
+    finally:
+        pipeline.stop()
+    
+    entries = [json.loads(line) for line in pipeline.log_file.read_text().splitlines()]
+    pump_entries = [entry for entry in entries if entry["logger"] == "instrument.devices.log_pump"]
+    assert [entry["message"] for entry in pump_entries] == [
+        "Initialized",
+        "Flow rate set to 12.5 uL/min",
+        "Closed",
+    ]
+    assert pump_entries[0]["level"] == "INFO"
+
+
+def test_device_level_from_config(tmp_path):
+    """Test a per-device level silences that device only."""
+    config = LoggingConfig(console_level=None, device_levels={"quiet_valve": "WARNING"})
+    pipeline = setup_logging(tmp_path, config)
+    try:
+        quiet = SimulatedValve("quiet_valve")
+        loud = SimulatedValve("loud_valve")
+        for valve in (quiet, loud):
+            valve.initialize()
+            valve.switch_channel(1)
+    finally:
+        pipeline.stop()
+    
+    loggers = {json.loads(line)["logger"] for line in pipeline.log_file.read_text().splitlines()}
+    assert "instrument.devices.loud_valve" in loggers
+    assert "instrument.devices.quiet_valve" not in loggers
@@ -0,0 +1,72 @@
+"""Tests for runtime metrics."""
+
+import json
+
+from instrument.controllers.acquisition import AcquisitionEngine
+from instrument.devices.simulated_ import SimulatedCamera, SimulatedPump
+from instrument.metrics import LatencyHistogram, Metrics
+
+
+def test_latency_histogram_percentiles():
+    """Test percentiles land in the right log bucket."""
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.record(0.001)
+    histogram.record(0.5)
+    
+    summary = histogram.snapshot()
+    assert summary["count"] == 100
+    assert 0.001 <= summary["p50_s"] < 0.0013
+    assert summary["p99_s"] < 0.0013
+    assert summary["max_s"] == 0.5
+
+
+def test_metrics_disabled_records_nothing():
+    """Test a disabled registry ignores all calls."""
+    metrics = Metrics(enabled=False)
+    metrics.observe("stage", 0.1)
+    metrics.increment("count")
+    with metrics.timer("block"):
+        pass
+    
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {}
+    assert all(stats["count"] == 0 for stats in snapshot["latency"].values())
+
+
+def test_metrics_wrap_and_export(tmp_path):
+    """Test wrapped device commands appear in JSON and Prometheus output."""
+    metrics = Metrics()
+    pump = SimulatedPump("test_pump")
+    pump.initialize()
+    metrics.wrap(pump, "set_flow_rate", "pump.set_flow_rate")
+    
+    pump.set_flow_rate(10.0)
+    pump.set_flow_rate(20.0)
+    assert pump.get_flow_rate() == 20.0
+    
+    metrics.write_json(tmp_path / "metrics.json")
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data["latency"]["pump.set_flow_rate"]["count"] == 2
+    
+    text = metrics.to_prometheus()
+    assert "instrument_pump_set_flow_rate_seconds_count 2" in text
+    assert 'instrument_pump_set_flow_rate_seconds_bucket{le="+Inf"} 2' in text
+    pump.close()
+
+
+def test_acquisition_engine_metrics():
+    """Test the engine records grab and sink latencies and frame counters."""
+    camera = SimulatedCamera(64, 64)
+    camera.initialize()
+    metrics = Metrics()
+    engine = AcquisitionEngine(camera, buffer_size=16, metrics=metrics)
+    
+    engine.run(lambda frame, i, _t: None, num_frames=10)
+    
+    snapshot = metrics.snapshot()
+    assert snapshot["latency"]["camera.grab_frame"]["count"] == 10
+    assert snapshot["latency"]["acquisition.sink"]["count"] == 10
+    assert snapshot["counters"]["frames_acquired"] == 10
+    assert snapshot["counters"]["frames_written"] == 10
+    camera.close()
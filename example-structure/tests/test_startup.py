@@ -0,0 +1,75 @@
+"""Startup cost tests.
+
+Each check runs in a fresh interpreter, since the test process itself has
+already imported most of the package. The import-time budget is loose so
+that only gross regressions (e.g. an eager vendor SDK or Qt import) fail:
+
+    python -X importtime -c "import instrument.app" 2> importtime.log
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+# Cumulative import time budget for the application module
+IMPORT_BUDGET_S = 3.0
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _run(code: str, *options: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter from the project root."""
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_headless_build_never_imports_qt():
+    """Test building the simulated instrument does not load Qt."""
+    code = """
+import sys
+from instrument.app import build_instrument
+from instrument.config import CameraConfig, InstrumentConfig, PumpConfig
+from instrument.controllers import ExperimentController
+from instrument.storage import create_writer
+
+config = InstrumentConfig(
+    instrument_name="headless",
+    simulation=True,
+    camera=CameraConfig(name="camera", type="simulated"),
+    pumps=[PumpConfig(name="pump", backend="simulated")],
+)
+live, experiment, registry = build_instrument(config)
+registry.close()
+print(sorted(m for m in sys.modules if m.split(".")[0] in ("qtpy", "PyQt5", "PyQt6", "PySide2", "PySide6")))
+"""
+    assert _run(code).stdout.strip() == "[]"
+
+
+def test_package_imports_are_lazy():
+    """Test importing a package does not import all of its submodules."""
+    code = """
+import sys
+import instrument.controllers
+import instrument.gui
+print("instrument.controllers.batch" in sys.modules, "instrument.gui.main_window" in sys.modules)
+instrument.controllers.BatchRunner
+print("instrument.controllers.batch" in sys.modules)
+"""
+    assert _run(code).stdout.split() == ["False", "False", "True"]
+
+
+def test_import_time_budget():
+    """Test the application module imports within the budget."""
+    stderr = _run("import instrument.app", "-X", "importtime").stderr
+    # Lines read "import time: self [us] | cumulative | module"
+    cumulative_us = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    }
+    assert cumulative_us["instrument.app"] / 1e6 < IMPORT_BUDGET_S
@@ -0,0 +1,208 @@
+"""Tests for storage backends."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from instrument.config import ExperimentConfig
+from instrument.storage import create_writer
+
+
+def test_create_writer_unknown_format():
+    """Test that an unknown file format is rejected."""
+    with pytest.raises(ValueError):
+        create_writer(ExperimentConfig(file_format="bmp"))
+
+
+def test_zarr_writer(tmp_path):
+    """Test Zarr writer with out-of-order frames and a partial last chunk."""
+    zarr = pytest.importorskip("zarr")
+    
+    config = ExperimentConfig(file_format="zarr", chunk_frames=4, compressor="zstd")
+    writer = create_writer(config)
+    path = tmp_path / f"frames{writer.extension}"
+    writer.open(path, num_frames=4)
+    
+    frames = np.arange(10 * 8 * 8, dtype=np.uint16).reshape(10, 8, 8)
+    for i in [1, 0, 3, 2, 5, 4, 6, 8, 9]:  # frame 7 dropped
+        writer.write_frame(frames[i], i)
+    writer.close({"flow_rate_ul_min": 100.0})
+    
+    group = zarr.open_group(str(path), mode="r")
+    data = group["0"][:]
+    assert data.shape == (10, 8, 8)
+    assert np.array_equal(data[:7], frames[:7])
+    assert not data[7].any()
+    assert np.array_equal(data[8:], frames[8:])
+    assert group.attrs["multiscales"][0]["axes"][0]["name"] == "t"
+    assert group.attrs["acquisition"]["flow_rate_ul_min"] == 100.0
+
+
+@pytest.mark.parametrize("compressor", ["lz4", "none"])
+def test_zarr_writer_process_pool(tmp_path, compressor):
+    """Test chunks compressed in worker processes read back identically."""
+    zarr = pytest.importorskip("zarr")
+    
+    config = ExperimentConfig(
+        file_format="zarr",
+        chunk_frames=4,
+        chunk_shape=[6, 5],  # Uneven edge chunks
+        compressor=compressor,
+        compression_workers=2,
+    )
+    writer = create_writer(config)
+    path = tmp_path / f"frames{writer.extension}"
+    writer.open(path, num_frames=10)
+    
+    frames = np.random.default_rng(0).integers(0, 4096, (10, 16, 12), dtype=np.uint16)
+    for i in [1, 0, 3, 2, 5, 4, 6, 8, 9]:  # frame 7 dropped
+        writer.write_frame(frames[i], i)
+    writer.close()
+    
+    data = zarr.open_group(str(path), mode="r")["0"][:]
+    assert data.shape == (10, 16, 12)
+    assert np.array_equal(data[:7], frames[:7])
+    assert not data[7].any()
+    assert np.array_equal(data[8:], frames[8:])
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_zarr_writer_gapped_frame_numbers(tmp_path, workers):
+    """Test chunks with dropped frames are written once later chunks start instead of piling up."""
+    zarr = pytest.importorskip("zarr")
+    
+    config = ExperimentConfig(file_format="zarr", chunk_frames=4, compression_workers=workers)
+    writer = create_writer(config)
+    path = tmp_path / f"frames{writer.extension}"
+    writer.open(path, num_frames=40)
+    frames = np.arange(40 * 8 * 8, dtype=np.uint16).reshape(40, 8, 8) + 1
+    
+    def write():
+        for i in range(0, 40, 4):  # Three of every four frames dropped
+            writer.write_frame(frames[i], i)
+    
+    thread = threading.Thread(target=write, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "Writer blocked on chunks with gaps"
+    if not workers:
+        # Only the two newest chunks are still staged
+        assert all((path / "0" / str(i)).exists() for i in range(8))
+        assert not (path / "0" / "8").exists()
+    writer.write_frame(frames[1], 1)  # Arrives after its chunk was written
+    writer.close()
+    
+    data = zarr.open_group(str(path), mode="r")["0"][:]
+    expected = np.zeros_like(frames[:37])
+    expected[::4] = frames[:37:4]
+    expected[1] = frames[1]
+    assert np.array_equal(data, expected)
+
+
+def test_ome_tiff_writer(tmp_path):
+    """Test memory-mapped OME-TIFF writer and header finalized on close."""
+    tifffile = pytest.importorskip("tifffile")
+    
+    writer = create_writer(ExperimentConfig(file_format="ome-tiff"))
+    path = tmp_path / f"frames{writer.extension}"
+    writer.open(path, num_frames=5)
+    
+    frames = np.arange(4 * 8 * 8, dtype=np.uint16).reshape(4, 8, 8)
+    for i in [2, 0, 1, 3]:
+        writer.write_frame(frames[i], i)
+    writer.close({"flow_rate_ul_min": 100.0})
+    
+    with tifffile.TiffFile(path) as tif:
+        assert tif.is_ome
+        description = tif.pages[0].description
+        data = np.stack([tif.pages[i].asarray() for i in range(4)])
+    assert 'SizeT="4"' in description
+    assert "flow_rate_ul_min" in description
+    assert np.array_equal(data, frames)
+
+
+@pytest.mark.parametrize("bigtiff", [False, True])
+def test_ome_tiff_writer_drops_unwritten_pages(tmp_path, monkeypatch, bigtiff):
+    """Test a run stopped early leaves only the written pages, and an empty run no file."""
+    tifffile = pytest.importorskip("tifffile")
+    from instrument.storage import tiff_
+    
+    if bigtiff:
+        monkeypatch.setattr(tiff_, "BIGTIFF_THRESHOLD_BYTES", 0)
+    writer = create_writer(ExperimentConfig(file_format="ome-tiff"))
+    path = tmp_path / f"frames{writer.extension}"
+    writer.open(path, num_frames=10)
+    frames = np.arange(3 * 8 * 6, dtype=np.uint16).reshape(3, 8, 6) + 1
+    for i in range(3):
+        writer.write_frame(frames[i], i)
+    writer.close()
+    
+    with tifffile.TiffFile(path) as tif:
+        assert tif.is_bigtiff == bigtiff
+        assert len(tif.pages) == 3
+        assert 'SizeT="3"' in tif.pages[0].description
+        assert np.array_equal(tif.asarray(), frames)
+    
+    empty = tmp_path / f"empty{writer.extension}"
+    writer.open(empty, num_frames=0)
+    writer.close()
+    assert not empty.exists()
+
+
+def test_journal_recovery_drops_unsynced_records(tmp_path):
+    """Test recovery keeps frames up to the last sync and removes a torn tail."""
+    from instrument.storage.journal import AcquisitionJournal, read_journal, recover_journal
+    
+    syncs = []
+    path = tmp_path / "journal.jsonl"
+    journal = AcquisitionJournal(path, sync_frames=3, sync_dataset=lambda: syncs.append(1))
+    journal.open(run={"dataset": "frames.ome.zarr", "num_frames": 10, "params": {}})
+    for i in [0, 2, 1]:
+        journal.record(i, 10 + i, i * 0.1)
+    with open(path, "ab") as f:
+        # Frame 3 dropped, frame 4 written but not synced, then a torn write at the crash
+        f.write(b'{"type":"frame","stored":4,"frame":14,"t":0.4}\n{"type":"fra')
+    
+    state = recover_journal(path)
+    
+    assert len(syncs) == 1 and not state.finalized
+    assert state.frames == [(0, 10, 0.0), (1, 11, 0.1), (2, 12, 0.2)]
+    assert state.num_stored == 3
+    assert path.read_bytes().endswith(b'"frames":3}\n')
+    assert read_journal(path)[0].frames == state.frames
+
+
+@pytest.mark.parametrize("file_format", ["zarr", "ome-tiff"])
+def test_writer_recovers_and_continues(tmp_path, file_format):
+    """Test a dataset left open is cut back to the kept frames and continued."""
+    pytest.importorskip("zarr" if file_format == "zarr" else "tifffile")
+    
+    config = ExperimentConfig(file_format=file_format, chunk_frames=4)
+    writer = create_writer(config)
+    path = tmp_path / f"frames{writer.extension}"
+    writer.open(path, num_frames=10)
+    frames = np.arange(10 * 8 * 8, dtype=np.uint16).reshape(10, 8, 8) + 1
+    for i in [0, 1, 2, 4, 5, 6]:  # 3 dropped
+        writer.write_frame(frames[i], i)
+    writer.sync()
+    del writer  # Crash: never closed
+    
+    writer = create_writer(config)
+    writer.recover(path, [0, 1, 2, 4, 5], num_frames=10)  # 6 was not journaled
+    for i in range(6, 10):
+        writer.write_frame(frames[i], i)
+    writer.close()
+    
+    if file_format == "zarr":
+        import zarr
+        
+        data = zarr.open_group(str(path), mode="r")["0"][:]
+    else:
+        import tifffile
+        
+        data = tifffile.imread(path)
+    assert data.shape == (10, 8, 8)
+    assert not data[3].any()
+    kept = [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert np.array_equal(data[kept], frames[kept])